@@ -1,6 +1,14 @@
-from fastapi import FastAPI, HTTPException
+from contextvars import ContextVar
+from fastapi import FastAPI, HTTPException, Request, Response
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import PlainTextResponse, StreamingResponse
+from functools import partial
+import asyncio
+import itertools
+import logging
 import os
+import time
+import anyio
 import django
 from django.conf import settings
 
@@ -8,47 +16,303 @@ from django.conf import settings
 os.environ.setdefault('DJANGO_SETTINGS_MODULE', 'foosball_project.settings')
 django.setup()
 
-from tournaments.models import Team, Classification, Participant, GalleryImage
-from tournaments.serializers import TeamSerializer, ClassificationSerializer, ParticipantSerializer, GalleryImageSerializer
+from django.db import close_old_connections, connection
+from django.db.models import F
+from django.utils.http import http_date, quote_etag
+from tournaments.models import Tournament, Team, Classification, Participant, GalleryImage, Match
+from tournaments.events import (
+    KEEPALIVE_SECONDS, MAX_PENDING_EVENTS, RETRY_MILLISECONDS, encode_data, format_event, group_table,
+)
+from tournaments.metrics import (
+    PROMETHEUS_CONTENT_TYPE, QueryRecorder, registry, scrape_allowed, server_timing, server_timing_enabled,
+)
+from tournaments.response_cache import etag_matches, fingerprint
+from tournaments.serializers import TeamSerializer, ClassificationSerializer, ParticipantSerializer, GalleryImageSerializer, MatchSerializer
+
+# The Django ORM is synchronous: every endpoint runs its queries on a worker
+# thread so the event loop keeps serving other requests. The limiter caps the
+# number of concurrent threads (and therefore database connections).
+ORM_THREADS = int(os.environ.get('FASTAPI_ORM_THREADS', 8))
+_orm_limiter = None
+
+# Seconds between version checks of the tournaments live listeners follow
+EVENTS_POLL_SECONDS = float(os.environ.get('EVENTS_POLL_SECONDS', 1))
+
+logger = logging.getLogger(__name__)
 
 app = FastAPI(title="Foosball Tournaments API", version="1.0.0")
 
 # Add CORS middleware
 app.add_middleware(
     CORSMiddleware,
-    allow_origins=["http://localhost:3000", "http://127.0.0.1:3000"],
+    # Same origins as Django: the frontend reads live standings from this app
+    allow_origins=settings.CORS_ALLOWED_ORIGINS,
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
 )
 
+# Query recorder of the request being served, read by run_orm
+_query_recorder = ContextVar('query_recorder', default=None)
+
+
+@app.middleware("http")
+async def record_metrics(request: Request, call_next):
+    recorder = QueryRecorder()
+    token = _query_recorder.set(recorder)
+    started = time.perf_counter()
+    try:
+        response = await call_next(request)
+    finally:
+        _query_recorder.reset(token)
+    duration = time.perf_counter() - started
+
+    route = request.scope.get('route')
+    view = route.path if route is not None else 'unresolved'
+    response_bytes = response.headers.get('content-length')
+    registry.observe(
+        'fastapi', view, request.method, response.status_code, duration, recorder,
+        int(response_bytes) if response_bytes is not None else None
+    )
+    if server_timing_enabled():
+        response.headers['Server-Timing'] = server_timing(duration, recorder)
+    return response
+
+
+def _run_with_connection(function, recorder, *args):
+    # Worker threads are reused, so honour CONN_MAX_AGE like a Django request would
+    close_old_connections()
+    try:
+        if recorder is None:
+            return function(*args)
+        # Execute wrappers are per connection, i.e. per worker thread
+        with connection.execute_wrapper(recorder):
+            return function(*args)
+    finally:
+        close_old_connections()
+
+
+async def run_orm(function, *args):
+    """Run blocking ORM/serializer work on the bounded thread pool"""
+    global _orm_limiter
+    if _orm_limiter is None:
+        # Created lazily: anyio needs a running event loop
+        _orm_limiter = anyio.CapacityLimiter(ORM_THREADS)
+    return await anyio.to_thread.run_sync(
+        partial(_run_with_connection, function, _query_recorder.get(), *args), limiter=_orm_limiter
+    )
+
+
+async def revalidate(request: Request, response: Response, tournament_id: int | None):
+    """
+    Set ETag/Last-Modified from the tournament version and return a 304 when
+    the client's copy is current, before any heavy query runs.
+    """
+    if tournament_id is None:
+        return None
+    digest, last_modified = await run_orm(fingerprint, f'fastapi:{request.url.path}?{request.url.query}', tournament_id)
+    headers = {'ETag': quote_etag(digest), 'Last-Modified': http_date(last_modified), 'Cache-Control': 'no-cache'}
+    if_none_match = request.headers.get('if-none-match')
+    if if_none_match is not None and etag_matches(if_none_match, headers['ETag']):
+        return Response(status_code=304, headers=headers)
+    response.headers.update(headers)
+    return None
+
+
+def load_teams():
+    return TeamSerializer(Team.objects.with_contact_details(), many=True).data
+
+
+def _classifications(tournament_id=None, group=None):
+    classifications = Classification.objects.select_related('team').order_by(
+        F('position').asc(nulls_last=True), '-points', '-goals_for'
+    )
+    if tournament_id is not None:
+        classifications = classifications.filter(team__tournament_id=tournament_id)
+    if group is not None:
+        classifications = classifications.filter(team__group=group)
+    return classifications
+
+
+def load_classifications(tournament_id=None, group=None):
+    return ClassificationSerializer(_classifications(tournament_id, group), many=True).data
+
+
+def load_standings(tournament_id):
+    tournament = Tournament.objects.filter(id=tournament_id).first()
+    if tournament is None:
+        return None
+    classifications = list(_classifications(tournament_id))
+    rows = ClassificationSerializer(classifications, many=True).data
+    groups = {}
+    for classification, row in zip(classifications, rows):
+        groups.setdefault(classification.team.group or 'No Group', []).append(row)
+    return {'tournament': tournament.name, 'groups': groups}
+
+
+def load_matches(tournament_id=None, finished=None, limit=50):
+    matches = Match.objects.select_related('team1', 'team2')
+    if tournament_id is not None:
+        matches = matches.filter(team1__tournament_id=tournament_id)
+    if finished is not None:
+        matches = matches.filter(is_finished=finished)
+    return MatchSerializer(matches[:limit], many=True).data
+
+
+def load_participants():
+    participants = Participant.objects.select_related('team').filter(is_active=True)
+    return ParticipantSerializer(participants, many=True).data
+
+
+def load_gallery():
+    return GalleryImageSerializer(GalleryImage.objects.all(), many=True).data
+
+
+def load_versions(tournament_ids):
+    return dict(Tournament.objects.filter(id__in=tournament_ids).values_list('id', 'version'))
+
+
+class LiveStandings:
+    """
+    `standings` events for any number of spectators, without a thread each.
+
+    A single task polls the version of the followed tournaments, which every
+    process bumps when a change commits, and reads a re-ranked group table once
+    for all of its listeners. Results loaded by any Django process or worker
+    therefore reach the spectators within EVENTS_POLL_SECONDS.
+    """
+
+    def __init__(self):
+        self.listeners = {}  # (tournament_id, group) -> set of queues
+        self.versions = {}
+        self.task = None
+        self._ids = itertools.count(1)
+
+    def subscribe(self, tournament_id, group):
+        listener = asyncio.Queue(MAX_PENDING_EVENTS)
+        self.listeners.setdefault((tournament_id, group), set()).add(listener)
+        if self.task is None or self.task.done():
+            self.task = asyncio.create_task(self.watch())
+        return listener
+
+    def unsubscribe(self, tournament_id, group, listener):
+        listeners = self.listeners.get((tournament_id, group), set())
+        listeners.discard(listener)
+        if not listeners:
+            self.listeners.pop((tournament_id, group), None)
+
+    def subscribed(self, tournament_id, group, listener):
+        return listener in self.listeners.get((tournament_id, group), ())
+
+    async def watch(self):
+        # Not one request's queries: keep them out of its metrics
+        _query_recorder.set(None)
+        while self.listeners:
+            try:
+                await self.poll()
+            except Exception:
+                logger.exception('Could not check tournaments for live standings')
+            await asyncio.sleep(EVENTS_POLL_SECONDS)
+
+    async def poll(self):
+        versions = await run_orm(load_versions, {tournament_id for tournament_id, _ in self.listeners})
+        # Tournaments seen for the first time have nothing to report yet
+        changed = {
+            tournament_id for tournament_id, version in versions.items()
+            if self.versions.get(tournament_id, version) != version
+        }
+        self.versions = versions
+        for tournament_id, group in [key for key in self.listeners if key[0] in changed]:
+            classifications = await run_orm(group_table, tournament_id, group)
+            event = (next(self._ids), 'standings', encode_data({
+                'tournament': tournament_id, 'group': group, 'classifications': classifications,
+            }))
+            for listener in list(self.listeners.get((tournament_id, group), ())):
+                try:
+                    listener.put_nowait(event)
+                except asyncio.QueueFull:
+                    # Fell too far behind: its stream ends and EventSource reconnects
+                    self.unsubscribe(tournament_id, group, listener)
+
+    async def stream(self, tournament_id, group):
+        listener = self.subscribe(tournament_id, group)
+        try:
+            yield f'retry: {RETRY_MILLISECONDS}\n\n'
+            while self.subscribed(tournament_id, group, listener):
+                try:
+                    event = await asyncio.wait_for(listener.get(), KEEPALIVE_SECONDS)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                else:
+                    yield format_event(event)
+        finally:
+            self.unsubscribe(tournament_id, group, listener)
+
+
+live_standings = LiveStandings()
+
+
 @app.get("/")
 async def root():
     return {"message": "Foosball Tournaments FastAPI"}
 
+@app.get("/metrics", response_class=PlainTextResponse)
+async def metrics(request: Request):
+    # Same METRICS_TOKEN bearer check as the Django endpoint
+    if not scrape_allowed(request.headers.get('Authorization')):
+        return Response(status_code=401)
+    return PlainTextResponse(registry.render(), media_type=PROMETHEUS_CONTENT_TYPE)
+
 @app.get("/api/teams/")
 async def get_teams():
-    teams = Team.objects.all()
-    serializer = TeamSerializer(teams, many=True)
-    return serializer.data
+    return await run_orm(load_teams)
 
 @app.get("/api/classifications/")
-async def get_classifications():
-    classifications = Classification.objects.all()
-    serializer = ClassificationSerializer(classifications, many=True)
-    return serializer.data
+async def get_classifications(request: Request, response: Response, tournament: int | None = None, group: str | None = None):
+    not_modified = await revalidate(request, response, tournament)
+    if not_modified is not None:
+        return not_modified
+    return await run_orm(load_classifications, tournament, group)
+
+@app.get("/api/standings/{tournament_id}/")
+async def get_standings(request: Request, response: Response, tournament_id: int):
+    not_modified = await revalidate(request, response, tournament_id)
+    if not_modified is not None:
+        return not_modified
+    standings = await run_orm(load_standings, tournament_id)
+    if standings is None:
+        raise HTTPException(status_code=404, detail="Tournament not found")
+    return standings
+
+@app.get("/api/matches/")
+async def get_matches(request: Request, response: Response, tournament: int | None = None, finished: bool | None = None, limit: int = 50):
+    not_modified = await revalidate(request, response, tournament)
+    if not_modified is not None:
+        return not_modified
+    return await run_orm(load_matches, tournament, finished, min(max(limit, 1), 500))
+
+@app.get("/api/matches/recent/")
+async def get_recent_matches(request: Request, response: Response, tournament: int | None = None):
+    not_modified = await revalidate(request, response, tournament)
+    if not_modified is not None:
+        return not_modified
+    return await run_orm(load_matches, tournament, True, 10)
+
+@app.get("/api/events/")
+async def get_events(tournament: int, group: str):
+    response = StreamingResponse(live_standings.stream(tournament, group), media_type='text/event-stream')
+    response.headers['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
 
 @app.get("/api/participants/")
 async def get_participants():
-    participants = Participant.objects.filter(is_active=True)
-    serializer = ParticipantSerializer(participants, many=True)
-    return serializer.data
+    return await run_orm(load_participants)
 
 @app.get("/api/gallery/")
 async def get_gallery():
-    images = GalleryImage.objects.all()
-    serializer = GalleryImageSerializer(images, many=True)
-    return serializer.data
+    return await run_orm(load_gallery)
 
 if __name__ == "__main__":
     import uvicorn
@@ -48,6 +48,8 @@ INSTALLED_APPS = [
 INSTALLED_APPS += ['axes']
 
 MIDDLEWARE = [
+    # First, so the recorded latency includes every other middleware
+    'tournaments.metrics.MetricsMiddleware',
     'django.middleware.security.SecurityMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'axes.middleware.AxesMiddleware',
@@ -120,6 +122,59 @@ else:
     }
 
 
+# Cache
+# Local memory by default; set CACHE_URL=file:///var/tmp/foosball-cache or
+# CACHE_URL=redis://host:6379/0 to share cached responses between workers.
+CACHE_URL = config('CACHE_URL', default='locmem://')
+
+if CACHE_URL.startswith(('redis://', 'rediss://')):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': CACHE_URL,
+        }
+    }
+elif CACHE_URL.startswith('file://'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.filebased.FileBasedCache',
+            'LOCATION': CACHE_URL[len('file://'):],
+        }
+    }
+else:
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.locmem.LocMemCache',
+            'LOCATION': 'foosball-tournaments',
+        }
+    }
+
+# Seconds a cached standings/teams/matches response is kept; model signals
+# invalidate it earlier whenever the underlying data changes
+RESPONSE_CACHE_TIMEOUT = config('RESPONSE_CACHE_TIMEOUT', default=300, cast=int)
+
+# Request metrics are scraped from /metrics with `Authorization: Bearer <token>`;
+# without METRICS_TOKEN they are only served when DEBUG is on. Statements slower
+# than METRICS_SLOW_QUERY_MS are sampled, and METRICS_SERVER_TIMING adds a
+# Server-Timing header to responses.
+METRICS_TOKEN = config('METRICS_TOKEN', default='')
+METRICS_SLOW_QUERY_MS = config('METRICS_SLOW_QUERY_MS', default=100, cast=int)
+METRICS_SERVER_TIMING = config('METRICS_SERVER_TIMING', default=DEBUG, cast=bool)
+
+# Live standings are streamed by the FastAPI app (/api/events/). The in-process
+# Django stream holds a server thread per listener: enable it for development only.
+LIVE_EVENTS_IN_PROCESS = config('LIVE_EVENTS_IN_PROCESS', default=False, cast=bool)
+
+# Background jobs (recompute standings, fixtures, imports, exports) are queued in
+# the database and run by `python manage.py run_jobs`. A failed attempt is retried
+# after JOB_RETRY_DELAY seconds, doubling each time, up to JOB_MAX_ATTEMPTS; a
+# running job whose worker has sent no heartbeat (every quarter of
+# JOB_LOCK_TIMEOUT) for JOB_LOCK_TIMEOUT seconds is handed to another worker.
+JOB_MAX_ATTEMPTS = config('JOB_MAX_ATTEMPTS', default=3, cast=int)
+JOB_RETRY_DELAY = config('JOB_RETRY_DELAY', default=30, cast=int)
+JOB_LOCK_TIMEOUT = config('JOB_LOCK_TIMEOUT', default=600, cast=int)
+
+
 # Password validation
 # https://docs.djangoproject.com/en/4.2/ref/settings/#auth-password-validators
 
@@ -175,10 +230,18 @@ REST_FRAMEWORK = {
         'rest_framework.authentication.SessionAuthentication',
     ],
     'DEFAULT_RENDERER_CLASSES': [
-        'rest_framework.renderers.JSONRenderer',
+        'tournaments.renderers.FastJSONRenderer',
     ],
+    'DEFAULT_PAGINATION_CLASS': 'tournaments.pagination.CreatedAtCursorPagination',
+    'PAGE_SIZE': 100,
 }
 
+# Classification tie-breakers, applied in order (see tournaments/ranking.py)
+CLASSIFICATION_TIE_BREAKERS = ['points', 'goal_difference', 'goals_for', 'head_to_head']
+
+# Elo K-factor: how many rating points a single result can move (see tournaments/ratings.py)
+RATING_K_FACTOR = config('RATING_K_FACTOR', default=32, cast=float)
+
 # CORS settings
 CORS_ALLOWED_ORIGINS = [
     "http://localhost:3000",
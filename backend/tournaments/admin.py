@@ -1,5 +1,5 @@
 from django.contrib import admin
-from .models import Team, Classification, Participant, GalleryImage, Match, MatchSeries
+from .models import Team, Classification, Participant, GalleryImage, Match, MatchSeries, Job
 
 
 def assign_to_group_a(modeladmin, request, queryset):
@@ -83,3 +83,14 @@ class GalleryImageAdmin(admin.ModelAdmin):
     list_filter = ['uploaded_at']
     search_fields = ['title', 'description']
     ordering = ['order', '-uploaded_at']
+
+
+@admin.register(Job)
+class JobAdmin(admin.ModelAdmin):
+    list_display = ['id', 'kind', 'tournament', 'status', 'progress', 'attempts', 'created_at', 'finished_at']
+    list_filter = ['status', 'kind']
+    search_fields = ['idempotency_key', 'error']
+    ordering = ['-created_at']
+    # Parameters of pending team imports hold plain-text passwords
+    exclude = ['params']
+    readonly_fields = ['result', 'error', 'locked_by', 'locked_at', 'started_at', 'finished_at']
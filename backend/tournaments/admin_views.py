@@ -1,4 +1,3 @@
-import random
 from rest_framework import status
 from rest_framework.decorators import api_view, permission_classes
 from rest_framework.permissions import IsAuthenticated, AllowAny
@@ -6,9 +5,23 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.decorators import user_passes_test
-from django.db import transaction
-from .models import Tournament, Team
-from .serializers import TournamentSerializer, TeamSerializer
+from django.core.files.storage import default_storage
+from django.http import FileResponse
+from django.utils.http import quote_etag
+from .draw import DrawError, draw_tournament_groups
+from .exports import ExportError, export_response
+from .ingestion import IngestionError, ingest_match_results, parse_rows, validate_results
+from .jobs import IdempotencyConflict, JobError, enqueue, job_data, retry
+from .models import Tournament, Team, Job
+from .pagination import OptionalLimitOffsetPagination
+from .serializers import TournamentSerializer, TeamSerializer, MatchSerializer
+from .ranking import update_tournament_positions
+from .ratings import recompute_ratings
+from .registration import import_teams, validate_team_rows
+from .response_cache import conditional_response, fingerprint, invalidate_tournaments, set_validators
+from .scheduling import SchedulingError, generate_group_fixtures, generate_knockout_bracket
+from .standings import recompute_standings
+from .utils import team_counts_by_group
 
 
 def is_admin_user(user):
@@ -84,8 +97,15 @@ def create_tournament(request):
 def get_tournament_teams(request, tournament_id):
     """Admin-only: Get teams by group within a tournament"""
     try:
+        # Revalidated against the tournament version before any team is read
+        digest, last_modified = fingerprint(f'get_tournament_teams:{request.get_full_path()}', tournament_id)
+        etag = quote_etag(digest)
+        not_modified = conditional_response(request, etag, last_modified)
+        if not_modified is not None:
+            return not_modified
+        
         tournament = Tournament.objects.get(id=tournament_id)
-        teams = Team.objects.filter(tournament=tournament).order_by('group', 'name')
+        teams = Team.objects.with_contact_details().filter(tournament=tournament).order_by('group', 'name')
         
         # Group teams by their group
         teams_by_group = {}
@@ -99,12 +119,12 @@ def get_tournament_teams(request, tournament_id):
             else:
                 teams_without_group.append(TeamSerializer(team).data)
         
-        return Response({
+        return set_validators(Response({
             'tournament': TournamentSerializer(tournament).data,
             'teams_by_group': teams_by_group,
             'teams_without_group': teams_without_group,
-            'total_teams': teams.count()
-        }, status=status.HTTP_200_OK)
+            'total_teams': len(teams)
+        }, status=status.HTTP_200_OK), etag, last_modified)
         
     except Tournament.DoesNotExist:
         return Response({
@@ -130,27 +150,49 @@ def assign_team_groups(request, tournament_id):
                 'error': 'No team assignments provided'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        updated_teams = []
-        
-        with transaction.atomic():
-            for assignment in team_assignments:
-                team_id = assignment.get('team_id')
-                group = assignment.get('group')
-                
-                if not team_id or not group:
-                    return Response({
-                        'error': 'Each assignment must have team_id and group'
-                    }, status=status.HTTP_400_BAD_REQUEST)
-                
-                try:
-                    team = Team.objects.get(id=team_id, tournament=tournament)
-                    team.group = group
-                    team.save()
-                    updated_teams.append(TeamSerializer(team).data)
-                except Team.DoesNotExist:
-                    return Response({
-                        'error': f'Team with id {team_id} not found in tournament {tournament.name}'
-                    }, status=status.HTTP_404_NOT_FOUND)
+        # Validate the whole payload before touching the database
+        groups_by_team_id = {}
+        for assignment in team_assignments:
+            team_id = assignment.get('team_id') if isinstance(assignment, dict) else None
+            group = assignment.get('group') if isinstance(assignment, dict) else None
+            
+            if not team_id or not group:
+                return Response({
+                    'error': 'Each assignment must have team_id and group'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            
+            try:
+                groups_by_team_id[int(team_id)] = str(group)
+            except (TypeError, ValueError):
+                return Response({
+                    'error': f'Invalid team_id {team_id}'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        
+        max_length = Team._meta.get_field('group').max_length
+        too_long = sorted({group for group in groups_by_team_id.values() if len(group) > max_length})
+        if too_long:
+            return Response({
+                'error': f'Group names must be at most {max_length} characters: {", ".join(too_long)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        teams = list(
+            Team.objects.with_contact_details().filter(tournament=tournament, id__in=groups_by_team_id)
+        )
+        missing = sorted(set(groups_by_team_id) - {team.id for team in teams})
+        if missing:
+            return Response({
+                'error': f'Team with id {missing[0]} not found in tournament {tournament.name}'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        # Answer in payload order
+        order = {team_id: index for index, team_id in enumerate(groups_by_team_id)}
+        teams.sort(key=lambda team: order[team.id])
+        for team in teams:
+            team.group = groups_by_team_id[team.id]
+        Team.objects.bulk_update(teams, ['group'])
+        invalidate_tournaments([tournament.id])
+        
+        updated_teams = TeamSerializer(teams, many=True).data
         
         return Response({
             'message': f'Successfully assigned {len(updated_teams)} teams to groups',
@@ -171,40 +213,42 @@ def assign_team_groups(request, tournament_id):
 @permission_classes([IsAuthenticated])
 @user_passes_test(is_admin_user)
 def randomly_assign_groups(request, tournament_id):
-    """Admin-only: Randomly assign groups to teams without groups"""
+    """Admin-only: Draw teams without groups into balanced, seeded groups"""
     try:
         tournament = Tournament.objects.get(id=tournament_id)
         available_groups = request.data.get('groups', ['A', 'B', 'C'])
+        seed = request.data.get('seed')
         
-        # Get teams without groups
-        teams_without_group = Team.objects.filter(
-            tournament=tournament,
-            group__isnull=True
-        ) | Team.objects.filter(
-            tournament=tournament,
-            group=''
-        )
+        try:
+            drawn_teams, seed = draw_tournament_groups(
+                tournament,
+                available_groups,
+                seed=None if seed is None else int(seed),
+                seeding=request.data.get('seeding', 'classification'),
+                separate=request.data.get('separate', []),
+                redraw=bool(request.data.get('redraw', False)),
+            )
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'seed must be an integer and separate a list of team id lists'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        except DrawError as e:
+            return Response({
+                'error': str(e)
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        if not teams_without_group.exists():
+        if not drawn_teams:
             return Response({
                 'message': 'No teams without groups found',
                 'assigned_teams': []
             }, status=status.HTTP_200_OK)
         
-        updated_teams = []
-        
-        with transaction.atomic():
-            for team in teams_without_group:
-                # Randomly assign a group
-                assigned_group = random.choice(available_groups)
-                team.group = assigned_group
-                team.save()
-                updated_teams.append(TeamSerializer(team).data)
-        
         return Response({
-            'message': f'Successfully randomly assigned {len(updated_teams)} teams to groups',
-            'assigned_teams': updated_teams,
-            'available_groups': available_groups
+            'message': f'Successfully randomly assigned {len(drawn_teams)} teams to groups',
+            'assigned_teams': TeamSerializer(drawn_teams, many=True).data,
+            'available_groups': available_groups,
+            'group_sizes': team_counts_by_group([tournament.id])[tournament.id],
+            'seed': seed
         }, status=status.HTTP_200_OK)
         
     except Tournament.DoesNotExist:
@@ -223,29 +267,387 @@ def randomly_assign_groups(request, tournament_id):
 def list_tournaments(request):
     """Admin-only: List all tournaments with team counts"""
     try:
-        tournaments = Tournament.objects.all().order_by('-created_at')
+        tournaments, pagination = OptionalLimitOffsetPagination().paginate(
+            Tournament.objects.all().order_by('-created_at'), request
+        )
+        
+        # Count teams by group for the whole page in one query
+        counts = team_counts_by_group([tournament.id for tournament in tournaments])
         tournament_data = []
         
         for tournament in tournaments:
-            teams_count = Team.objects.filter(tournament=tournament).count()
-            teams_by_group = {}
-            
-            # Count teams by group
-            for team in Team.objects.filter(tournament=tournament):
-                group = team.group or 'No Group'
-                teams_by_group[group] = teams_by_group.get(group, 0) + 1
-            
+            teams_by_group = counts[tournament.id]
             tournament_info = TournamentSerializer(tournament).data
-            tournament_info['teams_count'] = teams_count
+            tournament_info['teams_count'] = sum(teams_by_group.values())
             tournament_info['teams_by_group'] = teams_by_group
             tournament_data.append(tournament_info)
         
         return Response({
             'tournaments': tournament_data,
-            'total_tournaments': len(tournament_data)
+            'total_tournaments': pagination.get('count', len(tournament_data)),
+            **pagination
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
         return Response({
             'error': f'Failed to list tournaments: {str(e)}'
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def recompute_tournament_standings(request, tournament_id):
+    """Admin-only: Rebuild all classifications of a tournament from its matches"""
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        updated_count = recompute_standings(tournament)
+        update_tournament_positions(tournament)
+        
+        return Response({
+            'message': f'Recomputed standings for tournament "{tournament.name}"',
+            'updated_classifications': updated_count
+        }, status=status.HTTP_200_OK)
+        
+    except Tournament.DoesNotExist:
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to recompute standings: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def recompute_team_ratings(request):
+    """Admin-only: Replay every finished match to rebuild team ratings"""
+    try:
+        replayed_count = recompute_ratings()
+        
+        return Response({
+            'message': f'Recomputed ratings from {replayed_count} finished matches',
+            'replayed_matches': replayed_count
+        }, status=status.HTTP_200_OK)
+        
+    except Exception as e:
+        return Response({
+            'error': f'Failed to recompute ratings: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def bulk_load_match_results(request, tournament_id):
+    """Admin-only: Load a whole matchday of results from JSON or an uploaded CSV/JSON-lines file"""
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is not None:
+            rows = parse_rows(uploaded_file)
+        else:
+            rows = request.data.get('results', [])
+        
+        if not rows or not isinstance(rows, list):
+            return Response({
+                'error': 'Provide a non-empty "results" list or a CSV/JSON-lines "file"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        results, errors = validate_results(tournament, rows)
+        if errors:
+            return Response({
+                'error': f'{len(errors)} of {len(rows)} results are invalid, nothing was loaded',
+                'details': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        matches = ingest_match_results(tournament, results)
+        
+        return Response({
+            'message': f'Successfully loaded {len(matches)} match results',
+            'matches': MatchSerializer(matches, many=True).data
+        }, status=status.HTTP_201_CREATED)
+        
+    except Tournament.DoesNotExist:
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except IngestionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to load match results: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def generate_fixtures(request, tournament_id):
+    """Admin-only: Generate the group round-robin or the knockout bracket of a tournament"""
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        stage = request.data.get('stage', 'groups')
+        
+        try:
+            if stage == 'groups':
+                created = generate_group_fixtures(tournament, legs=int(request.data.get('legs', 1)))
+            elif stage == 'knockout':
+                created = generate_knockout_bracket(
+                    tournament, qualifiers_per_group=int(request.data.get('qualifiers_per_group', 2))
+                )
+            else:
+                return Response({
+                    'error': 'Stage must be "groups" or "knockout"'
+                }, status=status.HTTP_400_BAD_REQUEST)
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'legs and qualifiers_per_group must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        return Response({
+            'message': f'Generated {created["matches"]} {stage} fixtures for tournament "{tournament.name}"',
+            **created
+        }, status=status.HTTP_201_CREATED)
+        
+    except Tournament.DoesNotExist:
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except SchedulingError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to generate fixtures: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def export_tournament_data(request, tournament_id, dataset, export_format):
+    """Admin-only: Stream a tournament's teams, participants, matches or standings as CSV, JSON lines or XLSX"""
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        return export_response(tournament, dataset, export_format)
+        
+    except Tournament.DoesNotExist:
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except ExportError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to export tournament: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def bulk_import_teams(request, tournament_id):
+    """Admin-only: Pre-register teams and their participants from JSON or an uploaded CSV/JSON-lines file"""
+    try:
+        tournament = Tournament.objects.get(id=tournament_id)
+        
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is not None:
+            rows = parse_rows(uploaded_file)
+        else:
+            rows = request.data.get('teams', [])
+        
+        if not rows or not isinstance(rows, list):
+            return Response({
+                'error': 'Provide a non-empty "teams" list or a CSV/JSON-lines "file"'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        entries, errors = validate_team_rows(tournament, rows)
+        if errors:
+            return Response({
+                'error': f'{len(errors)} of {len(rows)} teams are invalid, nothing was imported',
+                'details': errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        teams, _ = import_teams(tournament, entries)
+        
+        return Response({
+            'message': f'Successfully imported {len(teams)} teams into tournament "{tournament.name}"',
+            'teams': [
+                {'id': team.id, 'name': team.name, 'group': team.group, 'username': team.user.username}
+                for team in teams
+            ]
+        }, status=status.HTTP_201_CREATED)
+        
+    except Tournament.DoesNotExist:
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except IngestionError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to import teams: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def submit_job(request):
+    """Admin-only: Queue a background job; an Idempotency-Key header makes resubmitting safe"""
+    try:
+        kind = request.data.get('kind')
+        tournament_id = request.data.get('tournament')
+        tournament = Tournament.objects.get(id=tournament_id) if tournament_id not in (None, '') else None
+        
+        params = request.data.get('params')
+        params = dict(params) if isinstance(params, dict) else {}
+        uploaded_file = request.FILES.get('file')
+        if uploaded_file is not None:
+            params['teams'] = parse_rows(uploaded_file)
+        
+        job, created = enqueue(
+            kind, tournament, params,
+            idempotency_key=request.headers.get('Idempotency-Key') or request.data.get('idempotency_key'),
+            user=request.user,
+        )
+        
+        return Response({
+            'message': f'Queued job #{job.id}' if created else f'Job #{job.id} was already submitted',
+            'job': job_data(job)
+        }, status=status.HTTP_202_ACCEPTED if created else status.HTTP_200_OK)
+        
+    except (Tournament.DoesNotExist, ValueError, TypeError):
+        return Response({
+            'error': 'Tournament not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except IdempotencyConflict as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_409_CONFLICT)
+    except (JobError, IngestionError) as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to queue job: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def list_jobs(request):
+    """Admin-only: List background jobs, newest first, filtered by ?tournament=, ?status= and ?kind="""
+    try:
+        jobs = Job.objects.all()
+        for field in ('tournament', 'status', 'kind'):
+            value = request.query_params.get(field)
+            if value:
+                jobs = jobs.filter(**{field: value})
+        jobs, pagination = OptionalLimitOffsetPagination().paginate(jobs, request)
+        
+        return Response({
+            'jobs': [job_data(job) for job in jobs],
+            'total_jobs': pagination.get('count', len(jobs)),
+            **pagination
+        }, status=status.HTTP_200_OK)
+        
+    except (ValueError, TypeError):
+        return Response({
+            'error': 'tournament must be an id'
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to list jobs: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def get_job(request, job_id):
+    """Admin-only: Status, progress and result of a background job"""
+    try:
+        job = Job.objects.get(id=job_id)
+        return Response({'job': job_data(job)}, status=status.HTTP_200_OK)
+        
+    except Job.DoesNotExist:
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to get job: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['POST'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def retry_job(request, job_id):
+    """Admin-only: Queue a failed background job again"""
+    try:
+        job = retry(Job.objects.get(id=job_id))
+        
+        return Response({
+            'message': f'Queued job #{job.id} again',
+            'job': job_data(job)
+        }, status=status.HTTP_202_ACCEPTED)
+        
+    except Job.DoesNotExist:
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except JobError as e:
+        return Response({
+            'error': str(e)
+        }, status=status.HTTP_400_BAD_REQUEST)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to retry job: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
+
+
+@api_view(['GET'])
+@permission_classes([IsAuthenticated])
+@user_passes_test(is_admin_user)
+def download_job_file(request, job_id):
+    """Admin-only: Download the file written by a finished export job"""
+    try:
+        job = Job.objects.get(id=job_id)
+        if job.status != Job.SUCCEEDED or not (job.result or {}).get('file'):
+            return Response({
+                'error': 'This job has no file to download'
+            }, status=status.HTTP_404_NOT_FOUND)
+        
+        return FileResponse(
+            default_storage.open(job.result['file'], 'rb'), as_attachment=True,
+            filename=job.result['filename'], content_type=job.result['content_type']
+        )
+        
+    except Job.DoesNotExist:
+        return Response({
+            'error': 'Job not found'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except FileNotFoundError:
+        return Response({
+            'error': 'The export file no longer exists'
+        }, status=status.HTTP_404_NOT_FOUND)
+    except Exception as e:
+        return Response({
+            'error': f'Failed to download job file: {str(e)}'
+        }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
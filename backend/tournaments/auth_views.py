@@ -5,9 +5,24 @@ from rest_framework.response import Response
 from rest_framework.authtoken.models import Token
 from django.contrib.auth import authenticate
 from django.contrib.auth.models import User
-from django.db import transaction, models
+from django.db import transaction
+from django.db.models import F, Q
 from .models import Tournament, Team, Participant, Match, Classification
 from .serializers import TournamentSerializer, TeamSerializer, MatchSerializer
+from .pagination import OptionalLimitOffsetPagination, PlayedAtCursorPagination
+from .events import publish_results
+from .ranking import update_group_positions
+from .ratings import apply_match_ratings
+from .registration import assign_usernames
+from .response_cache import invalidate_tournaments
+from .scheduling import record_results, scheduled_opponents
+from .signals import standings_changed
+from .standings import apply_match_result, ensure_classifications
+from .streaming import STREAM_CHUNK_SIZE, STREAM_FORMATS, streaming_response
+from .utils import team_counts_by_group
+
+# Tournaments offered when a team name is ambiguous at login
+MAX_LOGIN_CANDIDATES = 20
 
 
 @api_view(['POST'])
@@ -48,16 +63,14 @@ def register_team(request):
                 }, status=status.HTTP_400_BAD_REQUEST)
         
         # Check if team name already exists in this tournament
-        if Team.objects.filter(name=team_name, tournament=tournament).exists():
+        if Team.objects.for_tournament(tournament).filter(name=team_name).exists():
             return Response({
                 'error': f'Team name already exists in tournament "{tournament.name}"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         with transaction.atomic():
             # Create user account
-            username = team_name.lower().replace(' ', '_')
-            if User.objects.filter(username=username).exists():
-                username = f"{username}_{Team.objects.count()}"
+            username, = assign_usernames([team_name], tournament.id)
             
             user = User.objects.create_user(
                 username=username,
@@ -109,21 +122,35 @@ def login_team(request):
                 'error': 'Team name and password are required'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Find team and get username
-        try:
-            team = Team.objects.get(name=team_name)
-            username = team.user.username
-        except Team.DoesNotExist:
+        # Team names are only unique per tournament. Resolve the single login
+        # first: django-axes counts every failed authenticate() call, so trying
+        # each team with that name would lock out legitimate users.
+        teams = Team.objects.filter(name=team_name, user__isnull=False)
+        tournament_id = request.data.get('tournament_id')
+        if tournament_id not in (None, ''):
+            if not str(tournament_id).isdigit():
+                return Response({
+                    'error': 'tournament_id must be an id'
+                }, status=status.HTTP_400_BAD_REQUEST)
+            teams = teams.filter(tournament_id=tournament_id)
+        candidates = list(teams.values('user__username', 'tournament', 'tournament__name')[:MAX_LOGIN_CANDIDATES])
+        if len(candidates) > 1:
             return Response({
-                'error': 'Invalid team name or password'
-            }, status=status.HTTP_401_UNAUTHORIZED)
+                'error': 'Several teams use this name, choose your tournament',
+                'tournaments': [
+                    {'id': candidate['tournament'], 'name': candidate['tournament__name']}
+                    for candidate in candidates
+                ]
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Authenticate user
-        user = authenticate(request=request, username=username, password=password)
+        user = None
+        if candidates:
+            user = authenticate(request=request, username=candidates[0]['user__username'], password=password)
         if user is None:
             return Response({
                 'error': 'Invalid team name or password'
             }, status=status.HTTP_401_UNAUTHORIZED)
+        team = Team.objects.with_contact_details().get(user=user)
         
         # Get or create token
         token, created = Token.objects.get_or_create(user=user)
@@ -160,7 +187,7 @@ def logout_team(request):
 def get_user_team(request):
     """Get current user's team information"""
     try:
-        team = request.user.team
+        team = Team.objects.with_contact_details().get(user=request.user)
         return Response({
             'team': TeamSerializer(team).data
         }, status=status.HTTP_200_OK)
@@ -177,23 +204,25 @@ def get_user_team(request):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_opponent_teams(request):
-    """Get list of teams that can be played against (same group, excluding own team)"""
+    """Get list of teams that can be played against (same group or a scheduled fixture, excluding own team)"""
     try:
         user_team = request.user.team
-        opponent_teams = Team.objects.filter(
-            group=user_team.group
-        ).exclude(id=user_team.id)
-        
-        teams_data = []
-        for team in opponent_teams:
-            teams_data.append({
-                'id': team.id,
-                'name': team.name,
-                'group': team.group
-            })
+        if not user_team.tournament_id:
+            return Response({
+                'teams': []
+            }, status=status.HTTP_200_OK)
+        
+        # Knockout fixtures pair teams from different groups
+        opponents = Q(id__in=scheduled_opponents(user_team))
+        if user_team.group:
+            opponents |= Q(group=user_team.group)
+        # Served by the (tournament, group, name) index, without building model instances
+        opponent_teams = Team.objects.for_tournament(user_team.tournament_id).filter(
+            opponents
+        ).exclude(id=user_team.id).values('id', 'name', 'group')
         
         return Response({
-            'teams': teams_data
+            'teams': list(opponent_teams)
         }, status=status.HTTP_200_OK)
         
     except Team.DoesNotExist:
@@ -224,31 +253,47 @@ def load_match_result(request):
             }, status=status.HTTP_400_BAD_REQUEST)
         
         try:
-            opponent_team = Team.objects.get(id=opponent_team_id)
-        except Team.DoesNotExist:
+            opponent_team = Team.objects.for_tournament(user_team.tournament_id).only(
+                'id', 'name', 'group', 'tournament_id'
+            ).get(id=opponent_team_id)
+        except (Team.DoesNotExist, ValueError):
             return Response({
-                'error': 'Opponent team not found'
+                'error': 'Opponent team not found in your tournament'
             }, status=status.HTTP_404_NOT_FOUND)
         
-        # Check if teams are in same group
-        if user_team.group != opponent_team.group:
+        # Teams play within their group, or a scheduled (knockout) fixture
+        same_group = bool(user_team.group) and user_team.group == opponent_team.group
+        if opponent_team.id == user_team.id or not (
+            same_group or opponent_team.id in scheduled_opponents(user_team)
+        ):
             return Response({
-                'error': 'Can only play against teams in the same group'
+                'error': 'Can only play against teams in the same group or a scheduled opponent'
             }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Create match
-        match = Match.objects.create(
-            team1=user_team,
-            team2=opponent_team,
-            team1_goals=user_goals,
-            team2_goals=opponent_goals,
-            is_finished=True
-        )
+        try:
+            user_goals = int(user_goals)
+            opponent_goals = int(opponent_goals)
+        except (TypeError, ValueError):
+            return Response({
+                'error': 'Goals must be integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        if user_goals < 0 or opponent_goals < 0:
+            # Would otherwise hit the match_goals_non_negative constraint
+            return Response({
+                'error': 'Goals must be non-negative integers'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
-        # Update classifications
-        from .utils import update_team_classification
-        update_team_classification(user_team, user_goals, opponent_goals)
-        update_team_classification(opponent_team, opponent_goals, user_goals)
+        with transaction.atomic():
+            # Fill the scheduled fixture between both teams, or create the match
+            match, = record_results([(user_team, opponent_team, user_goals, opponent_goals)])
+            
+            # Update both classifications in a single statement
+            apply_match_result(match)
+            apply_match_ratings([match])
+            for group in {user_team.group, opponent_team.group} - {None, ''}:
+                update_group_positions(user_team.tournament_id, group)
+        standings_changed.send(sender=Match, tournament_ids=[user_team.tournament_id])
+        publish_results(user_team.tournament_id, [match])
         
         return Response({
             'message': 'Match result loaded successfully',
@@ -265,18 +310,69 @@ def load_match_result(request):
         }, status=status.HTTP_500_INTERNAL_SERVER_ERROR)
 
 
+# Columns of the my-matches feed, in CSV order
+TEAM_MATCH_FIELDS = [
+    'id', 'played_at', 'is_finished', 'team1', 'team1_name', 'team2', 'team2_name', 'goals1', 'goals2',
+    'opponent', 'opponent_name', 'goals_for', 'goals_against', 'result',
+]
+
+
+def team_match_rows(team_id, matches):
+    """Add the team's point of view (opponent, goals for/against, W/D/L) to match value rows"""
+    for match in matches:
+        home = match['team1'] == team_id
+        goals_for, goals_against = (match['goals1'], match['goals2']) if home else (match['goals2'], match['goals1'])
+        result = None
+        if match['is_finished']:
+            result = 'W' if goals_for > goals_against else 'L' if goals_for < goals_against else 'D'
+        match.update({
+            'opponent': match['team2'] if home else match['team1'],
+            'opponent_name': match['team2_name'] if home else match['team1_name'],
+            'goals_for': goals_for,
+            'goals_against': goals_against,
+            'result': result,
+        })
+        yield match
+
+
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_team_matches(request):
-    """Get all matches for the user's team"""
+    """
+    Get the matches of the user's team, newest first.
+
+    Paginated with ?page_size= and the `next` cursor; ?stream=jsonl or
+    ?stream=csv streams the whole history instead.
+    """
     try:
         user_team = request.user.team
-        matches = Match.objects.filter(
-            models.Q(team1=user_team) | models.Q(team2=user_team)
-        ).order_by('-created_at')
+        stream_format = request.query_params.get('stream')
+        if stream_format is not None and stream_format not in STREAM_FORMATS:
+            return Response({
+                'error': f'stream must be one of: {", ".join(STREAM_FORMATS)}'
+            }, status=status.HTTP_400_BAD_REQUEST)
+        
+        # Team names come from the JOIN, no model instances are built
+        matches = Match.objects.for_team(user_team).order_by('-played_at', '-id').values(
+            'id', 'played_at', 'is_finished', 'team1', 'team2', 'goals1', 'goals2',
+            team1_name=F('team1__name'), team2_name=F('team2__name'),
+        )
+        
+        if stream_format is not None:
+            return streaming_response(
+                team_match_rows(user_team.id, matches.iterator(chunk_size=STREAM_CHUNK_SIZE)),
+                stream_format,
+                TEAM_MATCH_FIELDS,
+                f'matches-team-{user_team.id}',
+            )
+        
+        paginator = PlayedAtCursorPagination()
+        page = paginator.paginate_queryset(matches, request)
         
         return Response({
-            'matches': MatchSerializer(matches, many=True).data
+            'matches': list(team_match_rows(user_team.id, page)),
+            'next': paginator.get_next_link(),
+            'previous': paginator.get_previous_link()
         }, status=status.HTTP_200_OK)
         
     except Team.DoesNotExist:
@@ -316,18 +412,19 @@ def assign_team_to_tournament(request):
             }, status=status.HTTP_404_NOT_FOUND)
         
         # Check if team name already exists in the target tournament
-        if Team.objects.filter(name=team.name, tournament=tournament).exclude(id=team.id).exists():
+        if Team.objects.for_tournament(tournament).filter(name=team.name).exclude(id=team.id).exists():
             return Response({
                 'error': f'A team with name "{team.name}" already exists in tournament "{tournament.name}"'
             }, status=status.HTTP_400_BAD_REQUEST)
         
         # Assign team to tournament
+        previous_tournament_id = team.tournament_id
         team.tournament = tournament
         team.save()
+        invalidate_tournaments([previous_tournament_id])
         
-        # Create or update classification for the team
-        from .utils import update_team_classification
-        update_team_classification(team, 0, 0)  # Initialize with 0 wins and 0 losses
+        # Create the classification for the team if it does not exist yet
+        ensure_classifications([team.id])
         
         return Response({
             'message': f'Team "{team.name}" successfully assigned to tournament "{tournament.name}"',
@@ -345,17 +442,20 @@ def assign_team_to_tournament(request):
 def get_available_tournaments(request):
     """Get list of available tournaments for team assignment"""
     try:
-        tournaments = Tournament.objects.all().order_by('-created_at')
+        tournaments, pagination = OptionalLimitOffsetPagination().paginate(
+            Tournament.objects.all().order_by('-created_at'), request
+        )
+        counts = team_counts_by_group([tournament.id for tournament in tournaments])
         tournament_data = []
         
         for tournament in tournaments:
-            teams_count = Team.objects.filter(tournament=tournament).count()
             tournament_info = TournamentSerializer(tournament).data
-            tournament_info['teams_count'] = teams_count
+            tournament_info['teams_count'] = sum(counts[tournament.id].values())
             tournament_data.append(tournament_info)
         
         return Response({
-            'tournaments': tournament_data
+            'tournaments': tournament_data,
+            **pagination
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
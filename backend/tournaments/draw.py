@@ -0,0 +1,120 @@
+import random
+from collections import defaultdict
+
+from .models import Classification, Team
+from .response_cache import invalidate_tournaments
+
+
+class DrawError(Exception):
+    """Raised when a group draw is impossible with the given groups and constraints"""
+
+
+def _classification_strength(team):
+    try:
+        classification = team.classification
+    except Classification.DoesNotExist:
+        return (False, 0, 0, 0)
+    return (True, classification.points, classification.goal_difference, classification.goals_for)
+
+
+# Strength of a team for each seeding mode, higher is stronger
+SEEDINGS = {
+    'rating': lambda team: team.rating,
+    'classification': _classification_strength,
+    'random': lambda team: 0,
+}
+
+
+def seed_order(teams, seeding, rng):
+    """Teams strongest first; ties (and the 'random' mode) are shuffled with rng"""
+    if seeding not in SEEDINGS:
+        raise DrawError(f'Unknown seeding "{seeding}", use one of: {", ".join(SEEDINGS)}')
+    teams = list(teams)
+    rng.shuffle(teams)
+    teams.sort(key=SEEDINGS[seeding], reverse=True)
+    return teams
+
+
+def draw_groups(teams, groups, rng, seeding='classification', separate=(), existing=None):
+    """
+    Distribute teams over groups with snake seeding.
+
+    Teams are cut into pots of len(groups) by strength and each pot is drawn in
+    random order. Every team goes to the smallest group, walking the groups
+    left to right on even rounds and right to left on odd ones, so strong teams
+    are spread out and sizes differ by at most one (unless a constraint leaves
+    no other choice). `separate` is a list of team id collections that must end
+    up in different groups; `existing` maps group -> team ids already there.
+
+    Returns {team_id: group}.
+    """
+    groups = list(dict.fromkeys(groups))
+    if not groups:
+        raise DrawError('At least one group is required')
+
+    ordered = seed_order(teams, seeding, rng)
+    pots = [ordered[index:index + len(groups)] for index in range(0, len(ordered), len(groups))]
+    for pot in pots:
+        rng.shuffle(pot)
+
+    rivals = defaultdict(set)
+    for team_ids in separate:
+        team_ids = set(team_ids)
+        for team_id in team_ids:
+            rivals[team_id] |= team_ids - {team_id}
+
+    members = {group: set((existing or {}).get(group, ())) for group in groups}
+    assignments = {}
+    for pot in pots:
+        for team in pot:
+            allowed = [group for group in groups if not members[group] & rivals[team.id]]
+            if not allowed:
+                raise DrawError(f'Team "{team.name}" conflicts with every group')
+            smallest = min(len(members[group]) for group in allowed)
+            candidates = [group for group in allowed if len(members[group]) == smallest]
+            if smallest % 2:
+                candidates.reverse()
+            group = candidates[0]
+            members[group].add(team.id)
+            assignments[team.id] = group
+    return assignments
+
+
+def draw_tournament_groups(tournament, groups, seed=None, seeding='classification', separate=(), redraw=False):
+    """
+    Draw the teams of a tournament into groups and save them with one bulk_update.
+
+    Only teams without a group are drawn unless `redraw` is set; teams already
+    placed count towards group sizes and constraints. The same seed always
+    yields the same draw. Returns (teams, seed) with the drawn teams loaded
+    for TeamSerializer.
+    """
+    invalid = [group for group in groups if not group or len(str(group)) > Team._meta.get_field('group').max_length]
+    if invalid:
+        raise DrawError(f'Invalid group names: {", ".join(map(str, invalid))}')
+    separate = [[int(team_id) for team_id in team_ids] for team_ids in separate]
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+    rng = random.Random(seed)
+
+    teams = list(
+        Team.objects.with_contact_details().select_related('classification')
+        .for_tournament(tournament).order_by('id')
+    )
+    if redraw:
+        to_draw, placed = teams, []
+    else:
+        to_draw = [team for team in teams if not team.group]
+        placed = [team for team in teams if team.group]
+
+    existing = defaultdict(set)
+    for team in placed:
+        existing[team.group].add(team.id)
+
+    assignments = draw_groups(to_draw, groups, rng, seeding, separate, existing)
+    for team in to_draw:
+        team.group = assignments[team.id]
+
+    Team.objects.bulk_update(to_draw, ['group'])
+    invalidate_tournaments([tournament.id])
+    return to_draw, seed
@@ -0,0 +1,176 @@
+import itertools
+import queue
+import threading
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.db import transaction
+from django.db.models import F
+
+from .models import Classification
+from .serializers import ClassificationSerializer
+from .standings import aggregate_deltas
+
+# Events a spectator may fall behind by before its stream is closed; the
+# browser's EventSource reconnects and the page reloads the tables
+MAX_PENDING_EVENTS = 100
+
+# Seconds between comment lines that keep idle connections (and proxies) open
+KEEPALIVE_SECONDS = 15
+
+# Reconnection delay suggested to EventSource clients, in milliseconds
+RETRY_MILLISECONDS = 5000
+
+
+class Subscription:
+    """One listener's queue of events for a tournament and, optionally, a single group"""
+
+    def __init__(self, broker, tournament_id=None, group=None, max_pending=MAX_PENDING_EVENTS):
+        self.broker = broker
+        self.tournament_id = tournament_id
+        self.group = group
+        self.closed = False
+        self._events = queue.Queue(max_pending)
+
+    def wants(self, tournament_id, group):
+        if self.tournament_id is not None and self.tournament_id != tournament_id:
+            return False
+        return self.group is None or group is None or self.group == group
+
+    def offer(self, event):
+        """Queue an event without blocking; a listener that fell too far behind is closed"""
+        try:
+            self._events.put_nowait(event)
+        except queue.Full:
+            self.close()
+            return False
+        return True
+
+    def get(self, timeout=None):
+        """Next (id, name, data) event, or None when nothing arrived within timeout"""
+        try:
+            return self._events.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+    def close(self):
+        self.closed = True
+        self.broker.unsubscribe(self)
+
+
+class EventBroker:
+    """
+    In-process publish/subscribe fanout.
+
+    Publishing serializes an event once and hands the same object to every
+    matching subscriber queue, so the cost of a change does not depend on how
+    many spectators are connected to it.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = set()
+        self._ids = itertools.count(1)
+
+    def subscribe(self, tournament_id=None, group=None, max_pending=MAX_PENDING_EVENTS):
+        subscription = Subscription(self, tournament_id, group, max_pending)
+        with self._lock:
+            self._subscriptions.add(subscription)
+        return subscription
+
+    def unsubscribe(self, subscription):
+        with self._lock:
+            self._subscriptions.discard(subscription)
+
+    def listeners(self, tournament_id, group=None):
+        with self._lock:
+            return [
+                subscription for subscription in self._subscriptions
+                if subscription.wants(tournament_id, group)
+            ]
+
+    def publish(self, tournament_id, name, data, group=None):
+        """Send an event to every matching subscriber, returns how many received it"""
+        listeners = self.listeners(tournament_id, group)
+        if not listeners:
+            return 0
+        event = (next(self._ids), name, encode_data(data))
+        return sum(subscription.offer(event) for subscription in listeners)
+
+
+broker = EventBroker()
+
+
+def encode_data(data):
+    """Compact JSON of an event's data"""
+    return DjangoJSONEncoder(separators=(',', ':')).encode(data)
+
+
+def format_event(event):
+    """Server-Sent Events wire format of an (id, name, data) event"""
+    event_id, name, data = event
+    return f'id: {event_id}\nevent: {name}\ndata: {data}\n\n'
+
+
+def event_stream(subscription, keepalive=KEEPALIVE_SECONDS):
+    """Lines of an SSE response until the subscription is closed or the client goes away"""
+    try:
+        yield f'retry: {RETRY_MILLISECONDS}\n\n'
+        while not subscription.closed:
+            event = subscription.get(timeout=keepalive)
+            yield ': keepalive\n\n' if event is None else format_event(event)
+    finally:
+        subscription.close()
+
+
+def group_table(tournament_id, group):
+    """Group classifications in the same order and shape as the table endpoint"""
+    classifications = Classification.objects.select_related('team').filter(
+        team__tournament_id=tournament_id, team__group=group
+    ).order_by(F('position').asc(nulls_last=True), '-points', '-goals_for')
+    return ClassificationSerializer(classifications, many=True).data
+
+
+def _match_payload(match):
+    deltas = aggregate_deltas([(match.team1_id, match.team2_id, match.goals1, match.goals2)])
+    return {
+        'match': {
+            'id': match.id,
+            'team1': match.team1_id,
+            'team1_name': match.team1.name,
+            'team2': match.team2_id,
+            'team2_name': match.team2.name,
+            'goals1': match.goals1,
+            'goals2': match.goals2,
+            'played_at': match.played_at,
+        },
+        'deltas': [{'team': team_id, **delta} for team_id, delta in deltas.items()],
+    }
+
+
+def publish_results(tournament_id, matches):
+    """
+    Broadcast newly loaded results once the transaction commits.
+
+    Every match becomes a `match` event with the classification deltas of both
+    teams, followed by one `standings` event per touched group carrying the
+    re-ranked table. Tables are only read when someone listens to the group.
+    """
+    def publish():
+        groups = []
+        for match in matches:
+            # Knockout matches can pair two groups: both hear about them
+            result = _match_payload(match)
+            for group in dict.fromkeys((match.team1.group, match.team2.group)):
+                payload = {'tournament': tournament_id, 'group': group, **result}
+                broker.publish(tournament_id, 'match', payload, group)
+                if group not in groups:
+                    groups.append(group)
+        for group in groups:
+            if broker.listeners(tournament_id, group):
+                broker.publish(tournament_id, 'standings', {
+                    'tournament': tournament_id,
+                    'group': group,
+                    'classifications': group_table(tournament_id, group),
+                }, group)
+
+    transaction.on_commit(publish)
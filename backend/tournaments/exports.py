@@ -0,0 +1,237 @@
+import re
+import zipfile
+from xml.sax.saxutils import escape
+
+from django.db.models import F
+from django.http import StreamingHttpResponse
+
+from .models import Classification, Match, Participant, Team
+from .streaming import STREAM_CHUNK_SIZE, STREAM_FORMATS, csv_lines, jsonl_lines
+
+EXPORT_FORMATS = {**STREAM_FORMATS, 'xlsx': 'application/vnd.openxmlformats-officedocument.spreadsheetml.sheet'}
+
+# Control characters XML 1.0 does not allow even escaped; spreadsheet apps refuse such files
+XML_INVALID_CHARS = re.compile('[\x00-\x08\x0b\x0c\x0e-\x1f]')
+
+# Exporting every dataset at once needs a workbook with one sheet each
+ALL_DATASETS = 'all'
+
+
+class ExportError(Exception):
+    """Raised for an unknown dataset or format"""
+
+
+def _teams(tournament):
+    fields = ['id', 'name', 'group', 'rating', 'phone_number', 'created_at']
+    return fields, Team.objects.for_tournament(tournament).order_by('group', 'name').values(*fields)
+
+
+def _participants(tournament):
+    fields = ['id', 'name', 'team_name', 'phone_number', 'is_active', 'created_at']
+    return fields, (
+        Participant.objects.filter(team__tournament=tournament).order_by('team__name', 'name')
+        .values('id', 'name', 'phone_number', 'is_active', 'created_at', team_name=F('team__name'))
+    )
+
+
+def _matches(tournament):
+    fields = ['id', 'played_at', 'is_finished', 'team1_name', 'goals1', 'goals2', 'team2_name']
+    return fields, (
+        Match.objects.for_tournament(tournament).order_by('played_at', 'id')
+        .values('id', 'played_at', 'is_finished', 'goals1', 'goals2',
+                team1_name=F('team1__name'), team2_name=F('team2__name'))
+    )
+
+
+def _standings(tournament):
+    fields = [
+        'group', 'position', 'team_name', 'points', 'games_played', 'games_won', 'games_lost',
+        'goals_for', 'goals_against', 'goal_difference',
+    ]
+    return fields, (
+        Classification.objects.filter(team__tournament=tournament)
+        .order_by('team__group', F('position').asc(nulls_last=True), '-points', '-goals_for')
+        .values(
+            'position', 'points', 'games_played', 'games_won', 'games_lost', 'goals_for', 'goals_against',
+            group=F('team__group'), team_name=F('team__name'),
+            goal_difference=F('goals_for') - F('goals_against'),
+        )
+    )
+
+
+DATASETS = {
+    'teams': _teams,
+    'participants': _participants,
+    'matches': _matches,
+    'standings': _standings,
+}
+
+
+def dataset_rows(tournament, dataset, chunk_size=STREAM_CHUNK_SIZE):
+    """(fieldnames, rows) for one dataset; rows are fetched lazily in chunks"""
+    if dataset not in DATASETS:
+        raise ExportError(f'Unknown dataset "{dataset}", use one of: {", ".join(DATASETS)}')
+    fieldnames, queryset = DATASETS[dataset](tournament)
+    rows = ({field: row[field] for field in fieldnames} for row in queryset.iterator(chunk_size=chunk_size))
+    return fieldnames, rows
+
+
+class _StreamBuffer:
+    """Write-only, unseekable file for zipfile whose contents are drained after each write"""
+
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b''.join(self.chunks)
+        self.chunks = []
+        return data
+
+
+def _column_name(index):
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def _cell(reference, value):
+    if value is None:
+        return ''
+    if isinstance(value, bool):
+        return f'<c r="{reference}" t="b"><v>{int(value)}</v></c>'
+    if isinstance(value, (int, float)):
+        return f'<c r="{reference}"><v>{value}</v></c>'
+    if hasattr(value, 'isoformat'):
+        value = value.isoformat()
+    value = XML_INVALID_CHARS.sub('', str(value))
+    return f'<c r="{reference}" t="inlineStr"><is><t>{escape(value)}</t></is></c>'
+
+
+def _sheet_xml(fieldnames, rows):
+    """Worksheet XML in small pieces; strings are inline so nothing is collected up front"""
+    columns = [_column_name(index) for index in range(len(fieldnames))]
+    yield (
+        '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+        '<worksheet xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main"><sheetData>'
+    )
+    yield '<row r="1">' + ''.join(_cell(f'{column}1', field) for column, field in zip(columns, fieldnames)) + '</row>'
+    for row_number, row in enumerate(rows, start=2):
+        yield f'<row r="{row_number}">' + ''.join(
+            _cell(f'{column}{row_number}', row[field]) for column, field in zip(columns, fieldnames)
+        ) + '</row>'
+    yield '</sheetData></worksheet>'
+
+
+def _workbook_parts(sheet_names):
+    sheets = ''.join(
+        f'<sheet name="{escape(name)}" sheetId="{index}" r:id="rId{index}"/>'
+        for index, name in enumerate(sheet_names, start=1)
+    )
+    relationships = ''.join(
+        f'<Relationship Id="rId{index}" '
+        f'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/worksheet" '
+        f'Target="worksheets/sheet{index}.xml"/>'
+        for index in range(1, len(sheet_names) + 1)
+    )
+    overrides = ''.join(
+        f'<Override PartName="/xl/worksheets/sheet{index}.xml" '
+        f'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.worksheet+xml"/>'
+        for index in range(1, len(sheet_names) + 1)
+    )
+    header = '<?xml version="1.0" encoding="UTF-8" standalone="yes"?>\n'
+    return {
+        '[Content_Types].xml': (
+            f'{header}<Types xmlns="http://schemas.openxmlformats.org/package/2006/content-types">'
+            '<Default Extension="rels" ContentType="application/vnd.openxmlformats-package.relationships+xml"/>'
+            '<Default Extension="xml" ContentType="application/xml"/>'
+            '<Override PartName="/xl/workbook.xml" '
+            'ContentType="application/vnd.openxmlformats-officedocument.spreadsheetml.sheet.main+xml"/>'
+            f'{overrides}</Types>'
+        ),
+        '_rels/.rels': (
+            f'{header}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            '<Relationship Id="rId1" '
+            'Type="http://schemas.openxmlformats.org/officeDocument/2006/relationships/officeDocument" '
+            'Target="xl/workbook.xml"/></Relationships>'
+        ),
+        'xl/workbook.xml': (
+            f'{header}<workbook xmlns="http://schemas.openxmlformats.org/spreadsheetml/2006/main" '
+            'xmlns:r="http://schemas.openxmlformats.org/officeDocument/2006/relationships">'
+            f'<sheets>{sheets}</sheets></workbook>'
+        ),
+        'xl/_rels/workbook.xml.rels': (
+            f'{header}<Relationships xmlns="http://schemas.openxmlformats.org/package/2006/relationships">'
+            f'{relationships}</Relationships>'
+        ),
+    }
+
+
+def xlsx_chunks(sheets, flush_bytes=64 * 1024):
+    """
+    Stream an XLSX workbook built from (sheet_name, fieldnames, rows) tuples.
+
+    zipfile writes into an unseekable buffer (sizes go into data descriptors)
+    that is drained whenever it holds `flush_bytes`, so memory use does not
+    depend on the number of rows.
+    """
+    sheets = list(sheets)
+    buffer = _StreamBuffer()
+    with zipfile.ZipFile(buffer, mode='w', compression=zipfile.ZIP_DEFLATED) as workbook:
+        for name, content in _workbook_parts([name for name, _, _ in sheets]).items():
+            workbook.writestr(name, content)
+        yield buffer.drain()
+
+        for index, (_, fieldnames, rows) in enumerate(sheets, start=1):
+            with workbook.open(f'xl/worksheets/sheet{index}.xml', mode='w', force_zip64=True) as sheet:
+                pending = 0
+                for piece in _sheet_xml(fieldnames, rows):
+                    data = piece.encode('utf-8')
+                    sheet.write(data)
+                    pending += len(data)
+                    if pending >= flush_bytes:
+                        pending = 0
+                        yield buffer.drain()
+            yield buffer.drain()
+    yield buffer.drain()
+
+
+def export_chunks(tournament, dataset, export_format, chunk_size=STREAM_CHUNK_SIZE):
+    """Lazily produce the export body as str (CSV/JSON lines) or bytes (XLSX) chunks"""
+    if export_format not in EXPORT_FORMATS:
+        raise ExportError(f'Unknown format "{export_format}", use one of: {", ".join(EXPORT_FORMATS)}')
+
+    if dataset == ALL_DATASETS:
+        if export_format != 'xlsx':
+            raise ExportError(f'Exporting "{ALL_DATASETS}" datasets at once requires the xlsx format')
+        datasets = list(DATASETS)
+    else:
+        datasets = [dataset]
+    # Validate every dataset before the first byte is sent
+    sheets = [(name, *dataset_rows(tournament, name, chunk_size)) for name in datasets]
+
+    if export_format == 'xlsx':
+        return xlsx_chunks(sheets)
+    _, fieldnames, rows = sheets[0]
+    if export_format == 'csv':
+        return csv_lines(rows, fieldnames)
+    return jsonl_lines(rows)
+
+
+def export_response(tournament, dataset, export_format):
+    """StreamingHttpResponse for an export, offered as a file download"""
+    chunks = export_chunks(tournament, dataset, export_format)
+    response = StreamingHttpResponse(chunks, content_type=EXPORT_FORMATS[export_format])
+    response['Content-Disposition'] = (
+        f'attachment; filename="tournament-{tournament.id}-{dataset}.{export_format}"'
+    )
+    return response
@@ -0,0 +1,137 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from .models import HeadToHead, Match, Team
+
+H2H_FIELDS = ['played', 'won', 'drawn', 'lost', 'goals_for', 'goals_against']
+
+# Pairs per UPDATE statement, keeps the CASE parameters under SQLite's limit
+UPDATE_CHUNK_SIZE = 250
+
+
+def _empty_record():
+    return dict.fromkeys(H2H_FIELDS, 0)
+
+
+def pair_deltas(results):
+    """Merge (team1_id, team2_id, goals1, goals2) tuples into one delta per (team, opponent)"""
+    deltas = defaultdict(_empty_record)
+    for team1_id, team2_id, goals1, goals2 in results:
+        for team_id, opponent_id, goals_for, goals_against in (
+            (team1_id, team2_id, goals1, goals2),
+            (team2_id, team1_id, goals2, goals1),
+        ):
+            record = deltas[(team_id, opponent_id)]
+            record['played'] += 1
+            record['goals_for'] += goals_for
+            record['goals_against'] += goals_against
+            if goals_for > goals_against:
+                record['won'] += 1
+            elif goals_for < goals_against:
+                record['lost'] += 1
+            else:
+                record['drawn'] += 1
+    return dict(deltas)
+
+
+def apply_head_to_head(results):
+    """
+    Add finished results to the head-to-head table.
+
+    Missing pairs are created first; existing ones are incremented with
+    F-expressions, one UPDATE per chunk of pairs.
+    """
+    deltas = pair_deltas(results)
+    if not deltas:
+        return
+    pairs = list(deltas)
+    with transaction.atomic():
+        HeadToHead.objects.bulk_create(
+            [HeadToHead(team_id=team_id, opponent_id=opponent_id) for team_id, opponent_id in pairs],
+            ignore_conflicts=True,
+        )
+        for start in range(0, len(pairs), UPDATE_CHUNK_SIZE):
+            chunk = pairs[start:start + UPDATE_CHUNK_SIZE]
+            updates = {}
+            for field in H2H_FIELDS:
+                whens = [
+                    When(team_id=team_id, opponent_id=opponent_id, then=Value(deltas[(team_id, opponent_id)][field]))
+                    for team_id, opponent_id in chunk
+                    if deltas[(team_id, opponent_id)][field]
+                ]
+                if whens:
+                    updates[field] = F(field) + Case(*whens, default=Value(0), output_field=IntegerField())
+            pair_filter = Q()
+            for team_id, opponent_id in chunk:
+                pair_filter |= Q(team_id=team_id, opponent_id=opponent_id)
+            HeadToHead.objects.filter(pair_filter).update(**updates)
+
+
+def _side_totals(goals_for, goals_against):
+    return {
+        'played': Count('id'),
+        'won': Count('id', filter=Q(**{f'{goals_for}__gt': F(goals_against)})),
+        'drawn': Count('id', filter=Q(**{goals_for: F(goals_against)})),
+        'lost': Count('id', filter=Q(**{f'{goals_for}__lt': F(goals_against)})),
+        'goals_for': Sum(goals_for),
+        'goals_against': Sum(goals_against),
+    }
+
+
+def rebuild_head_to_head(tournament, batch_size=1000):
+    """
+    Recreate every head-to-head row of a tournament from its finished matches.
+
+    Both sides are aggregated per pair by the database and combined with
+    UNION ALL, then the rows are replaced with one bulk insert.
+    """
+    finished = Match.objects.filter(is_finished=True, team1__tournament=tournament).order_by()
+    home = finished.values('team1_id', 'team2_id').annotate(**_side_totals('goals1', 'goals2'))
+    away = finished.values('team2_id', 'team1_id').annotate(**_side_totals('goals2', 'goals1'))
+
+    records = defaultdict(_empty_record)
+    for row in home.union(away, all=True):
+        # UNION takes its column names from the first query
+        record = records[(row['team1_id'], row['team2_id'])]
+        for field in H2H_FIELDS:
+            record[field] += row[field] or 0
+
+    with transaction.atomic():
+        HeadToHead.objects.filter(team__tournament=tournament).delete()
+        HeadToHead.objects.bulk_create([
+            HeadToHead(team_id=team_id, opponent_id=opponent_id, **record)
+            for (team_id, opponent_id), record in records.items()
+        ], batch_size=batch_size)
+    return len(records)
+
+
+def group_crosstable(tournament_id, group):
+    """
+    Full crosstable of a group, read with a single LEFT JOIN query.
+
+    Returns the group's teams ordered by name, each with one cell per team in
+    the same order: the head-to-head record, or None when they have not met.
+    """
+    rows = (
+        Team.objects.filter(tournament_id=tournament_id, group=group)
+        .order_by('name', 'id')
+        .values('id', 'name', 'head_to_head__opponent_id', *[f'head_to_head__{field}' for field in H2H_FIELDS])
+    )
+    teams = {}
+    records = {}
+    for row in rows:
+        teams.setdefault(row['id'], row['name'])
+        opponent_id = row['head_to_head__opponent_id']
+        if opponent_id is not None:
+            records[(row['id'], opponent_id)] = {field: row[f'head_to_head__{field}'] for field in H2H_FIELDS}
+
+    return [
+        {
+            'team': team_id,
+            'team_name': name,
+            'results': [records.get((team_id, opponent_id)) for opponent_id in teams],
+        }
+        for team_id, name in teams.items()
+    ]
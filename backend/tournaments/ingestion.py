@@ -0,0 +1,124 @@
+import csv
+import io
+import json
+
+from django.db import transaction
+
+from .events import publish_results
+from .models import Match, Team
+from .ranking import update_group_positions, update_tournament_positions
+from .ratings import apply_match_ratings
+from .scheduling import record_results, scheduled_pairs
+from .signals import standings_changed
+from .standings import apply_match_results
+
+
+class IngestionError(Exception):
+    """Raised when an uploaded file cannot be parsed at all"""
+
+
+def parse_rows(uploaded_file):
+    """
+    Read result rows from an uploaded CSV or JSON-lines file.
+
+    JSON lines are detected by a .jsonl/.ndjson extension or by the first
+    character being `{`; anything else is read as CSV with a header row.
+    """
+    try:
+        text = uploaded_file.read().decode('utf-8-sig')
+    except UnicodeDecodeError:
+        raise IngestionError('File must be UTF-8 encoded')
+
+    name = (getattr(uploaded_file, 'name', '') or '').lower()
+    if name.endswith(('.jsonl', '.ndjson')) or text.lstrip().startswith('{'):
+        rows = []
+        for line_number, line in enumerate(text.splitlines(), start=1):
+            if not line.strip():
+                continue
+            try:
+                rows.append(json.loads(line))
+            except json.JSONDecodeError as e:
+                raise IngestionError(f'Line {line_number}: invalid JSON ({e.msg})')
+        return rows
+    return list(csv.DictReader(io.StringIO(text)))
+
+
+def _resolve_team(row, side, teams_by_id, teams_by_name):
+    team_id = row.get(f'{side}_id')
+    if team_id not in (None, ''):
+        try:
+            return teams_by_id.get(int(team_id))
+        except (TypeError, ValueError):
+            return None
+    name = row.get(side)
+    if name:
+        return teams_by_name.get(str(name).strip().lower())
+    return None
+
+
+def validate_results(tournament, rows):
+    """
+    Check every row against the tournament's teams, fetched with one query.
+
+    Rows identify teams by `team1_id`/`team2_id` or by `team1`/`team2` name and
+    carry `goals1`/`goals2`. Returns (results, errors) where results are
+    (team1, team2, goals1, goals2) tuples and errors are per-row messages.
+    """
+    teams = list(Team.objects.for_tournament(tournament).only('id', 'name', 'group'))
+    teams_by_id = {team.id: team for team in teams}
+    teams_by_name = {team.name.lower(): team for team in teams}
+
+    # Knockout fixtures pair teams from different groups
+    fixtures = scheduled_pairs(list(teams_by_id))
+
+    results = []
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Each result must be an object'})
+            continue
+        team1 = _resolve_team(row, 'team1', teams_by_id, teams_by_name)
+        team2 = _resolve_team(row, 'team2', teams_by_id, teams_by_name)
+        try:
+            goals1 = int(row.get('goals1'))
+            goals2 = int(row.get('goals2'))
+        except (TypeError, ValueError):
+            goals1 = goals2 = None
+
+        if team1 is None or team2 is None:
+            error = f'Team not found in tournament "{tournament.name}"'
+        elif team1.id == team2.id:
+            error = 'A team cannot play against itself'
+        elif (not team1.group or team1.group != team2.group) and frozenset((team1.id, team2.id)) not in fixtures:
+            error = 'Can only play against teams in the same group or a scheduled opponent'
+        elif goals1 is None or goals1 < 0 or goals2 < 0:
+            error = 'Goals must be non-negative integers'
+        else:
+            results.append((team1, team2, goals1, goals2))
+            continue
+        errors.append({'row': index, 'error': error})
+    return results, errors
+
+
+def ingest_match_results(tournament, results):
+    """
+    Store validated results in one transaction: fill the scheduled fixtures
+    or bulk-insert new matches, apply the aggregated classification deltas
+    with a single UPDATE, rate the matches and re-rank the touched group (or
+    the whole tournament when several groups played). The results are then
+    pushed to live event listeners.
+    """
+    with transaction.atomic():
+        matches = record_results(results)
+        apply_match_results(
+            (match.team1_id, match.team2_id, match.goals1, match.goals2) for match in matches
+        )
+        apply_match_ratings(matches)
+        groups = {team.group for result in results for team in result[:2]}
+        if len(groups) == 1:
+            update_group_positions(tournament.id, groups.pop())
+        else:
+            update_tournament_positions(tournament)
+    standings_changed.send(sender=Match, tournament_ids=[tournament.id])
+    publish_results(tournament.id, matches)
+    return matches
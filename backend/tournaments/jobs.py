@@ -0,0 +1,466 @@
+import os
+import socket
+import tempfile
+import threading
+import time
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.files import File
+from django.core.files.storage import default_storage
+from django.db import DatabaseError, IntegrityError, connection, transaction
+from django.db.models import F
+from django.utils import timezone
+
+from .exports import ALL_DATASETS, DATASETS, EXPORT_FORMATS, ExportError, export_chunks
+from .models import Job
+from .ranking import update_tournament_positions
+from .ratings import recompute_ratings
+from .registration import import_teams, validate_team_rows
+from .scheduling import SchedulingError, generate_group_fixtures, generate_knockout_bracket
+from .standings import recompute_standings
+
+# Retry delays double from JOB_RETRY_DELAY up to this many seconds
+MAX_RETRY_DELAY = 3600
+
+# Queued jobs a worker tries to claim before looking again
+CLAIM_BATCH = 10
+
+# Seconds between progress writes of a long-running step
+PROGRESS_INTERVAL = 1.0
+
+
+class JobError(Exception):
+    """Raised for a job that cannot be queued or run; never retried"""
+
+    def __init__(self, message, details=None):
+        super().__init__(message)
+        self.details = details
+
+
+class IdempotencyConflict(JobError):
+    """Raised when an idempotency key was already used for a different job"""
+
+
+class LockLost(Exception):
+    """Raised in a handler whose job was handed to another worker or retried meanwhile"""
+
+
+# run_job's answer for a job this worker no longer owns
+LOST = 'lost'
+
+
+# Failures a retry cannot fix: the job fails at once with the error message
+PERMANENT_ERRORS = (JobError, ExportError, SchedulingError)
+
+
+def get_max_attempts():
+    return getattr(settings, 'JOB_MAX_ATTEMPTS', 3)
+
+
+def get_retry_delay(attempts):
+    """Seconds to wait before the next attempt after `attempts` failed ones"""
+    base = getattr(settings, 'JOB_RETRY_DELAY', 30)
+    return min(base * 2 ** max(attempts - 1, 0), MAX_RETRY_DELAY)
+
+
+def get_lock_timeout():
+    return getattr(settings, 'JOB_LOCK_TIMEOUT', 600)
+
+
+def default_worker_id():
+    return f'{socket.gethostname()}:{os.getpid()}'
+
+
+class JobKind:
+    """
+    A registered job type.
+
+    `prepare(params)` checks and normalizes the parameters when the job is
+    submitted, so mistakes are reported to the admin instead of failing later
+    in the worker. `scrub(params)` returns what is kept once the job is over,
+    for parameters that must not stay in the database (import passwords).
+    """
+
+    def __init__(self, name, handler, needs_tournament=True, prepare=None, scrub=None):
+        self.name = name
+        self.handler = handler
+        self.needs_tournament = needs_tournament
+        self.prepare = prepare or dict
+        self.scrub = scrub
+
+
+JOB_KINDS = {}
+
+
+def job_kind(name, **options):
+    """Register `handler(job, tournament, params) -> result` as the job kind `name`"""
+    def register(handler):
+        JOB_KINDS[name] = JobKind(name, handler, **options)
+        return handler
+    return register
+
+
+def report_progress(job, progress, message=''):
+    """
+    Record a job's progress (0-100) and a short status message.
+
+    Also refreshes the lock, so a job that keeps reporting is never taken for
+    one whose worker died.
+    """
+    job.progress = max(0, min(int(progress), 100))
+    job.message = message[:Job._meta.get_field('message').max_length]
+    if not _owned(job).update(progress=job.progress, message=job.message, locked_at=timezone.now()):
+        raise LockLost(f'Job #{job.id} is no longer held by {job.locked_by}')
+
+
+def _owned(job):
+    """The job's row, as long as it is still running for the worker that claimed it"""
+    return Job.objects.filter(id=job.id, status=Job.RUNNING, locked_by=job.locked_by)
+
+
+class Heartbeat:
+    """
+    Refresh a running job's lock from a background thread.
+
+    Steps such as a ratings replay report no progress for minutes; without a
+    heartbeat requeue_stale would hand the job to a second worker while the
+    first one is still running it. `lost` is set once the lock is gone.
+    """
+
+    def __init__(self, job, interval=None):
+        self.job = job
+        self.interval = interval or max(get_lock_timeout() / 4, 1)
+        self.lost = threading.Event()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self._run, name=f'job-{job.id}-heartbeat', daemon=True)
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._stopped.set()
+        self._thread.join()
+
+    def _run(self):
+        try:
+            while not self._stopped.wait(self.interval):
+                try:
+                    owned = _owned(self.job).update(locked_at=timezone.now())
+                except DatabaseError:
+                    # A busy database (SQLite's write lock): try again next beat
+                    continue
+                if not owned:
+                    self.lost.set()
+                    break
+        finally:
+            # The thread has its own database connection
+            connection.close()
+
+
+def enqueue(kind, tournament=None, params=None, idempotency_key=None, user=None, max_attempts=None):
+    """
+    Queue a job and return (job, created).
+
+    A job already submitted with the same idempotency key is returned as it is
+    (created is False), so a resubmitted form or a retried request never runs
+    the operation twice.
+    """
+    job_type = JOB_KINDS.get(kind)
+    if job_type is None:
+        raise JobError(f'Unknown job kind "{kind}", use one of: {", ".join(sorted(JOB_KINDS))}')
+    if job_type.needs_tournament and tournament is None:
+        raise JobError(f'Jobs of kind "{kind}" need a tournament')
+    if not job_type.needs_tournament:
+        tournament = None
+    idempotency_key = (idempotency_key or '').strip() or None
+    if idempotency_key and len(idempotency_key) > Job._meta.get_field('idempotency_key').max_length:
+        raise JobError('Idempotency key is too long')
+
+    if idempotency_key:
+        existing = Job.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is not None:
+            return _same_job(existing, kind, tournament), False
+
+    params = job_type.prepare(dict(params or {}))
+    try:
+        with transaction.atomic():
+            job = Job.objects.create(
+                kind=kind, tournament=tournament, params=params, idempotency_key=idempotency_key,
+                created_by=user if user is not None and user.is_authenticated else None,
+                max_attempts=max_attempts or get_max_attempts(),
+            )
+    except IntegrityError:
+        # Another request with the same key won the race
+        existing = Job.objects.filter(idempotency_key=idempotency_key).first()
+        if existing is None:
+            raise
+        return _same_job(existing, kind, tournament), False
+    return job, True
+
+
+def _same_job(job, kind, tournament):
+    if job.kind != kind or job.tournament_id != (tournament.id if tournament is not None else None):
+        raise IdempotencyConflict('This idempotency key was already used for a different job')
+    return job
+
+
+def retry(job):
+    """Queue a failed job again with a fresh set of attempts"""
+    if job.status != Job.FAILED:
+        raise JobError('Only failed jobs can be retried')
+    job_type = JOB_KINDS.get(job.kind)
+    if job_type is not None and job_type.scrub is not None and job.params == job_type.scrub(job.params):
+        raise JobError('The parameters of this job were discarded, submit it again')
+    updated = Job.objects.filter(id=job.id, status=Job.FAILED).update(
+        status=Job.QUEUED, attempts=0, progress=0, message='', error='', result=None,
+        run_after=timezone.now(), locked_by='', locked_at=None, finished_at=None,
+    )
+    if not updated:
+        raise JobError('Only failed jobs can be retried')
+    job.refresh_from_db()
+    return job
+
+
+def claim_next(worker_id, kinds=None):
+    """
+    Mark the oldest due queued job as running for `worker_id` and return it.
+
+    Claiming is a conditional UPDATE on the queued status, which is atomic on
+    every database: when two workers race for a job only one update matches
+    and the other moves on to the next candidate. Returns None when nothing
+    is due.
+    """
+    now = timezone.now()
+    due = Job.objects.filter(status=Job.QUEUED, run_after__lte=now)
+    if kinds:
+        due = due.filter(kind__in=kinds)
+    for job_id in due.order_by('run_after', 'id').values_list('id', flat=True)[:CLAIM_BATCH]:
+        claimed = Job.objects.filter(id=job_id, status=Job.QUEUED).update(
+            status=Job.RUNNING, locked_by=worker_id, locked_at=now, started_at=now,
+            attempts=F('attempts') + 1, progress=0, message='',
+        )
+        if claimed:
+            return Job.objects.get(id=job_id)
+    return None
+
+
+def requeue_stale(timeout=None):
+    """
+    Release running jobs whose worker stopped reporting (crashed or killed).
+
+    They are queued again while attempts remain and failed otherwise. Returns
+    the number of jobs released.
+    """
+    cutoff = timezone.now() - timedelta(seconds=get_lock_timeout() if timeout is None else timeout)
+    stale = Job.objects.filter(status=Job.RUNNING, locked_at__lt=cutoff)
+    error = 'The worker stopped while running the job'
+    requeued = stale.filter(attempts__lt=F('max_attempts')).update(
+        status=Job.QUEUED, run_after=timezone.now(), locked_by='', locked_at=None, error=error,
+    )
+    failed = list(stale.filter(attempts__gte=F('max_attempts')))
+    for job in failed:
+        _finish(job, Job.FAILED, error=error)
+    return requeued + len(failed)
+
+
+def _finish(job, status, **fields):
+    """Store the outcome of an attempt, unless the job was meanwhile handed to another worker"""
+    job_type = JOB_KINDS.get(job.kind)
+    if status != Job.QUEUED:
+        fields['finished_at'] = timezone.now()
+        if job_type is not None and job_type.scrub is not None:
+            fields['params'] = job_type.scrub(job.params)
+    fields.update(status=status, locked_by='', locked_at=None)
+    if not _owned(job).update(**fields):
+        return False
+    for name, value in fields.items():
+        setattr(job, name, value)
+    return True
+
+
+def run_job(job):
+    """
+    Run one claimed job and record its outcome.
+
+    Errors in PERMANENT_ERRORS fail the job straight away. Anything else is
+    retried with exponential backoff until max_attempts is reached. A
+    heartbeat keeps the lock fresh meanwhile. Returns the job's new status,
+    or LOST when the job was taken from this worker (nothing is recorded then).
+    """
+    job_type = JOB_KINDS.get(job.kind)
+    try:
+        if job_type is None:
+            raise JobError(f'Unknown job kind "{job.kind}"')
+        with Heartbeat(job) as heartbeat:
+            result = job_type.handler(job, job.tournament, job.params)
+        if heartbeat.lost.is_set():
+            raise LockLost(f'Job #{job.id} is no longer held by {job.locked_by}')
+    except LockLost:
+        return LOST
+    except PERMANENT_ERRORS as e:
+        finished = _finish(
+            job, Job.FAILED, error=str(e), result={'details': e.details} if getattr(e, 'details', None) else None
+        )
+    except Exception as e:
+        error = f'{type(e).__name__}: {e}'
+        if job.attempts < job.max_attempts:
+            retry_at = timezone.now() + timedelta(seconds=get_retry_delay(job.attempts))
+            finished = _finish(
+                job, Job.QUEUED, error=error, run_after=retry_at, message=f'Attempt {job.attempts} failed, retrying'
+            )
+        else:
+            finished = _finish(job, Job.FAILED, error=error)
+    else:
+        finished = _finish(job, Job.SUCCEEDED, progress=100, message='Done', result=result, error='')
+    return job.status if finished else LOST
+
+
+def run_pending(worker_id=None, kinds=None, limit=None):
+    """Run due jobs one after another until none is left (or `limit` ran); returns how many ran"""
+    worker_id = worker_id or default_worker_id()
+    ran = 0
+    while limit is None or ran < limit:
+        job = claim_next(worker_id, kinds)
+        if job is None:
+            break
+        run_job(job)
+        ran += 1
+    return ran
+
+
+def job_data(job):
+    """The job fields returned by the admin job endpoints"""
+    return {
+        'id': job.id,
+        'kind': job.kind,
+        'tournament': job.tournament_id,
+        'status': job.status,
+        'progress': job.progress,
+        'message': job.message,
+        'result': job.result,
+        'error': job.error,
+        'attempts': job.attempts,
+        'max_attempts': job.max_attempts,
+        'idempotency_key': job.idempotency_key,
+        'run_after': job.run_after,
+        'created_at': job.created_at,
+        'started_at': job.started_at,
+        'finished_at': job.finished_at,
+    }
+
+
+def _positive_int(params, name, default):
+    try:
+        value = int(params.get(name, default))
+    except (TypeError, ValueError):
+        raise JobError(f'{name} must be an integer')
+    if value < 1:
+        raise JobError(f'{name} must be at least 1')
+    return value
+
+
+@job_kind('recompute_standings')
+def _recompute_standings(job, tournament, params):
+    report_progress(job, 10, 'Rebuilding classifications from matches')
+    updated_count = recompute_standings(tournament)
+    report_progress(job, 60, 'Ranking groups')
+    update_tournament_positions(tournament)
+    return {'updated_classifications': updated_count}
+
+
+@job_kind('recompute_ratings', needs_tournament=False)
+def _recompute_ratings(job, tournament, params):
+    report_progress(job, 10, 'Replaying finished matches')
+    return {'replayed_matches': recompute_ratings()}
+
+
+def _fixture_params(params):
+    stage = params.get('stage', 'groups')
+    if stage == 'groups':
+        return {'stage': stage, 'legs': _positive_int(params, 'legs', 1)}
+    if stage == 'knockout':
+        return {'stage': stage, 'qualifiers_per_group': _positive_int(params, 'qualifiers_per_group', 2)}
+    raise JobError('Stage must be "groups" or "knockout"')
+
+
+@job_kind('generate_fixtures', prepare=_fixture_params)
+def _generate_fixtures(job, tournament, params):
+    # Safe to retry: both generators refuse to run while unplayed fixtures exist,
+    # and the knockout one also once its stage has been created
+    report_progress(job, 10, f'Generating {params["stage"]} fixtures')
+    if params['stage'] == 'groups':
+        return generate_group_fixtures(tournament, legs=params['legs'])
+    return generate_knockout_bracket(tournament, qualifiers_per_group=params['qualifiers_per_group'])
+
+
+def _team_import_params(params):
+    rows = params.get('teams')
+    if not rows or not isinstance(rows, list):
+        raise JobError('Provide a non-empty "teams" list or a CSV/JSON-lines "file"')
+    return {'teams': rows}
+
+
+def _scrub_team_import(params):
+    # The rows carry plain-text passwords: keep only how many there were
+    if 'teams' not in params:
+        return params
+    return {'teams_count': len(params['teams'])}
+
+
+@job_kind('import_teams', prepare=_team_import_params, scrub=_scrub_team_import)
+def _import_teams(job, tournament, params):
+    rows = params['teams']
+    report_progress(job, 5, f'Validating {len(rows)} teams')
+    entries, errors = validate_team_rows(tournament, rows)
+    if errors:
+        raise JobError(f'{len(errors)} of {len(rows)} teams are invalid, nothing was imported', details=errors)
+    report_progress(job, 20, f'Hashing passwords and creating {len(entries)} teams')
+    teams, _ = import_teams(tournament, entries)
+    return {
+        'imported_teams': len(teams),
+        'teams': [
+            {'id': team.id, 'name': team.name, 'group': team.group, 'username': team.user.username}
+            for team in teams
+        ],
+    }
+
+
+def _export_params(params):
+    dataset = params.get('dataset', ALL_DATASETS)
+    export_format = params.get('format', 'xlsx')
+    if dataset != ALL_DATASETS and dataset not in DATASETS:
+        raise JobError(f'Unknown dataset "{dataset}", use one of: {", ".join([*DATASETS, ALL_DATASETS])}')
+    if export_format not in EXPORT_FORMATS:
+        raise JobError(f'Unknown format "{export_format}", use one of: {", ".join(EXPORT_FORMATS)}')
+    if dataset == ALL_DATASETS and export_format != 'xlsx':
+        raise JobError(f'Exporting "{ALL_DATASETS}" datasets at once requires the xlsx format')
+    return {'dataset': dataset, 'format': export_format}
+
+
+@job_kind('export', prepare=_export_params)
+def _export(job, tournament, params):
+    dataset, export_format = params['dataset'], params['format']
+    filename = f'tournament-{tournament.id}-{dataset}.{export_format}'
+    report_progress(job, 5, f'Exporting {dataset}')
+    written = 0
+    reported_at = time.monotonic()
+    with tempfile.TemporaryFile() as output:
+        for chunk in export_chunks(tournament, dataset, export_format):
+            if isinstance(chunk, str):
+                chunk = chunk.encode('utf-8')
+            output.write(chunk)
+            written += len(chunk)
+            if time.monotonic() - reported_at >= PROGRESS_INTERVAL:
+                report_progress(job, 50, f'Wrote {written // 1024} KB')
+                reported_at = time.monotonic()
+        output.seek(0)
+        report_progress(job, 90, 'Saving the file')
+        name = default_storage.save(f'exports/job-{job.id}/{filename}', File(output, name=filename))
+    return {
+        'file': name,
+        'filename': filename,
+        'content_type': EXPORT_FORMATS[export_format],
+        'size': written,
+    }
@@ -0,0 +1,278 @@
+import datetime
+import json
+import statistics
+import tempfile
+import time
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Callable, Optional
+
+import django
+from django.contrib.auth.models import User
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.test.utils import (
+    CaptureQueriesContext, override_settings, setup_test_environment, teardown_test_environment,
+)
+from django.urls import reverse
+from rest_framework.authtoken.models import Token
+from rest_framework.test import APIClient
+
+from tournaments.jobs import enqueue, run_pending
+from tournaments.models import Classification, Job, Match, Participant, Team
+from tournaments.scheduling import pending_fixtures
+from tournaments.seeding import seed_tournament
+from tournaments.urls import router, urlpatterns
+
+# Named routes left out of the report on purpose; any other route must be benchmarked
+NOT_BENCHMARKED = {
+    'live_events',  # a long-lived stream, its latency is the poll interval
+}
+
+
+@dataclass
+class Endpoint:
+    method: str
+    url_name: str
+    kwargs: dict = field(default_factory=dict)
+    data: Optional[Callable[[int], dict]] = None
+    user: Optional[User] = None
+    setup: Optional[Callable[[], None]] = None
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic tournament into a throwaway test database and measure latency, '
+        'query count and peak memory of every API endpoint, writing a JSON report'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=64, help='Number of groups')
+        parser.add_argument('--teams-per-group', type=int, default=8, help='Teams in every group')
+        parser.add_argument('--legs', type=int, default=1, help='Round-robin legs played inside each group')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed requests per endpoint')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+        parser.add_argument('--output', default='benchmark_report.json', help='Report path, or - for stdout')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            # Export jobs write their files to MEDIA_ROOT, keep them out of the real one
+            with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+                report = self.run_benchmark(options)
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        content = json.dumps(report, indent=2)
+        if options['output'] == '-':
+            self.stdout.write(content)
+        else:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(content + '\n')
+            self.stdout.write(self.style.SUCCESS(f'Report written to {options["output"]}'))
+
+    def run_benchmark(self, options):
+        started = time.perf_counter()
+        tournament = seed_tournament(
+            'Benchmark',
+            groups=options['groups'],
+            teams_per_group=options['teams_per_group'],
+            legs=options['legs'],
+            seed=options['seed'],
+        )
+        dataset = {
+            'groups': options['groups'],
+            'teams_per_group': options['teams_per_group'],
+            'legs': options['legs'],
+            'seed': options['seed'],
+            'teams': Team.objects.count(),
+            'participants': Participant.objects.count(),
+            'matches': Match.objects.count(),
+            'classifications': Classification.objects.count(),
+            'seed_seconds': round(time.perf_counter() - started, 3),
+        }
+
+        results = []
+        for endpoint in self.build_endpoints(tournament):
+            result = self.measure(endpoint, options['repeat'])
+            results.append(result)
+            self.stdout.write(
+                f'{result["method"]:6} {result["path"]:60} {result["status"]:>4} '
+                f'{result["queries"]:>5} queries {result["latency_ms"]["median"]:>9.2f} ms '
+                f'{result["peak_memory_kb"]:>9.1f} KiB'
+            )
+
+        return {
+            'generated_at': datetime.datetime.now(datetime.timezone.utc).isoformat(),
+            'django_version': django.get_version(),
+            'database': connection.vendor,
+            'dataset': dataset,
+            'repeat': options['repeat'],
+            'endpoints': results,
+        }
+
+    def build_endpoints(self, tournament):
+        team = Team.objects.filter(tournament=tournament).first()
+        opponent = Team.objects.filter(tournament=tournament, group=team.group).exclude(id=team.id).first()
+        team.user = User.objects.create_user(username='benchmark_team', password='benchmark')
+        team.save(update_fields=['user'])
+        admin = User.objects.create_superuser(username='benchmark_admin', password='benchmark')
+        team_ids = list(Team.objects.filter(tournament=tournament).values_list('id', flat=True))
+
+        same_group = list(
+            Team.objects.filter(tournament=tournament, group=team.group).values_list('id', flat=True)
+        )
+        failed_job, _ = enqueue('recompute_ratings', user=admin)
+        export_job, _ = enqueue('export', tournament, {'dataset': 'teams', 'format': 'csv'}, user=admin)
+        run_pending(kinds=['export'])
+
+        def ensure_token():
+            Token.objects.get_or_create(user=team.user)
+
+        def fail_job():
+            Job.objects.filter(id=failed_job.id).update(status=Job.FAILED)
+
+        def clear_fixtures():
+            pending_fixtures(tournament).delete()
+
+        endpoints = []
+        for prefix, viewset, basename in router.registry:
+            endpoints.append(Endpoint('GET', f'{basename}-list'))
+            instance = viewset.queryset.model.objects.order_by('pk').first()
+            if instance is not None:
+                endpoints.append(Endpoint('GET', f'{basename}-detail', kwargs={'pk': instance.pk}))
+            for extra_action in viewset.get_extra_actions():
+                if not extra_action.detail and 'get' in extra_action.mapping:
+                    endpoints.append(Endpoint('GET', f'{basename}-{extra_action.url_name}'))
+
+        tournament_kwargs = {'tournament_id': tournament.id}
+        endpoints += [
+            Endpoint('POST', 'register_team', data=lambda i: {
+                'team_name': f'Registered {i}',
+                'password': 'benchmark',
+                'tournament_id': tournament.id,
+                'participants': [{'name': f'Player {i}a'}, {'name': f'Player {i}b'}],
+            }),
+            Endpoint('POST', 'login_team', data=lambda i: {'team_name': team.name, 'password': 'benchmark'}),
+            Endpoint('GET', 'get_user_team', user=team.user),
+            Endpoint('GET', 'get_opponent_teams', user=team.user),
+            Endpoint('POST', 'load_match_result', user=team.user, data=lambda i: {
+                'opponent_team_id': opponent.id, 'user_goals': 10, 'opponent_goals': i % 10,
+            }),
+            Endpoint('GET', 'get_team_matches', user=team.user),
+            Endpoint('POST', 'assign_team_to_tournament', user=team.user, data=lambda i: {'tournament_id': tournament.id}),
+            Endpoint('GET', 'get_available_tournaments', user=team.user),
+            Endpoint('POST', 'logout_team', user=team.user, setup=ensure_token),
+            Endpoint('POST', 'admin_login', data=lambda i: {'username': admin.username, 'password': 'benchmark'}),
+            Endpoint('GET', 'admin_list_tournaments', user=admin),
+            Endpoint('POST', 'admin_create_tournament', user=admin, data=lambda i: {
+                'name': f'Benchmark created {i}', 'start_date': '2026-01-01', 'estimated_end_date': '2026-06-01',
+            }),
+            Endpoint('GET', 'admin_get_tournament_teams', kwargs=tournament_kwargs, user=admin),
+            Endpoint('POST', 'admin_assign_team_groups', kwargs=tournament_kwargs, user=admin, data=lambda i: {
+                'assignments': [{'team_id': team_id, 'group': 'A'} for team_id in team_ids[:8]],
+            }),
+            Endpoint('POST', 'admin_randomly_assign_groups', kwargs=tournament_kwargs, user=admin, data=lambda i: {
+                'groups': ['A', 'B'],
+            }),
+            Endpoint('POST', 'admin_recompute_standings', kwargs=tournament_kwargs, user=admin),
+            Endpoint('POST', 'admin_bulk_import_teams', kwargs=tournament_kwargs, user=admin, data=lambda i: {
+                'teams': [
+                    {
+                        'team_name': f'Imported {i}-{number}',
+                        'password': 'benchmark',
+                        'participants': [{'name': f'Imported {i}-{number}a'}, {'name': f'Imported {i}-{number}b'}],
+                    }
+                    for number in range(5)
+                ],
+            }),
+            Endpoint('POST', 'admin_bulk_load_match_results', kwargs=tournament_kwargs, user=admin, data=lambda i: {
+                'results': [
+                    {'team1_id': home, 'team2_id': away, 'goals1': 10, 'goals2': i % 10}
+                    for home in same_group for away in same_group if home != away
+                ],
+            }),
+            Endpoint('POST', 'admin_generate_fixtures', kwargs=tournament_kwargs, user=admin, setup=clear_fixtures,
+                     data=lambda i: {'stage': 'groups'}),
+            Endpoint('GET', 'admin_export_tournament', user=admin, kwargs={
+                **tournament_kwargs, 'dataset': 'matches', 'export_format': 'csv',
+            }),
+            Endpoint('GET', 'admin_export_tournament', user=admin, kwargs={
+                **tournament_kwargs, 'dataset': 'all', 'export_format': 'xlsx',
+            }),
+            Endpoint('POST', 'admin_recompute_ratings', user=admin),
+            Endpoint('GET', 'admin_list_jobs', user=admin),
+            Endpoint('POST', 'admin_submit_job', user=admin, data=lambda i: {
+                'kind': 'recompute_standings', 'tournament': tournament.id,
+            }),
+            Endpoint('GET', 'admin_get_job', kwargs={'job_id': export_job.id}, user=admin),
+            Endpoint('POST', 'admin_retry_job', kwargs={'job_id': failed_job.id}, user=admin, setup=fail_job),
+            Endpoint('GET', 'admin_download_job_file', kwargs={'job_id': export_job.id}, user=admin),
+        ]
+
+        missing = {
+            pattern.name for pattern in urlpatterns if getattr(pattern, 'name', None)
+        } - NOT_BENCHMARKED - {endpoint.url_name for endpoint in endpoints}
+        if missing:
+            raise CommandError(f'No benchmark for: {", ".join(sorted(missing))}; add them to build_endpoints')
+        return endpoints
+
+    def request(self, client, endpoint, path, iteration):
+        if endpoint.setup:
+            endpoint.setup()
+        data = endpoint.data(iteration) if endpoint.data else None
+        if endpoint.method == 'GET':
+            response = client.get(path)
+        else:
+            response = client.generic(endpoint.method, path, json.dumps(data or {}), content_type='application/json')
+        # Exports and downloads stream, read them out so the whole body is timed
+        if response.streaming:
+            response.body = b''.join(
+                chunk.encode('utf-8') if isinstance(chunk, str) else chunk for chunk in response.streaming_content
+            )
+        else:
+            response.body = response.content
+        return response
+
+    def measure(self, endpoint, repeat):
+        client = APIClient()
+        if endpoint.user is not None:
+            client.force_authenticate(user=endpoint.user)
+        path = reverse(endpoint.url_name, kwargs=endpoint.kwargs)
+
+        # Warm-up request measured for queries and memory; tracing would skew the timings.
+        # The query log is reset on every request_started, so count it right away.
+        tracemalloc.start()
+        try:
+            with CaptureQueriesContext(connection) as queries:
+                response = self.request(client, endpoint, path, 0)
+            peak_memory = tracemalloc.get_traced_memory()[1]
+            query_count = len(queries)
+        finally:
+            tracemalloc.stop()
+
+        timings = []
+        for iteration in range(1, repeat + 1):
+            started = time.perf_counter()
+            self.request(client, endpoint, path, iteration)
+            timings.append((time.perf_counter() - started) * 1000)
+
+        return {
+            'name': endpoint.url_name,
+            'method': endpoint.method,
+            'path': path,
+            'status': response.status_code,
+            'queries': query_count,
+            'response_bytes': len(response.body),
+            'peak_memory_kb': round(peak_memory / 1024, 1),
+            'latency_ms': {
+                'min': round(min(timings), 3),
+                'median': round(statistics.median(timings), 3),
+                'mean': round(statistics.fmean(timings), 3),
+                'max': round(max(timings), 3),
+            },
+        }
@@ -0,0 +1,153 @@
+import json
+import os
+import socket
+import statistics
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+import uvicorn
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.backends.signals import connection_created
+from fastapi import FastAPI
+
+import fastapi_app
+
+# Endpoints benchmarked on both apps: path -> loader shared by both implementations
+LOADERS = {
+    '/api/teams/': fastapi_app.load_teams,
+    '/api/classifications/': fastapi_app.load_classifications,
+    '/api/matches/recent/': lambda: fastapi_app.load_matches(None, None, 10),
+    '/api/participants/': fastapi_app.load_participants,
+}
+
+
+def build_blocking_app():
+    """The previous implementation: ORM work executed directly on the event loop"""
+    blocking = FastAPI()
+    for path, loader in LOADERS.items():
+        def endpoint(loader=loader):
+            async def handler():
+                return loader()
+            return handler
+        blocking.get(path)(endpoint())
+    return blocking
+
+
+def free_port():
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+class Command(BaseCommand):
+    help = 'Compare FastAPI throughput under parallel clients: ORM on the event loop vs on the thread pool'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--path', default='/api/teams/', choices=sorted(LOADERS), help='Endpoint to hit')
+        parser.add_argument('--clients', type=int, default=16, help='Parallel HTTP clients')
+        parser.add_argument('--requests', type=int, default=400, help='Total requests per app')
+        parser.add_argument(
+            '--db-latency-ms', type=float, default=2.0,
+            help='Artificial delay added to every SQL query, to emulate a networked database'
+        )
+        parser.add_argument('--output', help='Optional path for a JSON report')
+
+    def handle(self, *args, **options):
+        if options['clients'] < 1 or options['requests'] < 1:
+            raise CommandError('--clients and --requests must be at least 1')
+
+        delay = options['db_latency_ms'] / 1000
+
+        def slow_query(execute, sql, params, many, context):
+            time.sleep(delay)
+            return execute(sql, params, many, context)
+
+        def add_latency(sender, connection, **kwargs):
+            # Fired on every reconnect of the same per-thread wrapper
+            if slow_query not in connection.execute_wrappers:
+                connection.execute_wrappers.append(slow_query)
+
+        if delay:
+            connection_created.connect(add_latency, weak=False)
+            connection.close()
+
+        try:
+            # Django refuses ORM calls from a running event loop; the old endpoints
+            # only worked with this escape hatch, so enable it for that run alone
+            os.environ['DJANGO_ALLOW_ASYNC_UNSAFE'] = 'true'
+            try:
+                blocking = self.run_app(build_blocking_app(), options)
+            finally:
+                del os.environ['DJANGO_ALLOW_ASYNC_UNSAFE']
+            results = {
+                'blocking': blocking,
+                'threadpool': self.run_app(fastapi_app.app, options),
+            }
+        finally:
+            connection_created.disconnect(add_latency)
+
+        for name, result in results.items():
+            self.stdout.write(
+                f'{name:10} {result["throughput_rps"]:>9.1f} req/s  '
+                f'p50 {result["latency_ms"]["p50"]:>8.2f} ms  p95 {result["latency_ms"]["p95"]:>8.2f} ms  '
+                f'errors {result["errors"]}'
+            )
+        speedup = results['threadpool']['throughput_rps'] / results['blocking']['throughput_rps']
+        self.stdout.write(self.style.SUCCESS(f'Thread pool throughput: {speedup:.2f}x the blocking implementation'))
+
+        if options['output']:
+            report = {
+                'path': options['path'],
+                'clients': options['clients'],
+                'requests': options['requests'],
+                'db_latency_ms': options['db_latency_ms'],
+                'orm_threads': fastapi_app.ORM_THREADS,
+                'results': results,
+                'speedup': round(speedup, 3),
+            }
+            with open(options['output'], 'w') as report_file:
+                json.dump(report, report_file, indent=2)
+
+    def run_app(self, app, options):
+        port = free_port()
+        server = uvicorn.Server(uvicorn.Config(app, host='127.0.0.1', port=port, log_level='warning'))
+        thread = threading.Thread(target=server.run, daemon=True)
+        thread.start()
+        while not server.started:
+            time.sleep(0.01)
+
+        url = f'http://127.0.0.1:{port}{options["path"]}'
+        local = threading.local()
+
+        def call(_):
+            session = getattr(local, 'session', None)
+            if session is None:
+                session = local.session = requests.Session()
+            started = time.perf_counter()
+            response = session.get(url)
+            return time.perf_counter() - started, response.status_code
+
+        try:
+            call(None)  # warm-up
+            started = time.perf_counter()
+            with ThreadPoolExecutor(max_workers=options['clients']) as executor:
+                samples = list(executor.map(call, range(options['requests'])))
+            elapsed = time.perf_counter() - started
+        finally:
+            server.should_exit = True
+            thread.join()
+
+        latencies = sorted(duration * 1000 for duration, _ in samples)
+        return {
+            'seconds': round(elapsed, 3),
+            'throughput_rps': round(len(samples) / elapsed, 1),
+            'errors': sum(1 for _, status_code in samples if status_code != 200),
+            'latency_ms': {
+                'p50': round(statistics.median(latencies), 3),
+                'p95': round(latencies[int(len(latencies) * 0.95) - 1], 3),
+                'max': round(latencies[-1], 3),
+            },
+        }
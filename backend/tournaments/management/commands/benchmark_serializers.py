@@ -0,0 +1,99 @@
+import json
+import statistics
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+from django.test.utils import setup_test_environment, teardown_test_environment
+from rest_framework.renderers import JSONRenderer
+
+from tournaments.models import Classification, Match, Team
+from tournaments.renderers import FastJSONRenderer
+from tournaments.rows import CLASSIFICATION_ROWS, MATCH_ROWS, TEAM_ROWS
+from tournaments.seeding import seed_tournament
+from tournaments.serializers import ClassificationSerializer, MatchSerializer, TeamSerializer
+
+
+class Command(BaseCommand):
+    help = (
+        'Seed a synthetic tournament into a throwaway test database and compare the ModelSerializer + '
+        'JSONRenderer read path with the .values() row mappers + orjson renderer: same output, and how much faster'
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--groups', type=int, default=64, help='Number of groups')
+        parser.add_argument('--teams-per-group', type=int, default=8, help='Teams in every group')
+        parser.add_argument('--repeat', type=int, default=5, help='Timed runs per path')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed for the synthetic data')
+        parser.add_argument('--output', default=None, help='Also write a JSON report to this path')
+
+    def handle(self, *args, **options):
+        if options['repeat'] < 1:
+            raise CommandError('--repeat must be at least 1')
+        setup_test_environment(debug=False)
+        old_name = connection.creation.create_test_db(verbosity=0, autoclobber=True, serialize=False)
+        try:
+            seed_tournament(
+                'Benchmark', groups=options['groups'], teams_per_group=options['teams_per_group'],
+                seed=options['seed'],
+            )
+            results = [self.measure(*case, options['repeat']) for case in self.cases()]
+        finally:
+            connection.creation.destroy_test_db(old_name, verbosity=0)
+            teardown_test_environment()
+
+        for result in results:
+            self.stdout.write(
+                f'{result["name"]:16} {result["rows"]:>7} rows  serializer {result["serializer_ms"]:>9.2f} ms  '
+                f'values {result["values_ms"]:>8.2f} ms  x{result["speedup"]:<6} '
+                f'{"same output" if result["equal"] else "OUTPUT DIFFERS"}'
+            )
+        if options['output']:
+            with open(options['output'], 'w') as report_file:
+                report_file.write(json.dumps({'dataset': options, 'results': results}, indent=2) + '\n')
+        if not all(result['equal'] for result in results):
+            raise CommandError('The values() path does not match the serializers')
+
+    def cases(self):
+        classification_order = (F('position').asc(nulls_last=True), '-points', '-goals_for', 'id')
+        return [
+            ('teams', Team.objects.with_contact_details().order_by('-created_at', '-id'), TeamSerializer, TEAM_ROWS),
+            (
+                'classifications',
+                Classification.objects.select_related('team').order_by(*classification_order),
+                ClassificationSerializer,
+                CLASSIFICATION_ROWS,
+            ),
+            ('matches', Match.objects.select_related('team1', 'team2').order_by('-played_at', '-id'), MatchSerializer, MATCH_ROWS),
+        ]
+
+    def serializer_path(self, queryset, serializer_class):
+        return JSONRenderer().render(serializer_class(queryset.all(), many=True).data)
+
+    def values_path(self, queryset, mapper):
+        columns, to_row = mapper.compile()
+        return FastJSONRenderer().render([to_row(row) for row in mapper.values(queryset.all(), columns)])
+
+    def timed(self, function, repeat):
+        timings = []
+        for _ in range(repeat):
+            started = time.perf_counter()
+            function()
+            timings.append((time.perf_counter() - started) * 1000)
+        return statistics.median(timings)
+
+    def measure(self, name, queryset, serializer_class, mapper, repeat):
+        expected = self.serializer_path(queryset, serializer_class)
+        actual = self.values_path(queryset, mapper)
+        serializer_ms = self.timed(lambda: self.serializer_path(queryset, serializer_class), repeat)
+        values_ms = self.timed(lambda: self.values_path(queryset, mapper), repeat)
+        return {
+            'name': name,
+            'rows': len(json.loads(expected)),
+            'equal': json.loads(expected) == json.loads(actual),
+            'identical_bytes': expected == actual,
+            'serializer_ms': round(serializer_ms, 2),
+            'values_ms': round(values_ms, 2),
+            'speedup': round(serializer_ms / values_ms, 1) if values_ms else None,
+        }
@@ -0,0 +1,44 @@
+import sys
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.exports import ALL_DATASETS, DATASETS, EXPORT_FORMATS, ExportError, export_chunks
+from tournaments.models import Tournament
+from tournaments.streaming import STREAM_CHUNK_SIZE
+
+
+class Command(BaseCommand):
+    help = "Stream a tournament's teams, participants, matches or standings to a CSV, JSON-lines or XLSX file"
+
+    def add_arguments(self, parser):
+        parser.add_argument('tournament_id', type=int)
+        parser.add_argument('dataset', choices=[*DATASETS, ALL_DATASETS])
+        parser.add_argument('--format', dest='export_format', choices=list(EXPORT_FORMATS), default='csv')
+        parser.add_argument('--output', '-o', help='File to write, defaults to stdout')
+        parser.add_argument('--chunk-size', type=int, default=STREAM_CHUNK_SIZE, help='Rows fetched per query')
+
+    def handle(self, *args, **options):
+        try:
+            tournament = Tournament.objects.get(id=options['tournament_id'])
+        except Tournament.DoesNotExist:
+            raise CommandError(f'Tournament {options["tournament_id"]} does not exist')
+
+        export_format = options['export_format']
+        try:
+            chunks = export_chunks(tournament, options['dataset'], export_format, options['chunk_size'])
+        except ExportError as e:
+            raise CommandError(str(e))
+
+        binary = export_format == 'xlsx'
+        if options['output']:
+            mode, encoding = ('wb', None) if binary else ('w', 'utf-8')
+            with open(options['output'], mode, encoding=encoding, newline=None if binary else '') as output:
+                for chunk in chunks:
+                    output.write(chunk)
+            self.stderr.write(self.style.SUCCESS(f'Exported {options["dataset"]} to {options["output"]}'))
+        elif binary:
+            for chunk in chunks:
+                sys.stdout.buffer.write(chunk)
+        else:
+            for chunk in chunks:
+                self.stdout.write(chunk, ending='')
@@ -0,0 +1,19 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from tournaments.ratings import recompute_ratings
+
+
+class Command(BaseCommand):
+    help = 'Rebuild team ratings and the rating history by replaying every finished match'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=5000, help='Rows per bulk INSERT/UPDATE')
+
+    def handle(self, *args, **options):
+        started = time.perf_counter()
+        replayed = recompute_ratings(batch_size=options['batch_size'])
+        self.stdout.write(self.style.SUCCESS(
+            f'Replayed {replayed} matches in {time.perf_counter() - started:.2f}s'
+        ))
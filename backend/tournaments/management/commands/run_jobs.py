@@ -0,0 +1,59 @@
+import signal
+import time
+
+from django.core.cache import caches
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management.base import BaseCommand, CommandError
+from django.db import close_old_connections
+
+from tournaments.jobs import JOB_KINDS, claim_next, default_worker_id, requeue_stale, run_job
+
+
+class Command(BaseCommand):
+    help = 'Run queued background jobs (standings, fixtures, ratings, team imports, exports) from the database'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--once', action='store_true', help='Run the jobs that are due, then exit')
+        parser.add_argument('--sleep', type=float, default=2.0, help='Seconds to wait when no job is due')
+        parser.add_argument('--max-jobs', type=int, default=None, help='Exit after running this many jobs')
+        parser.add_argument('--kind', dest='kinds', action='append', choices=sorted(JOB_KINDS),
+                            help='Only run jobs of this kind (repeatable)')
+        parser.add_argument('--worker-id', default=None, help='Name recorded on claimed jobs')
+
+    def handle(self, *args, **options):
+        if options['sleep'] < 0:
+            raise CommandError('--sleep cannot be negative')
+        worker_id = options['worker_id'] or default_worker_id()
+        if isinstance(caches['default'], LocMemCache):
+            self.stderr.write(self.style.WARNING(
+                'CACHE_URL is locmem://: web processes will not see the cache invalidations of this worker, '
+                'use a file:// or redis:// cache shared with them'
+            ))
+        self.stopping = False
+        # Finish the current job on SIGTERM/SIGINT instead of leaving it half done
+        for signum in (signal.SIGTERM, signal.SIGINT):
+            signal.signal(signum, self.stop)
+
+        ran = 0
+        while not self.stopping and (options['max_jobs'] is None or ran < options['max_jobs']):
+            close_old_connections()
+            released = requeue_stale()
+            if released:
+                self.stderr.write(f'Released {released} job(s) left by stopped workers')
+            job = claim_next(worker_id, options['kinds'])
+            if job is None:
+                if options['once']:
+                    break
+                time.sleep(options['sleep'])
+                continue
+            started = time.perf_counter()
+            status = run_job(job)
+            ran += 1
+            line = f'{job.kind} #{job.id}: {status} in {time.perf_counter() - started:.2f}s'
+            if job.error:
+                line += f' ({job.error})'
+            self.stdout.write(self.style.SUCCESS(line) if status == 'succeeded' else self.style.WARNING(line))
+        self.stderr.write(f'Worker {worker_id} ran {ran} job(s)')
+
+    def stop(self, signum, frame):
+        self.stopping = True
@@ -0,0 +1,56 @@
+import time
+
+from django.core.management.base import BaseCommand, CommandError
+
+from tournaments.models import Tournament
+from tournaments.seeding import seed_tournament
+
+
+class Command(BaseCommand):
+    help = 'Bulk-create synthetic tournaments, teams, users, participants and matches for load testing'
+
+    def add_arguments(self, parser):
+        parser.add_argument('--name', default='Seed', help='Tournament name prefix')
+        parser.add_argument('--tournaments', type=int, default=1, help='Number of tournaments')
+        parser.add_argument('--groups', type=int, default=4, help='Groups per tournament')
+        parser.add_argument('--teams-per-group', type=int, default=8, help='Teams in every group')
+        parser.add_argument('--legs', type=int, default=1, help='Round-robin legs inside each group')
+        parser.add_argument('--played', type=float, default=1.0, help='Fraction of fixtures already played (0-1)')
+        parser.add_argument('--seed', type=int, default=0, help='Random seed; same seed gives the same data')
+        parser.add_argument('--batch-size', type=int, default=1000, help='Rows per bulk INSERT')
+        parser.add_argument('--no-users', action='store_true', help='Do not create a login per team')
+        parser.add_argument('--password', default='password', help='Password shared by all seeded team users')
+        parser.add_argument('--with-tokens', action='store_true', help='Create an auth token for every team user')
+
+    def handle(self, *args, **options):
+        if not 0 <= options['played'] <= 1:
+            raise CommandError('--played must be between 0 and 1')
+
+        names = [
+            options['name'] if options['tournaments'] == 1 else f'{options["name"]} {index + 1}'
+            for index in range(options['tournaments'])
+        ]
+        existing = list(Tournament.objects.filter(name__in=names).values_list('name', flat=True))
+        if existing:
+            raise CommandError(f'Tournaments already exist: {", ".join(existing)}')
+
+        for index, name in enumerate(names):
+            started = time.perf_counter()
+            tournament = seed_tournament(
+                name,
+                groups=options['groups'],
+                teams_per_group=options['teams_per_group'],
+                legs=options['legs'],
+                seed=options['seed'] + index,
+                batch_size=options['batch_size'],
+                played_ratio=options['played'],
+                with_users=not options['no_users'],
+                password=options['password'],
+                with_tokens=options['with_tokens'],
+            )
+            self.stdout.write(
+                self.style.SUCCESS(
+                    f'Seeded "{tournament.name}" with {tournament.teams.count()} teams '
+                    f'in {time.perf_counter() - started:.2f}s'
+                )
+            )
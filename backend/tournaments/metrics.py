@@ -0,0 +1,207 @@
+import hmac
+import threading
+import time
+from collections import defaultdict, deque
+
+from django.conf import settings
+from django.db import connection
+from django.http import HttpResponse
+
+# Upper bounds (seconds) of the request latency histogram buckets
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# Slowest recent statements kept for the slow query samples
+SLOW_QUERY_SAMPLES = 20
+SLOW_QUERY_SQL_LENGTH = 300
+
+PROMETHEUS_CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def get_slow_query_seconds():
+    return getattr(settings, 'METRICS_SLOW_QUERY_MS', 100) / 1000
+
+
+class QueryRecorder:
+    """
+    Database execute wrapper counting the statements of one request.
+
+    Install it with `connection.execute_wrapper(recorder)` on the thread that
+    runs the queries.
+    """
+
+    def __init__(self, slow_seconds=None):
+        self.slow_seconds = get_slow_query_seconds() if slow_seconds is None else slow_seconds
+        self.count = 0
+        self.duration = 0.0
+        self.slow = []
+
+    def __call__(self, execute, sql, params, many, context):
+        started = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            elapsed = time.perf_counter() - started
+            self.count += 1
+            self.duration += elapsed
+            if elapsed >= self.slow_seconds:
+                self.slow.append((elapsed, sql))
+
+
+class MetricsRegistry:
+    """Per-view request counts, latency histograms, query totals and response sizes"""
+
+    def __init__(self, buckets=LATENCY_BUCKETS, slow_samples=SLOW_QUERY_SAMPLES):
+        self.buckets = tuple(buckets)
+        self._lock = threading.Lock()
+        self._slow_samples = slow_samples
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._requests = defaultdict(int)
+            self._latency = defaultdict(lambda: [0] * (len(self.buckets) + 1))
+            self._latency_sum = defaultdict(float)
+            self._queries = defaultdict(int)
+            self._query_seconds = defaultdict(float)
+            self._response_bytes = defaultdict(int)
+            self._slow_queries = defaultdict(int)
+            self._slow_samples_seen = deque(maxlen=self._slow_samples)
+
+    def observe(self, source, view, method, status_code, duration, recorder=None, response_bytes=None):
+        key = (source, view)
+        bucket = next(
+            (index for index, bound in enumerate(self.buckets) if duration <= bound), len(self.buckets)
+        )
+        with self._lock:
+            self._requests[(source, view, method, str(status_code))] += 1
+            self._latency[key][bucket] += 1
+            self._latency_sum[key] += duration
+            if response_bytes is not None:
+                self._response_bytes[key] += response_bytes
+            if recorder is not None:
+                self._queries[key] += recorder.count
+                self._query_seconds[key] += recorder.duration
+                for elapsed, sql in recorder.slow:
+                    self._slow_queries[key] += 1
+                    self._slow_samples_seen.append((source, view, elapsed, sql[:SLOW_QUERY_SQL_LENGTH]))
+
+    def render(self):
+        """All metrics in the Prometheus text exposition format"""
+        with self._lock:
+            lines = [
+                '# HELP foosball_requests_total Requests served, by view, method and status.',
+                '# TYPE foosball_requests_total counter',
+            ]
+            for (source, view, method, status_code), count in sorted(self._requests.items()):
+                labels = _labels(source=source, view=view, method=method, status=status_code)
+                lines.append(f'foosball_requests_total{{{labels}}} {count}')
+
+            lines += [
+                '# HELP foosball_request_duration_seconds Time until the response was ready.',
+                '# TYPE foosball_request_duration_seconds histogram',
+            ]
+            for (source, view), counts in sorted(self._latency.items()):
+                cumulative = 0
+                for bound, count in zip((*self.buckets, '+Inf'), counts):
+                    cumulative += count
+                    labels = _labels(source=source, view=view, le=bound)
+                    lines.append(f'foosball_request_duration_seconds_bucket{{{labels}}} {cumulative}')
+                labels = _labels(source=source, view=view)
+                lines.append(f'foosball_request_duration_seconds_sum{{{labels}}} {self._latency_sum[(source, view)]}')
+                lines.append(f'foosball_request_duration_seconds_count{{{labels}}} {cumulative}')
+
+            for name, kind, description, values in (
+                ('foosball_db_queries_total', 'counter', 'Database statements executed.', self._queries),
+                ('foosball_db_query_seconds_total', 'counter', 'Time spent in database statements.',
+                 self._query_seconds),
+                ('foosball_slow_queries_total', 'counter', 'Statements slower than METRICS_SLOW_QUERY_MS.',
+                 self._slow_queries),
+                ('foosball_response_bytes_total', 'counter', 'Bytes of non-streaming response bodies.',
+                 self._response_bytes),
+            ):
+                lines += [f'# HELP {name} {description}', f'# TYPE {name} {kind}']
+                for (source, view), value in sorted(values.items()):
+                    lines.append(f'{name}{{{_labels(source=source, view=view)}}} {value}')
+
+            lines += [
+                '# HELP foosball_slow_query_sample_seconds Most recent slow statements.',
+                '# TYPE foosball_slow_query_sample_seconds gauge',
+            ]
+            for source, view, elapsed, sql in self._slow_samples_seen:
+                labels = _labels(source=source, view=view, sql=sql)
+                lines.append(f'foosball_slow_query_sample_seconds{{{labels}}} {elapsed}')
+        return '\n'.join(lines) + '\n'
+
+
+def _label_value(value):
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(**labels):
+    return ','.join(f'{name}="{_label_value(value)}"' for name, value in labels.items())
+
+
+registry = MetricsRegistry()
+
+
+def server_timing(duration, recorder):
+    """Server-Timing header value with the total and database time in milliseconds"""
+    return (
+        f'app;dur={duration * 1000:.1f}, '
+        f'db;dur={recorder.duration * 1000:.1f};desc="{recorder.count} queries"'
+    )
+
+
+def server_timing_enabled():
+    return getattr(settings, 'METRICS_SERVER_TIMING', settings.DEBUG)
+
+
+class MetricsMiddleware:
+    """
+    Record every Django request in the metrics registry.
+
+    Streaming responses are measured until their headers are ready, and their
+    body size is unknown, so exports and event streams do not skew the
+    histograms with transfer time.
+    """
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+
+    def __call__(self, request):
+        recorder = QueryRecorder()
+        started = time.perf_counter()
+        with connection.execute_wrapper(recorder):
+            response = self.get_response(request)
+        duration = time.perf_counter() - started
+
+        match = request.resolver_match
+        view = match.view_name if match is not None else 'unresolved'
+        response_bytes = None if response.streaming else len(response.content)
+        registry.observe(
+            'django', view, request.method, response.status_code, duration, recorder, response_bytes
+        )
+        if server_timing_enabled():
+            response['Server-Timing'] = server_timing(duration, recorder)
+        return response
+
+
+def scrape_allowed(authorization):
+    """
+    Whether an Authorization header value may read the metrics.
+
+    Without METRICS_TOKEN scrapes are only served in DEBUG: the samples
+    include SQL statements.
+    """
+    token = getattr(settings, 'METRICS_TOKEN', '')
+    if not token:
+        return settings.DEBUG
+    supplied = (authorization or '').removeprefix('Bearer ')
+    return hmac.compare_digest(supplied.encode(), token.encode())
+
+
+def metrics_view(request):
+    """Prometheus scrape endpoint, protected by METRICS_TOKEN (open in DEBUG without one)"""
+    if not scrape_allowed(request.headers.get('Authorization')):
+        return HttpResponse(status=401)
+    return HttpResponse(registry.render(), content_type=PROMETHEUS_CONTENT_TYPE)
@@ -0,0 +1,59 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:56
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+def populate_head_to_head(apps, schema_editor):
+    """Build the table from the matches finished before it existed"""
+    Match = apps.get_model('tournaments', 'Match')
+    HeadToHead = apps.get_model('tournaments', 'HeadToHead')
+
+    records = {}
+    for team1_id, team2_id, goals1, goals2 in (
+        Match.objects.filter(is_finished=True).values_list('team1_id', 'team2_id', 'goals1', 'goals2').iterator()
+    ):
+        for team_id, opponent_id, goals_for, goals_against in (
+            (team1_id, team2_id, goals1, goals2),
+            (team2_id, team1_id, goals2, goals1),
+        ):
+            record = records.setdefault((team_id, opponent_id), HeadToHead(team_id=team_id, opponent_id=opponent_id))
+            record.played += 1
+            record.goals_for += goals_for
+            record.goals_against += goals_against
+            if goals_for > goals_against:
+                record.won += 1
+            elif goals_for < goals_against:
+                record.lost += 1
+            else:
+                record.drawn += 1
+    HeadToHead.objects.bulk_create(records.values(), batch_size=1000)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0009_ratings'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='HeadToHead',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('played', models.IntegerField(default=0)),
+                ('won', models.IntegerField(default=0)),
+                ('drawn', models.IntegerField(default=0)),
+                ('lost', models.IntegerField(default=0)),
+                ('goals_for', models.IntegerField(default=0)),
+                ('goals_against', models.IntegerField(default=0)),
+                ('opponent', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to='tournaments.team')),
+                ('team', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='head_to_head', to='tournaments.team')),
+            ],
+            options={
+                'verbose_name_plural': 'Head to head',
+                'unique_together': {('team', 'opponent')},
+            },
+        ),
+        migrations.RunPython(populate_head_to_head, migrations.RunPython.noop),
+    ]
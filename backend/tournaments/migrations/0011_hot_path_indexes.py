@@ -0,0 +1,69 @@
+# Generated by Django 4.2.7 on 2026-10-18 15:58
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0010_headtohead'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='match',
+            name='team1',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='matches_as_team1', to='tournaments.team'),
+        ),
+        migrations.AlterField(
+            model_name='match',
+            name='team2',
+            field=models.ForeignKey(db_index=False, on_delete=django.db.models.deletion.CASCADE, related_name='matches_as_team2', to='tournaments.team'),
+        ),
+        migrations.AlterField(
+            model_name='team',
+            name='tournament',
+            field=models.ForeignKey(blank=True, db_index=False, null=True, on_delete=django.db.models.deletion.CASCADE, related_name='teams', to='tournaments.tournament'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['-played_at', '-id'], name='match_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(condition=models.Q(('is_finished', True)), fields=['-played_at', '-id'], name='match_finished_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team1', '-played_at'], name='match_team1_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='match',
+            index=models.Index(fields=['team2', '-played_at'], name='match_team2_played_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='participant',
+            index=models.Index(condition=models.Q(('is_active', True)), fields=['name'], name='participant_active_name_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='ratinghistory',
+            index=models.Index(fields=['team', '-id'], name='ratinghistory_team_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['tournament', 'group', 'name'], name='team_tournament_group_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='team',
+            index=models.Index(fields=['group', 'name'], name='team_group_idx'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.CheckConstraint(check=models.Q(('team1', models.F('team2')), _negated=True), name='match_distinct_teams'),
+        ),
+        migrations.AddConstraint(
+            model_name='match',
+            constraint=models.CheckConstraint(check=models.Q(('goals1__gte', 0), ('goals2__gte', 0)), name='match_goals_non_negative'),
+        ),
+    ]
@@ -0,0 +1,17 @@
+# Generated by Django 4.2.7 on 2026-10-18 16:44
+
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('tournaments', '0013_job'),
+    ]
+
+    operations = [
+        migrations.RemoveField(
+            model_name='participant',
+            name='rating',
+        ),
+    ]
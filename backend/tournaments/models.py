@@ -1,5 +1,6 @@
 from django.db import models
 from django.contrib.auth.models import User
+from django.utils import timezone
 
 
 class Tournament(models.Model):
@@ -7,6 +8,11 @@ class Tournament(models.Model):
     start_date = models.DateField()
     estimated_end_date = models.DateField()
     created_at = models.DateTimeField(auto_now_add=True)
+    # Bumped with one F() update when a transaction changing its teams, matches
+    # or classifications commits (see response_cache.invalidate_tournaments);
+    # drives ETag/Last-Modified
+    version = models.PositiveBigIntegerField(default=1)
+    modified_at = models.DateTimeField(auto_now=True)
     
     def __str__(self):
         return self.name
@@ -15,14 +21,35 @@ class Tournament(models.Model):
         ordering = ['start_date']
 
 
+class TeamQuerySet(models.QuerySet):
+    def for_tournament(self, tournament):
+        """Teams of one tournament; combine with .filter(group=...) for a group"""
+        return self.filter(tournament=tournament)
+    
+    def with_contact_details(self):
+        """Load everything TeamSerializer reads: tournament name and participant phones"""
+        return self.select_related('tournament').prefetch_related(
+            models.Prefetch(
+                'participants',
+                queryset=Participant.objects.filter(phone_number__isnull=False),
+                to_attr='participants_with_phone',
+            )
+        )
+
+
 class Team(models.Model):
     user = models.OneToOneField(User, on_delete=models.CASCADE, related_name='team', null=True, blank=True)
-    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='teams', null=True, blank=True)
+    tournament = models.ForeignKey(
+        Tournament, on_delete=models.CASCADE, related_name='teams', null=True, blank=True, db_index=False
+    )
     name = models.CharField(max_length=100)
     group = models.CharField(max_length=10, default=None, blank=True, null=True)
     phone_number = models.CharField(max_length=15, blank=True, null=True)
+    rating = models.FloatField(default=1500)
     created_at = models.DateTimeField(auto_now_add=True)
     
+    objects = TeamQuerySet.as_manager()
+    
     def __str__(self):
         if self.tournament:
             return f"{self.name} ({self.tournament.name})"
@@ -31,6 +58,12 @@ class Team(models.Model):
     class Meta:
         ordering = ['name']
         unique_together = [['name', 'tournament']]
+        indexes = [
+            # Opponent lookups, group draws and ?tournament=&group= filters,
+            # in the default name order; also serves the tournament foreign key
+            models.Index(fields=['tournament', 'group', 'name'], name='team_tournament_group_idx'),
+            models.Index(fields=['group', 'name'], name='team_group_idx'),
+        ]
 
 
 class Classification(models.Model):
@@ -66,16 +99,33 @@ class Participant(models.Model):
     
     class Meta:
         ordering = ['name']
+        indexes = [
+            # ParticipantViewSet.active: only active rows, already in name order
+            models.Index(fields=['name'], condition=models.Q(is_active=True), name='participant_active_name_idx'),
+        ]
+
+
+class MatchQuerySet(models.QuerySet):
+    def for_team(self, team):
+        """Matches where the team played on either side (one index per side)"""
+        return self.filter(models.Q(team1=team) | models.Q(team2=team))
+    
+    def for_tournament(self, tournament):
+        """Matches between teams of one tournament"""
+        return self.filter(team1__tournament=tournament)
 
 
 class Match(models.Model):
-    team1 = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team1')
-    team2 = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team2')
+    # Indexed together with played_at in Meta.indexes
+    team1 = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team1', db_index=False)
+    team2 = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='matches_as_team2', db_index=False)
     goals1 = models.IntegerField(default=0)
     goals2 = models.IntegerField(default=0)
     played_at = models.DateTimeField(auto_now_add=True)
     is_finished = models.BooleanField(default=False)
     
+    objects = MatchQuerySet.as_manager()
+    
     def __str__(self):
         return f"{self.team1.name} {self.goals1} - {self.goals2} {self.team2.name}"
     
@@ -89,6 +139,58 @@ class Match(models.Model):
     
     class Meta:
         ordering = ['-played_at']
+        indexes = [
+            # Match feeds: default ordering and the cursor pagination keyset
+            models.Index(fields=['-played_at', '-id'], name='match_played_idx'),
+            # MatchViewSet.finished only ever reads finished rows
+            models.Index(
+                fields=['-played_at', '-id'], condition=models.Q(is_finished=True), name='match_finished_played_idx'
+            ),
+            # A team's matches (team1 OR team2), newest first; also serve the foreign keys
+            models.Index(fields=['team1', '-played_at'], name='match_team1_played_idx'),
+            models.Index(fields=['team2', '-played_at'], name='match_team2_played_idx'),
+        ]
+        constraints = [
+            models.CheckConstraint(check=~models.Q(team1=models.F('team2')), name='match_distinct_teams'),
+            models.CheckConstraint(check=models.Q(goals1__gte=0, goals2__gte=0), name='match_goals_non_negative'),
+        ]
+
+
+class HeadToHead(models.Model):
+    """Record of `team` against `opponent`; every pair is stored from both sides"""
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='head_to_head')
+    opponent = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='+')
+    played = models.IntegerField(default=0)
+    won = models.IntegerField(default=0)
+    drawn = models.IntegerField(default=0)
+    lost = models.IntegerField(default=0)
+    goals_for = models.IntegerField(default=0)
+    goals_against = models.IntegerField(default=0)
+    
+    def __str__(self):
+        return f"{self.team.name} vs {self.opponent.name}: {self.won}-{self.drawn}-{self.lost}"
+    
+    class Meta:
+        unique_together = [['team', 'opponent']]
+        verbose_name_plural = "Head to head"
+
+
+class RatingHistory(models.Model):
+    """Rating of a team right after one of its finished matches"""
+    team = models.ForeignKey(Team, on_delete=models.CASCADE, related_name='rating_history')
+    match = models.ForeignKey(Match, on_delete=models.CASCADE, related_name='rating_changes')
+    rating = models.FloatField()
+    change = models.FloatField()
+    
+    def __str__(self):
+        return f"{self.team.name}: {self.rating:.0f} ({self.change:+.1f})"
+    
+    class Meta:
+        ordering = ['-id']
+        verbose_name_plural = "Rating history"
+        indexes = [
+            models.Index(fields=['team', '-id'], name='ratinghistory_team_idx'),
+        ]
 
 
 class MatchSeries(models.Model):
@@ -103,10 +205,15 @@ class MatchSeries(models.Model):
     
     @property
     def total_matches(self):
+        # Querysets annotated with match counts avoid one COUNT per series
+        if hasattr(self, 'matches_count'):
+            return self.matches_count
         return self.matches.count()
     
     @property
     def finished_matches(self):
+        if hasattr(self, 'finished_matches_count'):
+            return self.finished_matches_count
         return self.matches.filter(is_finished=True).count()
     
     class Meta:
@@ -126,3 +233,47 @@ class GalleryImage(models.Model):
     
     class Meta:
         ordering = ['order', '-uploaded_at']
+
+
+class Job(models.Model):
+    """A heavy admin operation queued for the run_jobs worker (see tournaments/jobs.py)"""
+    QUEUED = 'queued'
+    RUNNING = 'running'
+    SUCCEEDED = 'succeeded'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (QUEUED, 'Queued'),
+        (RUNNING, 'Running'),
+        (SUCCEEDED, 'Succeeded'),
+        (FAILED, 'Failed'),
+    ]
+    
+    kind = models.CharField(max_length=50)
+    tournament = models.ForeignKey(Tournament, on_delete=models.CASCADE, related_name='jobs', null=True, blank=True)
+    params = models.JSONField(default=dict, blank=True)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=QUEUED)
+    progress = models.PositiveSmallIntegerField(default=0)
+    message = models.CharField(max_length=200, blank=True)
+    result = models.JSONField(null=True, blank=True)
+    error = models.TextField(blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    max_attempts = models.PositiveSmallIntegerField(default=3)
+    # Resubmitting with the same key returns the existing job instead of a new one
+    idempotency_key = models.CharField(max_length=100, unique=True, null=True, blank=True)
+    created_by = models.ForeignKey(User, on_delete=models.SET_NULL, related_name='jobs', null=True, blank=True)
+    run_after = models.DateTimeField(default=timezone.now)
+    locked_by = models.CharField(max_length=100, blank=True)
+    locked_at = models.DateTimeField(null=True, blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+    
+    def __str__(self):
+        return f"{self.kind} #{self.id} ({self.status})"
+    
+    class Meta:
+        ordering = ['-created_at', '-id']
+        indexes = [
+            # Workers look for due queued jobs, oldest first
+            models.Index(fields=['status', 'run_after'], name='job_claim_idx'),
+        ]
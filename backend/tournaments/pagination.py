@@ -0,0 +1,44 @@
+from rest_framework.pagination import CursorPagination, LimitOffsetPagination
+
+
+class OptionalLimitOffsetPagination(LimitOffsetPagination):
+    """?limit=&offset= pagination for function views; the full list is returned when no limit is sent"""
+    max_limit = 100
+
+    def paginate(self, queryset, request):
+        """Return the page items and the pagination fields to merge into the response"""
+        page = self.paginate_queryset(queryset, request)
+        if page is None:
+            return list(queryset), {}
+        return page, {
+            'count': self.count,
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+        }
+
+
+class CreatedAtCursorPagination(CursorPagination):
+    """Keyset pagination over (created_at, id), newest first"""
+    ordering = ('-created_at', '-id')
+    page_size_query_param = 'page_size'
+    max_page_size = 1000
+
+
+class PlayedAtCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-played_at', '-id')
+
+
+class StandingsCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-points', '-goals_for', 'id')
+
+
+class RatingCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-rating', 'id')
+
+
+class RatingHistoryCursorPagination(CreatedAtCursorPagination):
+    ordering = ('-id',)
+
+
+class GalleryCursorPagination(CreatedAtCursorPagination):
+    ordering = ('order', '-uploaded_at', '-id')
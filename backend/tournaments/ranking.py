@@ -0,0 +1,154 @@
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.db.models import Q
+
+from .models import Classification, Match
+from .signals import standings_changed
+from .standings import POINTS_FOR_DRAW, POINTS_FOR_LOSS, POINTS_FOR_WIN
+
+HEAD_TO_HEAD = 'head_to_head'
+
+DEFAULT_TIE_BREAKERS = ['points', 'goal_difference', 'goals_for', HEAD_TO_HEAD]
+
+STAT_KEYS = {
+    'points': lambda classification: classification.points,
+    'goal_difference': lambda classification: classification.goal_difference,
+    'goals_for': lambda classification: classification.goals_for,
+    'games_won': lambda classification: classification.games_won,
+}
+
+
+def get_tie_breakers():
+    """Tie-breakers from settings.CLASSIFICATION_TIE_BREAKERS, in priority order"""
+    tie_breakers = list(getattr(settings, 'CLASSIFICATION_TIE_BREAKERS', DEFAULT_TIE_BREAKERS))
+    unknown = [name for name in tie_breakers if name != HEAD_TO_HEAD and name not in STAT_KEYS]
+    if unknown:
+        raise ImproperlyConfigured(f'Unknown classification tie-breakers: {", ".join(unknown)}')
+    return tie_breakers
+
+
+def build_match_matrix(matches):
+    """
+    Map (team_id, opponent_id) to [points, goals_for, goals_against] earned by
+    team_id in finished matches against opponent_id.
+
+    `matches` is an iterable of (team1_id, team2_id, goals1, goals2) tuples.
+    """
+    matrix = defaultdict(lambda: [0, 0, 0])
+    for team1_id, team2_id, goals1, goals2 in matches:
+        for team_id, opponent_id, goals_for, goals_against in (
+            (team1_id, team2_id, goals1, goals2),
+            (team2_id, team1_id, goals2, goals1),
+        ):
+            if goals_for > goals_against:
+                points = POINTS_FOR_WIN
+            elif goals_for < goals_against:
+                points = POINTS_FOR_LOSS
+            else:
+                points = POINTS_FOR_DRAW
+            cell = matrix[(team_id, opponent_id)]
+            cell[0] += points
+            cell[1] += goals_for
+            cell[2] += goals_against
+    return matrix
+
+
+def _head_to_head_key(team_id, tied_ids, matrix):
+    points = goals_for = goals_against = 0
+    for opponent_id in tied_ids:
+        cell = matrix.get((team_id, opponent_id))
+        if cell:
+            points += cell[0]
+            goals_for += cell[1]
+            goals_against += cell[2]
+    return points, goals_for - goals_against, goals_for
+
+
+def _order(classifications, tie_breakers, matrix):
+    if len(classifications) <= 1 or not tie_breakers:
+        return sorted(classifications, key=lambda classification: (classification.team.name, classification.team_id))
+
+    tie_breaker, remaining = tie_breakers[0], tie_breakers[1:]
+    if tie_breaker == HEAD_TO_HEAD:
+        tied_ids = {classification.team_id for classification in classifications}
+        keys = {
+            classification.team_id: _head_to_head_key(classification.team_id, tied_ids, matrix)
+            for classification in classifications
+        }
+    else:
+        key = STAT_KEYS[tie_breaker]
+        keys = {classification.team_id: key(classification) for classification in classifications}
+
+    buckets = defaultdict(list)
+    for classification in classifications:
+        buckets[keys[classification.team_id]].append(classification)
+
+    ordered = []
+    for value in sorted(buckets, reverse=True):
+        ordered.extend(_order(buckets[value], remaining, matrix))
+    return ordered
+
+
+def rank_classifications(classifications, matrix, tie_breakers=None):
+    """
+    Order the classifications of one group and set their `position`.
+
+    Teams are split on each tie-breaker in turn; head-to-head is evaluated as a
+    mini-table restricted to the teams still tied at that point.
+    """
+    if tie_breakers is None:
+        tie_breakers = get_tie_breakers()
+    ordered = _order(list(classifications), list(tie_breakers), matrix)
+    for position, classification in enumerate(ordered, start=1):
+        classification.position = position
+    return ordered
+
+
+def _finished_results(match_filter):
+    return Match.objects.filter(match_filter, is_finished=True).order_by().values_list(
+        'team1_id', 'team2_id', 'goals1', 'goals2'
+    )
+
+
+def _save_positions(classifications, previous, tournament_id):
+    changed = [
+        classification for classification in classifications
+        if previous[classification.pk] != classification.position
+    ]
+    if changed:
+        Classification.objects.bulk_update(changed, ['position'])
+        standings_changed.send(sender=Classification, tournament_ids=[tournament_id])
+    return changed
+
+
+def update_group_positions(tournament_id, group, tie_breakers=None):
+    """Recompute positions for a single group, e.g. after a match was loaded"""
+    classifications = list(
+        Classification.objects.select_related('team').filter(team__tournament_id=tournament_id, team__group=group)
+    )
+    previous = {classification.pk: classification.position for classification in classifications}
+    team_ids = [classification.team_id for classification in classifications]
+    matrix = build_match_matrix(_finished_results(Q(team1_id__in=team_ids, team2_id__in=team_ids)))
+
+    ordered = rank_classifications(classifications, matrix, tie_breakers)
+    _save_positions(ordered, previous, tournament_id)
+    return ordered
+
+
+def update_tournament_positions(tournament, tie_breakers=None):
+    """Recompute positions for every group of a tournament with a single write"""
+    classifications = list(Classification.objects.select_related('team').filter(team__tournament=tournament))
+    previous = {classification.pk: classification.position for classification in classifications}
+    matrix = build_match_matrix(_finished_results(Q(team1__tournament=tournament)))
+
+    groups = defaultdict(list)
+    for classification in classifications:
+        groups[classification.team.group or None].append(classification)
+
+    ranked = []
+    for group_classifications in groups.values():
+        ranked.extend(rank_classifications(group_classifications, matrix, tie_breakers))
+    _save_positions(ranked, previous, tournament.id)
+    return ranked
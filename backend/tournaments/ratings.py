@@ -0,0 +1,182 @@
+from collections import defaultdict
+from itertools import islice
+
+import numpy as np
+from django.conf import settings
+from django.db import connection, transaction
+
+from .models import Match, RatingHistory, Team
+from .response_cache import invalidate_all
+
+DEFAULT_RATING = 1500
+DEFAULT_K_FACTOR = 32
+
+
+def get_k_factor():
+    return getattr(settings, 'RATING_K_FACTOR', DEFAULT_K_FACTOR)
+
+
+def expected_score(rating, opponent_rating):
+    """Elo win probability of `rating` against `opponent_rating`"""
+    return 1 / (1 + 10 ** ((opponent_rating - rating) / 400))
+
+
+def actual_score(goals_for, goals_against):
+    if goals_for > goals_against:
+        return 1.0
+    if goals_for < goals_against:
+        return 0.0
+    return 0.5
+
+
+def rating_change(rating1, rating2, goals1, goals2, k_factor=None):
+    """Points team1 gains (and team2 loses) with this result"""
+    if k_factor is None:
+        k_factor = get_k_factor()
+    return k_factor * (actual_score(goals1, goals2) - expected_score(rating1, rating2))
+
+
+def apply_match_ratings(matches):
+    """
+    Update ratings for newly finished matches, in the given order.
+
+    Used on every loaded result: one query reads the teams, one bulk_update
+    writes them back and the history rows are bulk-inserted.
+    """
+    matches = [match for match in matches if match.is_finished]
+    if not matches:
+        return {}
+
+    team_ids = {team_id for match in matches for team_id in (match.team1_id, match.team2_id)}
+    with transaction.atomic():
+        teams = Team.objects.select_for_update().only('id', 'rating').in_bulk(team_ids)
+        totals = defaultdict(float)
+        history = []
+        k_factor = get_k_factor()
+        for match in matches:
+            team1, team2 = teams[match.team1_id], teams[match.team2_id]
+            change = rating_change(team1.rating, team2.rating, match.goals1, match.goals2, k_factor)
+            team1.rating += change
+            team2.rating -= change
+            totals[team1.id] += change
+            totals[team2.id] -= change
+            history.append(RatingHistory(team=team1, match=match, rating=team1.rating, change=change))
+            history.append(RatingHistory(team=team2, match=match, rating=team2.rating, change=-change))
+
+        Team.objects.bulk_update(teams.values(), ['rating'])
+        RatingHistory.objects.bulk_create(history)
+    return dict(totals)
+
+
+def schedule_waves(team1_index, team2_index):
+    """
+    Split matches (in chronological order) into waves where no team plays
+    twice, keeping every team's matches in their original order.
+
+    All matches of a wave can then be rated at once with array operations and
+    the result is identical to a sequential replay. The assignment itself is a
+    single pure-Python pass: each match's wave depends on the waves of earlier
+    matches, which array operations cannot express.
+    """
+    last_wave = {}
+    waves = np.empty(len(team1_index), dtype=np.int64)
+    for position, (team1, team2) in enumerate(zip(team1_index.tolist(), team2_index.tolist())):
+        wave = max(last_wave.get(team1, -1), last_wave.get(team2, -1)) + 1
+        last_wave[team1] = last_wave[team2] = wave
+        waves[position] = wave
+    return waves
+
+
+def replay_ratings(team1_index, team2_index, goals1, goals2, team_count, k_factor=None, initial=DEFAULT_RATING):
+    """
+    Elo replay over the whole match history, vectorised per wave.
+
+    Inputs are parallel arrays in chronological order where teams are
+    identified by their index into the result. Returns (ratings, changes,
+    ratings_after1, ratings_after2) with team1's change per match.
+    """
+    if k_factor is None:
+        k_factor = get_k_factor()
+    ratings = np.full(team_count, float(initial))
+    changes = np.zeros(len(team1_index))
+    after1 = np.zeros(len(team1_index))
+    after2 = np.zeros(len(team1_index))
+    scores = np.where(goals1 > goals2, 1.0, np.where(goals1 < goals2, 0.0, 0.5))
+
+    waves = schedule_waves(team1_index, team2_index)
+    order = np.argsort(waves, kind='stable')
+    boundaries = np.flatnonzero(np.diff(waves[order])) + 1
+    for wave in np.split(order, boundaries):
+        if not len(wave):
+            continue
+        home, away = team1_index[wave], team2_index[wave]
+        expected = 1 / (1 + 10 ** ((ratings[away] - ratings[home]) / 400))
+        change = k_factor * (scores[wave] - expected)
+        ratings[home] += change
+        ratings[away] -= change
+        changes[wave] = change
+        after1[wave] = ratings[home]
+        after2[wave] = ratings[away]
+    return ratings, changes, after1, after2
+
+
+def _insert_history(rows, batch_size):
+    """
+    Insert (team_id, match_id, rating, change) rows with one executemany per
+    batch_size rows.
+
+    A full replay writes two rows per match; building model instances for
+    bulk_create costs far more than the replay itself.
+    """
+    meta = RatingHistory._meta
+    quote = connection.ops.quote_name
+    columns = ', '.join(quote(meta.get_field(name).column) for name in ('team', 'match', 'rating', 'change'))
+    sql = f'INSERT INTO {quote(meta.db_table)} ({columns}) VALUES (%s, %s, %s, %s)'
+    rows = iter(rows)
+    with connection.cursor() as cursor:
+        while batch := list(islice(rows, batch_size)):
+            cursor.executemany(sql, batch)
+
+
+def recompute_ratings(batch_size=5000):
+    """
+    Rebuild every rating and the full history from the finished matches.
+
+    Matches are read as plain tuples, replayed with NumPy and written back
+    with bulk operations.
+    """
+    rows = list(
+        Match.objects.filter(is_finished=True).order_by('played_at', 'id')
+        .values_list('id', 'team1_id', 'team2_id', 'goals1', 'goals2')
+    )
+    team_ids = list(Team.objects.order_by('id').values_list('id', flat=True))
+    index_of = {team_id: index for index, team_id in enumerate(team_ids)}
+
+    if rows:
+        match_ids, team1_ids, team2_ids, goals1, goals2 = (np.array(column) for column in zip(*rows))
+    else:
+        match_ids = team1_ids = team2_ids = goals1 = goals2 = np.array([], dtype=np.int64)
+    team1_index = np.array([index_of[team_id] for team_id in team1_ids.tolist()], dtype=np.int64)
+    team2_index = np.array([index_of[team_id] for team_id in team2_ids.tolist()], dtype=np.int64)
+
+    ratings, changes, after1, after2 = replay_ratings(
+        team1_index, team2_index, goals1, goals2, len(team_ids)
+    )
+
+    with transaction.atomic():
+        RatingHistory.objects.all().delete()
+        # Both rows of a match are written back to back, in match order, so
+        # history ids stay chronological for every team
+        _insert_history((
+            row
+            for match_id, team1_id, team2_id, change, rating1, rating2 in zip(
+                match_ids.tolist(), team1_ids.tolist(), team2_ids.tolist(),
+                changes.tolist(), after1.tolist(), after2.tolist()
+            )
+            for row in ((team1_id, match_id, rating1, change), (team2_id, match_id, rating2, -change))
+        ), batch_size)
+
+        teams = [Team(id=team_id, rating=rating) for team_id, rating in zip(team_ids, ratings.tolist())]
+        Team.objects.bulk_update(teams, ['rating'], batch_size=batch_size)
+    invalidate_all()
+    return len(rows)
@@ -0,0 +1,191 @@
+import os
+from concurrent.futures import ProcessPoolExecutor
+
+from django.conf import settings
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .models import Classification, Participant, Team
+from .response_cache import invalidate_tournaments
+
+PARTICIPANTS_PER_TEAM = 2
+
+# Below this many passwords starting worker processes costs more than it saves
+MIN_POOL_PASSWORDS = 8
+
+
+def get_hash_workers():
+    return getattr(settings, 'PASSWORD_HASH_WORKERS', None) or os.cpu_count() or 1
+
+
+def _hash_chunk(passwords):
+    return [make_password(password) for password in passwords]
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash passwords with the configured hasher, spread over worker processes.
+
+    Password hashing is deliberately CPU-bound, so threads would not help; each
+    worker gets one contiguous chunk and the order of the input is kept.
+    """
+    passwords = list(passwords)
+    workers = min(workers or get_hash_workers(), len(passwords))
+    if workers <= 1 or len(passwords) < MIN_POOL_PASSWORDS:
+        return _hash_chunk(passwords)
+
+    size = -(-len(passwords) // workers)
+    chunks = [passwords[start:start + size] for start in range(0, len(passwords), size)]
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return [hashed for chunk in executor.map(_hash_chunk, chunks) for hashed in chunk]
+
+
+def _text(value):
+    return str(value).strip() if value not in (None, '') else ''
+
+
+def normalize_team_row(row):
+    """
+    Bring a CSV row or a JSON object into the register_team payload shape.
+
+    CSV rows carry `participant1_name`, `participant1_phone`, ... columns while
+    JSON objects may use a `participants` list like register_team.
+    """
+    participants = row.get('participants')
+    if not isinstance(participants, list):
+        participants = [
+            {'name': row.get(f'participant{number}_name'), 'phone_number': row.get(f'participant{number}_phone')}
+            for number in range(1, PARTICIPANTS_PER_TEAM + 1)
+        ]
+    return {
+        'team_name': _text(row.get('team_name')),
+        'password': row.get('password') or '',
+        'group': _text(row.get('group')) or None,
+        'phone_number': _text(row.get('phone_number')) or None,
+        'participants': [
+            {'name': _text(participant.get('name')), 'phone_number': _text(participant.get('phone_number')) or None}
+            for participant in participants
+            if isinstance(participant, dict) and any(participant.values())
+        ],
+    }
+
+
+def _row_error(entry):
+    name_length = Team._meta.get_field('name').max_length
+    phone_length = Team._meta.get_field('phone_number').max_length
+    if not entry['team_name'] or not entry['password']:
+        return 'Team name and password are required'
+    if len(entry['team_name']) > name_length:
+        return f'Team name must be at most {name_length} characters'
+    if entry['group'] and len(entry['group']) > Team._meta.get_field('group').max_length:
+        return 'Group name is too long'
+    if len(entry['participants']) != PARTICIPANTS_PER_TEAM:
+        return f'Exactly {PARTICIPANTS_PER_TEAM} participants are required'
+    if not all(participant['name'] for participant in entry['participants']):
+        return 'Every participant needs a name'
+    phones = [entry['phone_number']] + [participant['phone_number'] for participant in entry['participants']]
+    if any(phone and len(phone) > phone_length for phone in phones):
+        return f'Phone numbers must be at most {phone_length} characters'
+    return None
+
+
+def validate_team_rows(tournament, rows):
+    """
+    Check every row, including name clashes within the file and against the
+    tournament's existing teams (fetched with one query).
+
+    Returns (entries, errors) like validate_results.
+    """
+    taken = {name.lower() for name in Team.objects.for_tournament(tournament).values_list('name', flat=True)}
+    entries = []
+    errors = []
+    for index, row in enumerate(rows, start=1):
+        if not isinstance(row, dict):
+            errors.append({'row': index, 'error': 'Each team must be an object'})
+            continue
+        entry = normalize_team_row(row)
+        error = _row_error(entry)
+        if error is None and entry['team_name'].lower() in taken:
+            error = f'Team name already exists in tournament "{tournament.name}"'
+        if error is not None:
+            errors.append({'row': index, 'error': error})
+            continue
+        taken.add(entry['team_name'].lower())
+        entries.append(entry)
+    return entries, errors
+
+
+def _username_candidate(base, tournament_id, attempt):
+    if attempt == 0:
+        return base
+    if attempt == 1:
+        return f'{base}_{tournament_id}'
+    return f'{base}_{tournament_id}_{attempt}'
+
+
+def assign_usernames(team_names, tournament_id):
+    """
+    Pick a free username per team, derived from the name like register_team.
+
+    Taken names fall back to `<name>_<tournament>` and then a counter; every
+    round checks all pending candidates with one query.
+    """
+    usernames = [None] * len(team_names)
+    bases = [name.lower().replace(' ', '_') for name in team_names]
+    claimed = set()
+    pending = list(range(len(team_names)))
+    attempt = 0
+    while pending:
+        candidates = {index: _username_candidate(bases[index], tournament_id, attempt) for index in pending}
+        existing = set(User.objects.filter(username__in=candidates.values()).values_list('username', flat=True))
+        still_pending = []
+        for index in pending:
+            candidate = candidates[index]
+            if candidate in existing or candidate in claimed:
+                still_pending.append(index)
+            else:
+                claimed.add(candidate)
+                usernames[index] = candidate
+        pending = still_pending
+        attempt += 1
+    return usernames
+
+
+def import_teams(tournament, entries, workers=None, batch_size=1000):
+    """
+    Create the users, teams, participants, tokens and empty classifications of
+    validated entries with bulk inserts in a single transaction.
+
+    Passwords are hashed up front in a process pool so the transaction only
+    holds its locks for the inserts. Returns (teams, tokens by team id).
+    """
+    hashed_passwords = hash_passwords((entry['password'] for entry in entries), workers)
+    usernames = assign_usernames([entry['team_name'] for entry in entries], tournament.id)
+
+    with transaction.atomic():
+        users = User.objects.bulk_create([
+            User(username=username, password=hashed_password, first_name=entry['team_name'])
+            for entry, username, hashed_password in zip(entries, usernames, hashed_passwords)
+        ], batch_size=batch_size)
+        teams = Team.objects.bulk_create([
+            Team(
+                user=user, tournament=tournament, name=entry['team_name'],
+                group=entry['group'], phone_number=entry['phone_number'],
+            )
+            for entry, user in zip(entries, users)
+        ], batch_size=batch_size)
+        Participant.objects.bulk_create([
+            Participant(team=team, name=participant['name'], phone_number=participant['phone_number'], is_active=True)
+            for entry, team in zip(entries, teams)
+            for participant in entry['participants']
+        ], batch_size=batch_size)
+        tokens = Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users], batch_size=batch_size
+        )
+        Classification.objects.bulk_create(
+            [Classification(team=team) for team in teams], batch_size=batch_size
+        )
+    invalidate_tournaments([tournament.id])
+    return teams, {team.id: token.key for team, token in zip(teams, tokens)}
@@ -0,0 +1,201 @@
+import hashlib
+import time
+from functools import wraps
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from django.utils.cache import patch_cache_control
+from django.utils.http import http_date, quote_etag
+from rest_framework import status
+from rest_framework.response import Response
+
+from .models import Tournament
+
+EPOCH_KEY = 'tournaments:generation:epoch'
+ALL_TOURNAMENTS = 'all'
+
+
+def _generation_key(scope):
+    return f'tournaments:generation:{scope}'
+
+
+def _bump(keys):
+    now = time.time()
+    cache.set_many({key: now for key in keys}, timeout=None)
+
+
+def bump_versions(tournaments):
+    """Increment the version of the given tournaments queryset with one UPDATE"""
+    tournaments.update(version=F('version') + 1, modified_at=timezone.now())
+
+
+class _PendingInvalidation:
+    """Tournaments changed by a transaction, invalidated together when it commits"""
+
+    def __init__(self):
+        self.tournament_ids = set()
+        self.everything = False
+        self.registered = False
+        self.done = False
+
+    def __call__(self):
+        self.done = True
+        if self.everything:
+            bump_versions(Tournament.objects.all())
+            _bump([EPOCH_KEY])
+            return
+        if self.tournament_ids:
+            bump_versions(Tournament.objects.filter(id__in=self.tournament_ids))
+        _bump([_generation_key(ALL_TOURNAMENTS)])
+
+    def run_unless_registered(self):
+        if not self.registered:
+            self()
+
+
+def _pending_invalidation():
+    """
+    The invalidation waiting for the current transaction to commit.
+
+    Outside a transaction a new one is returned for immediate use. Django
+    drops the on_commit callbacks of rolled back savepoints, so a pending
+    invalidation is only reused while it is still registered.
+    """
+    connection = transaction.get_connection()
+    if not connection.in_atomic_block:
+        return _PendingInvalidation()
+    for _savepoint_ids, callback, *_robust in connection.run_on_commit:
+        if isinstance(callback, _PendingInvalidation) and not callback.done:
+            return callback
+    pending = _PendingInvalidation()
+    pending.registered = True
+    transaction.on_commit(pending)
+    return pending
+
+
+def invalidate_tournaments(tournament_ids):
+    """
+    Bump the version of the given tournaments and invalidate the unfiltered lists.
+
+    Inside a transaction the tournaments are collected and bumped with one
+    UPDATE on commit: per-row signals (cascading deletes, bulk loads) neither
+    write nor lock the tournament rows while the transaction is open.
+    """
+    pending = _pending_invalidation()
+    pending.tournament_ids.update(tournament_id for tournament_id in tournament_ids if tournament_id is not None)
+    pending.run_unless_registered()
+
+
+def invalidate_all():
+    """Invalidate every cached response, used when the affected tournament is unknown"""
+    pending = _pending_invalidation()
+    pending.everything = True
+    pending.run_unless_registered()
+
+
+def get_generation(scope):
+    """
+    Return the time of the last invalidation that affects `scope`.
+
+    Used for responses that are not limited to one tournament. Missing
+    generations (first use or evicted) start now, which only costs a cache
+    miss.
+    """
+    keys = [EPOCH_KEY, _generation_key(scope)]
+    values = cache.get_many(keys)
+    missing = [key for key in keys if key not in values]
+    if missing:
+        now = time.time()
+        cache.set_many({key: now for key in missing}, timeout=None)
+        values.update({key: now for key in missing})
+    return max(values.values())
+
+
+def get_validators(scope):
+    """
+    (version, last_modified) of a `?tournament=` scope.
+
+    A tournament id is answered from its version counter with a single primary
+    key lookup, which every process sees alike; anything else falls back to
+    the cache generation.
+    """
+    if scope.isdigit():
+        state = Tournament.objects.filter(id=scope).values_list('version', 'modified_at').first()
+        if state is not None:
+            version, modified_at = state
+            return f'{scope}:{version}', modified_at.timestamp()
+    generation = get_generation(scope)
+    return generation, generation
+
+
+def fingerprint(key, scope):
+    """(fingerprint, last_modified) of the representation `key` of a `?tournament=` scope"""
+    version, last_modified = get_validators(str(scope))
+    return hashlib.md5(f'{key}:{version}'.encode()).hexdigest(), last_modified
+
+
+def etag_matches(if_none_match, etag):
+    """Whether an If-None-Match header value covers `etag`"""
+    return if_none_match.strip() == '*' or etag in [tag.strip() for tag in if_none_match.split(',')]
+
+
+def conditional_response(request, etag, last_modified):
+    """
+    A 304 response when If-None-Match covers the ETag, otherwise None.
+
+    If-Modified-Since alone is not honoured: HTTP dates have whole-second
+    precision, so a change made in the same second as the cached response
+    would be answered with a stale 304.
+    """
+    if_none_match = request.headers.get('If-None-Match')
+    if if_none_match is not None and etag_matches(if_none_match, etag):
+        return not_modified(etag, last_modified)
+    return None
+
+
+def not_modified(etag, last_modified):
+    return set_validators(Response(status=status.HTTP_304_NOT_MODIFIED), etag, last_modified)
+
+
+def set_validators(response, etag, last_modified):
+    response['ETag'] = etag
+    response['Last-Modified'] = http_date(last_modified)
+    patch_cache_control(response, no_cache=True)
+    return response
+
+
+def cache_response(view_method):
+    """
+    Cache the data of a read-only viewset method per tournament.
+
+    Entries are keyed by the full request path (so `group`, `fields` and the
+    pagination cursor are part of the key) plus the version of the
+    `?tournament=` scope, which model signals bump on every change (unfiltered
+    lists use the cache generation instead). Clients revalidating with
+    If-None-Match get a 304.
+    """
+    @wraps(view_method)
+    def wrapper(self, request, *args, **kwargs):
+        scope = request.query_params.get('tournament') or ALL_TOURNAMENTS
+        digest, last_modified = fingerprint(f'{view_method.__qualname__}:{request.get_full_path()}', scope)
+        etag = quote_etag(digest)
+
+        # Revalidation is answered before the view builds any queryset
+        response = conditional_response(request, etag, last_modified)
+        if response is not None:
+            return response
+
+        key = f'tournaments:response:{digest}'
+        data = cache.get(key)
+        if data is None:
+            response = view_method(self, request, *args, **kwargs)
+            if response.status_code != status.HTTP_200_OK:
+                return response
+            data = response.data
+            cache.set(key, data, timeout=settings.RESPONSE_CACHE_TIMEOUT)
+        return set_validators(Response(data), etag, last_modified)
+
+    return wrapper
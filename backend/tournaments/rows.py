@@ -0,0 +1,200 @@
+from operator import itemgetter
+
+from django.db.models import OuterRef, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from rest_framework.response import Response
+
+from .models import Participant
+
+
+class Computed:
+    """An output field derived from one or more selected columns"""
+
+    def __init__(self, function, *sources):
+        self.function = function
+        self.sources = sources
+
+
+class Related:
+    """
+    A column reached through a nullable foreign key.
+
+    Like a serializer field with a dotted source, the key is left out of the
+    row when the foreign key is null.
+    """
+
+    def __init__(self, lookup, via):
+        self.lookup = lookup
+        self.via = via
+
+
+def _computed_getter(computed):
+    function = computed.function
+    arguments = tuple(itemgetter(column) for column in computed.sources)
+    return lambda row: function(*[argument(row) for argument in arguments])
+
+
+def iso_datetime(value):
+    """The string DRF's DateTimeField renders for an aware datetime"""
+    if value is None:
+        return None
+    value = timezone.localtime(value).isoformat()
+    if value.endswith('+00:00'):
+        value = value[:-6] + 'Z'
+    return value
+
+
+class RowMapper:
+    """
+    Build serializer-equivalent dicts from `.values()` rows.
+
+    Fields map an output name to a column lookup or a Computed. `compile()`
+    turns the requested fields into the column list and a function over a
+    tuple of (name, getter) pairs, resolved once per field set, so a row costs
+    one getter call per field instead of the per-field introspection of a
+    ModelSerializer.
+    """
+
+    def __init__(self, fields, annotations=None):
+        self.fields = fields
+        # Column name -> expression, for columns that are not plain lookups
+        self.annotations = annotations or {}
+        self._compiled = {}
+
+    def compile(self, requested=None, extra_columns=()):
+        names = tuple(name for name in self.fields if not requested or name in requested)
+        key = (names, tuple(extra_columns))
+        if key not in self._compiled:
+            self._compiled[key] = self._build(names, extra_columns)
+        return self._compiled[key]
+
+    def _build(self, names, extra_columns):
+        columns = []
+        getters = []
+        omissions = []
+        for name in names:
+            source = self.fields[name]
+            if isinstance(source, Computed):
+                getters.append((name, _computed_getter(source)))
+                sources = source.sources
+            elif isinstance(source, Related):
+                getters.append((name, itemgetter(source.lookup)))
+                omissions.append((name, itemgetter(source.via)))
+                sources = (source.lookup, source.via)
+            else:
+                getters.append((name, itemgetter(source)))
+                sources = (source,)
+            columns.extend(column for column in sources if column not in columns)
+        columns.extend(column for column in extra_columns if column not in columns)
+
+        getters = tuple(getters)
+        omissions = tuple(omissions)
+
+        def to_row(row):
+            data = {name: getter(row) for name, getter in getters}
+            for name, via in omissions:
+                if via(row) is None:
+                    del data[name]
+            return data
+
+        return columns, to_row
+
+    def values(self, queryset, columns):
+        """The `.values()` queryset selecting `columns`, annotations included"""
+        annotations = {column: expression for column, expression in self.annotations.items() if column in columns}
+        return queryset.prefetch_related(None).values(
+            *[column for column in columns if column not in annotations], **annotations
+        )
+
+
+def _team_phone():
+    # Same choice as TeamSerializer.get_phone_number: the first participant
+    # (in name order) with a phone, else the team's own number
+    first_phone = Participant.objects.filter(
+        team=OuterRef('pk'), phone_number__isnull=False
+    ).order_by('name', 'id').values('phone_number')[:1]
+    return Coalesce(Subquery(first_phone), 'phone_number')
+
+
+def _winner_name(goals1, goals2, team1_name, team2_name):
+    if goals1 > goals2:
+        return team1_name
+    if goals2 > goals1:
+        return team2_name
+    return None
+
+
+TEAM_ROWS = RowMapper({
+    'id': 'id',
+    'name': 'name',
+    'group': 'group',
+    'phone_number': 'contact_phone',
+    'tournament': 'tournament',
+    'tournament_name': Related('tournament__name', via='tournament'),
+    'rating': 'rating',
+    'created_at': Computed(iso_datetime, 'created_at'),
+}, annotations={'contact_phone': _team_phone()})
+
+CLASSIFICATION_ROWS = RowMapper({
+    'id': 'id',
+    'team': 'team',
+    'team_name': 'team__name',
+    'points': 'points',
+    'games_played': 'games_played',
+    'games_won': 'games_won',
+    'games_lost': 'games_lost',
+    'goals_for': 'goals_for',
+    'goals_against': 'goals_against',
+    'goal_difference': Computed(lambda goals_for, goals_against: goals_for - goals_against, 'goals_for', 'goals_against'),
+    'position': 'position',
+})
+
+MATCH_ROWS = RowMapper({
+    'id': 'id',
+    'team1_name': 'team1__name',
+    'team2_name': 'team2__name',
+    'winner_name': Computed(_winner_name, 'goals1', 'goals2', 'team1__name', 'team2__name'),
+    'goals1': 'goals1',
+    'goals2': 'goals2',
+    'played_at': Computed(iso_datetime, 'played_at'),
+    'is_finished': 'is_finished',
+    'team1': 'team1',
+    'team2': 'team2',
+})
+
+
+def requested_fields(request):
+    """The `?fields=` names, as SparseFieldsetMixin reads them"""
+    fields = request.query_params.get('fields')
+    if not fields:
+        return None
+    return {name.strip() for name in fields.split(',')}
+
+
+class ValuesListMixin:
+    """
+    Serve read-only lists from `.values()` rows through `row_mapper`.
+
+    Responses match the viewset's serializer, including `?fields=` and cursor
+    pagination (the ordering columns are selected for the cursor even when
+    they are not returned).
+    """
+    row_mapper = None
+
+    def _ordering_columns(self):
+        ordering = getattr(self.paginator, 'ordering', None) or ()
+        if isinstance(ordering, str):
+            ordering = (ordering,)
+        return [field.lstrip('-') for field in ordering]
+
+    def values_rows(self, queryset, paginate=True):
+        columns, to_row = self.row_mapper.compile(
+            requested_fields(self.request), self._ordering_columns() if paginate else ()
+        )
+        rows = self.row_mapper.values(queryset, columns)
+        if paginate:
+            page = self.paginate_queryset(rows)
+            if page is not None:
+                return self.get_paginated_response([to_row(row) for row in page])
+        return Response([to_row(row) for row in rows])
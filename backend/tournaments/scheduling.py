@@ -0,0 +1,293 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import Match, MatchSeries, Team
+from .ranking import update_tournament_positions
+from .signals import standings_changed
+
+
+class SchedulingError(Exception):
+    """Raised when fixtures cannot be generated for a tournament"""
+
+
+def round_robin_rounds(team_ids, legs=1):
+    """
+    Balanced round-robin schedule built with the circle method.
+
+    Returns a list of rounds, each a list of (home_id, away_id) pairs. Every
+    team plays once per round (or rests when the count is odd) and home games
+    differ by at most one between teams. Additional legs repeat the schedule
+    with home and away swapped.
+    """
+    teams = list(team_ids)
+    if len(teams) < 2:
+        return []
+    if len(teams) % 2:
+        # The bye takes the fixed slot so every real team rotates evenly
+        teams.insert(0, None)
+
+    size = len(teams)
+    fixed, rotating = teams[0], teams[1:]
+    rounds = []
+    for round_index in range(size - 1):
+        current = [fixed] + rotating
+        pairs = []
+        for index in range(size // 2):
+            home, away = current[index], current[size - 1 - index]
+            # Alternate the fixed team every round and the rest by slot, so
+            # nobody gets a long run of home or away games
+            if (index == 0 and round_index % 2) or (index and index % 2):
+                home, away = away, home
+            if home is not None and away is not None:
+                pairs.append((home, away))
+        rounds.append(pairs)
+        rotating = rotating[-1:] + rotating[:-1]
+
+    schedule = []
+    for leg in range(legs):
+        for pairs in rounds:
+            schedule.append(pairs if leg % 2 == 0 else [(away, home) for home, away in pairs])
+    return schedule
+
+
+def bracket_order(size):
+    """Seed numbers in bracket order, e.g. 8 -> [1, 8, 4, 5, 2, 7, 3, 6]"""
+    order = [1]
+    while len(order) < size:
+        total = len(order) * 2 + 1
+        order = [seed for top in order for seed in (top, total - top)]
+    return order
+
+
+def knockout_pairs(seeded_team_ids):
+    """
+    First-round pairs for a single-elimination bracket.
+
+    The bracket is padded to the next power of two; top seeds receive the byes
+    and meet the lowest seeds otherwise. Returns (pairs, byes).
+    """
+    teams = list(seeded_team_ids)
+    size = 1
+    while size < len(teams):
+        size *= 2
+    order = bracket_order(size)
+
+    pairs = []
+    byes = []
+    for index in range(0, size, 2):
+        home_seed, away_seed = order[index], order[index + 1]
+        home = teams[home_seed - 1] if home_seed <= len(teams) else None
+        away = teams[away_seed - 1] if away_seed <= len(teams) else None
+        if home is not None and away is not None:
+            pairs.append((home, away))
+        elif home is not None or away is not None:
+            byes.append(home if home is not None else away)
+    return pairs, byes
+
+
+def avoid_group_rematches(pairs, group_of):
+    """
+    Swap opponents between first-round pairs so teams from the same group do
+    not meet again, preferring the closest pair so seeding is barely changed.
+    """
+    pairs = [list(pair) for pair in pairs]
+    for index, pair in enumerate(pairs):
+        if group_of[pair[0]] != group_of[pair[1]]:
+            continue
+        others = sorted(range(len(pairs)), key=lambda other: abs(other - index))
+        for other in others:
+            home, away = pairs[other]
+            if other != index and group_of[pair[0]] != group_of[away] and group_of[home] != group_of[pair[1]]:
+                pair[1], pairs[other][1] = away, pair[1]
+                break
+    return [tuple(pair) for pair in pairs]
+
+
+def pending_fixtures(tournament):
+    """Unplayed matches between teams of the tournament"""
+    return Match.objects.for_tournament(tournament).filter(is_finished=False)
+
+
+def scheduled_pairs(team_ids):
+    """Frozensets of the team id pairs among `team_ids` that have an unplayed fixture"""
+    return {
+        frozenset(pair) for pair in Match.objects.filter(
+            team1_id__in=team_ids, team2_id__in=team_ids, is_finished=False
+        ).values_list('team1_id', 'team2_id')
+    }
+
+
+def scheduled_opponents(team):
+    """Ids of the teams `team` has an unplayed fixture against"""
+    return {
+        opponent for pair in Match.objects.for_team(team).filter(is_finished=False).values_list('team1_id', 'team2_id')
+        for opponent in pair if opponent != team.id
+    }
+
+
+def record_results(results):
+    """
+    Store (team1, team2, goals1, goals2) results as finished matches.
+
+    A result fills the oldest unplayed fixture between the same two teams when
+    one was scheduled (in either orientation) and creates a new match
+    otherwise. Returns the matches in the order of `results`.
+    """
+    team_ids = {team.id for result in results for team in result[:2]}
+    fixtures = defaultdict(list)
+    for fixture in Match.objects.select_related('team1', 'team2').filter(
+        team1_id__in=team_ids, team2_id__in=team_ids, is_finished=False
+    ).order_by('id'):
+        fixtures[(fixture.team1_id, fixture.team2_id)].append(fixture)
+
+    now = timezone.now()
+    matches = []
+    filled = []
+    created = []
+    for team1, team2, goals1, goals2 in results:
+        if fixtures[(team1.id, team2.id)]:
+            match = fixtures[(team1.id, team2.id)].pop(0)
+            match.goals1, match.goals2 = goals1, goals2
+        elif fixtures[(team2.id, team1.id)]:
+            match = fixtures[(team2.id, team1.id)].pop(0)
+            match.goals1, match.goals2 = goals2, goals1
+        else:
+            match = Match(team1=team1, team2=team2, goals1=goals1, goals2=goals2, is_finished=True)
+            created.append(match)
+            matches.append(match)
+            continue
+        match.is_finished = True
+        match.played_at = now
+        filled.append(match)
+        matches.append(match)
+
+    with transaction.atomic():
+        if filled:
+            Match.objects.bulk_update(filled, ['goals1', 'goals2', 'is_finished', 'played_at'])
+        Match.objects.bulk_create(created)
+    return matches
+
+
+def _create_series(named_rounds, batch_size):
+    """Bulk-create unplayed matches and one MatchSeries per (name, pairs) round"""
+    matches = []
+    series = []
+    for name, description, pairs in named_rounds:
+        series.append(MatchSeries(name=name, description=description))
+        matches.append([Match(team1_id=home, team2_id=away) for home, away in pairs])
+
+    MatchSeries.objects.bulk_create(series, batch_size=batch_size)
+    Match.objects.bulk_create([match for round_matches in matches for match in round_matches], batch_size=batch_size)
+
+    Through = MatchSeries.matches.through
+    Through.objects.bulk_create([
+        Through(matchseries_id=round_series.id, match_id=match.id)
+        for round_series, round_matches in zip(series, matches)
+        for match in round_matches
+    ], batch_size=batch_size)
+    return series, sum(len(round_matches) for round_matches in matches)
+
+
+def generate_group_fixtures(tournament, legs=1, batch_size=1000):
+    """
+    Create the round-robin schedule for every group of a tournament.
+
+    One MatchSeries is created per group and round. Teams without a group are
+    skipped. Fails if the tournament still has unplayed fixtures.
+    """
+    if legs < 1:
+        raise SchedulingError('At least one leg is required')
+    if pending_fixtures(tournament).exists():
+        raise SchedulingError('Tournament already has unplayed fixtures')
+
+    groups = defaultdict(list)
+    for team_id, group in (
+        Team.objects.for_tournament(tournament).exclude(Q(group__isnull=True) | Q(group=''))
+        .order_by('group', 'name', 'id').values_list('id', 'group')
+    ):
+        groups[group].append(team_id)
+    if not groups:
+        raise SchedulingError('No teams have been assigned to groups')
+
+    named_rounds = []
+    for group, team_ids in sorted(groups.items()):
+        for round_number, pairs in enumerate(round_robin_rounds(team_ids, legs), start=1):
+            named_rounds.append((
+                f'{tournament.name} - Group {group} - Round {round_number}',
+                f'Group {group} round-robin',
+                pairs,
+            ))
+
+    with transaction.atomic():
+        series, match_count = _create_series(named_rounds, batch_size)
+    standings_changed.send(sender=Match, tournament_ids=[tournament.id])
+    return {'groups': len(groups), 'series': len(series), 'matches': match_count}
+
+
+# Description of the series generate_knockout_bracket creates
+KNOCKOUT_STAGE = 'Knockout stage'
+
+
+def _round_name(team_count):
+    names = {2: 'Final', 4: 'Semi-finals', 8: 'Quarter-finals'}
+    size = 1
+    while size < team_count:
+        size *= 2
+    return names.get(size, f'Round of {size}')
+
+
+def seed_qualifiers(tournament, qualifiers_per_group=2):
+    """
+    (team_id, group) of the teams that qualify for the knockout stage, best
+    seed first.
+
+    All group winners are seeded ahead of the runners-up and so on; within the
+    same group position teams are ordered by points, goal difference and goals.
+    """
+    ranked = update_tournament_positions(tournament)
+    qualifiers = [
+        classification for classification in ranked
+        if classification.team.group and classification.position <= qualifiers_per_group
+    ]
+    qualifiers.sort(key=lambda classification: (
+        classification.position,
+        -classification.points,
+        -classification.goal_difference,
+        -classification.goals_for,
+        classification.team.name,
+    ))
+    return [(classification.team_id, classification.team.group) for classification in qualifiers]
+
+
+def generate_knockout_bracket(tournament, qualifiers_per_group=2, batch_size=1000):
+    """
+    Create the first knockout round, seeded from the group positions.
+
+    Later rounds depend on results and are not generated here. Fails if the
+    tournament still has unplayed fixtures or already has a knockout stage.
+    Returns the created counts and the ids of teams that received a bye.
+    """
+    if qualifiers_per_group < 1:
+        raise SchedulingError('At least one team per group must qualify')
+    if pending_fixtures(tournament).exists():
+        raise SchedulingError('Tournament already has unplayed fixtures')
+    if MatchSeries.objects.filter(
+        description=KNOCKOUT_STAGE, matches__in=Match.objects.for_tournament(tournament)
+    ).exists():
+        raise SchedulingError('Tournament already has a knockout stage')
+
+    seeded = seed_qualifiers(tournament, qualifiers_per_group)
+    if len(seeded) < 2:
+        raise SchedulingError('Not enough classified teams for a knockout stage')
+
+    group_of = dict(seeded)
+    pairs, byes = knockout_pairs(group_of)
+    pairs = avoid_group_rematches(pairs, group_of)
+    name = f'{tournament.name} - {_round_name(len(seeded))}'
+    with transaction.atomic():
+        series, match_count = _create_series([(name, KNOCKOUT_STAGE, pairs)], batch_size)
+    standings_changed.send(sender=Match, tournament_ids=[tournament.id])
+    return {'series': len(series), 'matches': match_count, 'byes': byes}
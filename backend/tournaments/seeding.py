@@ -0,0 +1,114 @@
+import datetime
+import random
+
+from django.contrib.auth.hashers import make_password
+from django.contrib.auth.models import User
+from django.db import transaction
+from rest_framework.authtoken.models import Token
+
+from .models import Tournament, Team, Participant, Match
+from .ranking import update_tournament_positions
+from .scheduling import round_robin_rounds
+from .standings import recompute_standings
+
+WINNING_SCORE = 10
+
+
+def group_name(index):
+    """Spreadsheet-style group names: A..Z, AA, AB, ..."""
+    name = ''
+    index += 1
+    while index:
+        index, remainder = divmod(index - 1, 26)
+        name = chr(ord('A') + remainder) + name
+    return name
+
+
+def random_score(rng):
+    """A finished foosball score: first to WINNING_SCORE goals"""
+    loser_goals = rng.randint(0, WINNING_SCORE - 1)
+    if rng.random() < 0.5:
+        return WINNING_SCORE, loser_goals
+    return loser_goals, WINNING_SCORE
+
+
+def create_team_users(teams, password, batch_size=1000, with_tokens=False):
+    """
+    Create one login per team with bulk inserts.
+
+    The password is hashed once and the hash shared by every user, which is
+    what makes seeding thousands of teams fast compared to create_user().
+    """
+    password_hash = make_password(password)
+    usernames = [team.name.lower().replace(' ', '_') for team in teams]
+    taken = set(User.objects.filter(username__in=usernames).values_list('username', flat=True))
+
+    users = []
+    for team, username in zip(teams, usernames):
+        if username in taken:
+            username = f'{username}_{team.id}'
+        users.append(User(username=username, password=password_hash, first_name=team.name[:150]))
+    users = User.objects.bulk_create(users, batch_size=batch_size)
+
+    for team, user in zip(teams, users):
+        team.user = user
+    Team.objects.bulk_update(teams, ['user'], batch_size=batch_size)
+
+    if with_tokens:
+        Token.objects.bulk_create(
+            [Token(user=user, key=Token.generate_key()) for user in users],
+            batch_size=batch_size
+        )
+    return users
+
+
+def seed_tournament(name, groups=4, teams_per_group=8, legs=1, seed=0, batch_size=1000,
+                    played_ratio=1.0, with_users=False, password='password', with_tokens=False):
+    """
+    Create a synthetic tournament with bulk inserts: teams split in groups,
+    two participants per team, a round-robin inside every group (finished with
+    probability `played_ratio`, home and away swapped on every other leg) and
+    the resulting classifications.
+
+    The same arguments always produce the same teams, fixtures and scores.
+    """
+    rng = random.Random(seed)
+    today = datetime.date.today()
+
+    with transaction.atomic():
+        tournament = Tournament.objects.create(
+            name=name,
+            start_date=today,
+            estimated_end_date=today + datetime.timedelta(days=90)
+        )
+
+        teams = Team.objects.bulk_create([
+            Team(tournament=tournament, name=f'{name} {group_name(group)}{number}', group=group_name(group))
+            for group in range(groups)
+            for number in range(1, teams_per_group + 1)
+        ], batch_size=batch_size)
+
+        if with_users:
+            create_team_users(teams, password, batch_size=batch_size, with_tokens=with_tokens)
+
+        Participant.objects.bulk_create([
+            Participant(team=team, name=f'{team.name} P{seat}', phone_number=f'6{index:07d}{seat}', is_active=True)
+            for index, team in enumerate(teams)
+            for seat in (1, 2)
+        ], batch_size=batch_size)
+
+        matches = []
+        for start in range(0, len(teams), teams_per_group):
+            for pairs in round_robin_rounds(teams[start:start + teams_per_group], legs=legs):
+                for home, away in pairs:
+                    if rng.random() < played_ratio:
+                        goals1, goals2 = random_score(rng)
+                        matches.append(Match(team1=home, team2=away, goals1=goals1, goals2=goals2, is_finished=True))
+                    else:
+                        matches.append(Match(team1=home, team2=away))
+        Match.objects.bulk_create(matches, batch_size=batch_size)
+
+        recompute_standings(tournament)
+        update_tournament_positions(tournament)
+
+    return tournament
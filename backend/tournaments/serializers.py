@@ -1,30 +1,51 @@
 from rest_framework import serializers
-from .models import Tournament, Team, Classification, Participant, GalleryImage, Match, MatchSeries
+from .models import Tournament, Team, Classification, Participant, GalleryImage, Match, MatchSeries, RatingHistory
 
 
-class TournamentSerializer(serializers.ModelSerializer):
+class SparseFieldsetMixin:
+    """Keep only the fields listed in a `?fields=id,name` query parameter on read requests"""
+    
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get('request')
+        if request is None or request.method not in ('GET', 'HEAD'):
+            return
+        fields = request.query_params.get('fields')
+        if fields:
+            requested = {name.strip() for name in fields.split(',')}
+            for name in set(self.fields) - requested:
+                self.fields.pop(name)
+
+
+class TournamentSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = Tournament
         fields = ['id', 'name', 'start_date', 'estimated_end_date', 'created_at']
 
 
-class TeamSerializer(serializers.ModelSerializer):
+class TeamSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     phone_number = serializers.SerializerMethodField()
     tournament_name = serializers.CharField(source='tournament.name', read_only=True)
     
     class Meta:
         model = Team
-        fields = ['id', 'name', 'group', 'phone_number', 'tournament', 'tournament_name', 'created_at']
+        fields = ['id', 'name', 'group', 'phone_number', 'tournament', 'tournament_name', 'rating', 'created_at']
+        read_only_fields = ['rating']
     
     def get_phone_number(self, obj):
-        # Get phone number from the first participant that has one
-        participant = obj.participants.filter(phone_number__isnull=False).first()
+        # Get phone number from the first participant that has one,
+        # using the prefetched list when the queryset provides it
+        participants = getattr(obj, 'participants_with_phone', None)
+        if participants is None:
+            participant = obj.participants.filter(phone_number__isnull=False).first()
+        else:
+            participant = participants[0] if participants else None
         if participant:
             return participant.phone_number
         return obj.phone_number  # Fallback to team's phone number if exists
 
 
-class ClassificationSerializer(serializers.ModelSerializer):
+class ClassificationSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     team_name = serializers.CharField(source='team.name', read_only=True)
     goal_difference = serializers.ReadOnlyField()
     
@@ -34,7 +55,7 @@ class ClassificationSerializer(serializers.ModelSerializer):
                  'games_lost', 'goals_for', 'goals_against', 'goal_difference', 'position']
 
 
-class ParticipantSerializer(serializers.ModelSerializer):
+class ParticipantSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     team_name = serializers.CharField(source='team.name', read_only=True)
     
     class Meta:
@@ -42,7 +63,7 @@ class ParticipantSerializer(serializers.ModelSerializer):
         fields = ['id', 'name', 'team', 'team_name', 'is_active', 'created_at']
 
 
-class MatchSerializer(serializers.ModelSerializer):
+class MatchSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     team1_name = serializers.CharField(source='team1.name', read_only=True)
     team2_name = serializers.CharField(source='team2.name', read_only=True)
     winner_name = serializers.SerializerMethodField()
@@ -56,7 +77,15 @@ class MatchSerializer(serializers.ModelSerializer):
         return winner.name if winner else None
 
 
-class MatchSeriesSerializer(serializers.ModelSerializer):
+class RatingHistorySerializer(SparseFieldsetMixin, serializers.ModelSerializer):
+    played_at = serializers.DateTimeField(source='match.played_at', read_only=True)
+    
+    class Meta:
+        model = RatingHistory
+        fields = ['id', 'team', 'match', 'rating', 'change', 'played_at']
+
+
+class MatchSeriesSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     matches = MatchSerializer(many=True, read_only=True)
     total_matches = serializers.ReadOnlyField()
     finished_matches = serializers.ReadOnlyField()
@@ -66,7 +95,7 @@ class MatchSeriesSerializer(serializers.ModelSerializer):
         fields = '__all__'
 
 
-class GalleryImageSerializer(serializers.ModelSerializer):
+class GalleryImageSerializer(SparseFieldsetMixin, serializers.ModelSerializer):
     class Meta:
         model = GalleryImage
         fields = '__all__'
@@ -0,0 +1,47 @@
+from django.core.exceptions import ObjectDoesNotExist
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import Signal, receiver
+
+from .models import Classification, Match, Participant, Team
+from .response_cache import invalidate_all, invalidate_tournaments
+
+# Sent by bulk standings writes (queryset.update/bulk_update skip post_save)
+standings_changed = Signal()  # kwargs: tournament_ids
+
+
+@receiver([post_save, post_delete], sender=Team)
+def team_changed(sender, instance, **kwargs):
+    invalidate_tournaments([instance.tournament_id])
+
+
+@receiver([post_save, post_delete], sender=Classification)
+def classification_changed(sender, instance, **kwargs):
+    try:
+        invalidate_tournaments([instance.team.tournament_id])
+    except ObjectDoesNotExist:
+        # Deleted together with its team
+        invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Participant)
+def participant_changed(sender, instance, **kwargs):
+    # Team responses carry the first participant's phone
+    if instance.team_id is None:
+        return
+    try:
+        invalidate_tournaments([instance.team.tournament_id])
+    except ObjectDoesNotExist:
+        invalidate_all()
+
+
+@receiver([post_save, post_delete], sender=Match)
+def match_changed(sender, instance, **kwargs):
+    try:
+        invalidate_tournaments([instance.team1.tournament_id, instance.team2.tournament_id])
+    except ObjectDoesNotExist:
+        invalidate_all()
+
+
+@receiver(standings_changed)
+def standings_updated(sender, tournament_ids, **kwargs):
+    invalidate_tournaments(tournament_ids)
@@ -0,0 +1,180 @@
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Case, Count, F, IntegerField, Q, Sum, Value, When
+
+from .head_to_head import UPDATE_CHUNK_SIZE, apply_head_to_head, rebuild_head_to_head
+from .models import Classification, Match, Team
+from .signals import standings_changed
+
+POINTS_FOR_WIN = 3
+POINTS_FOR_DRAW = 1
+POINTS_FOR_LOSS = 0
+
+STAT_FIELDS = ['points', 'games_played', 'games_won', 'games_lost', 'goals_for', 'goals_against']
+
+
+def empty_stats():
+    return dict.fromkeys(STAT_FIELDS, 0)
+
+
+def result_delta(goals_for, goals_against):
+    """Classification delta for one team given the score of a single match"""
+    delta = empty_stats()
+    delta['games_played'] = 1
+    delta['goals_for'] = goals_for
+    delta['goals_against'] = goals_against
+    if goals_for > goals_against:
+        delta['games_won'] = 1
+        delta['points'] = POINTS_FOR_WIN
+    elif goals_for < goals_against:
+        delta['games_lost'] = 1
+        delta['points'] = POINTS_FOR_LOSS
+    else:
+        delta['points'] = POINTS_FOR_DRAW
+    return delta
+
+
+def aggregate_deltas(results):
+    """Merge (team1_id, team2_id, goals1, goals2) tuples into one delta per team"""
+    deltas = defaultdict(empty_stats)
+    for team1_id, team2_id, goals1, goals2 in results:
+        for team_id, goals_for, goals_against in ((team1_id, goals1, goals2), (team2_id, goals2, goals1)):
+            totals = deltas[team_id]
+            for field, value in result_delta(goals_for, goals_against).items():
+                totals[field] += value
+    return dict(deltas)
+
+
+def ensure_classifications(team_ids):
+    """Create empty classification rows for the given teams if they are missing"""
+    Classification.objects.bulk_create(
+        [Classification(team_id=team_id) for team_id in set(team_ids)],
+        ignore_conflicts=True,
+    )
+
+
+def apply_deltas(deltas):
+    """
+    Add per-team deltas to the stored classifications.
+
+    Missing rows are created first and then the teams are updated with
+    F-expressions, one UPDATE per chunk of teams, so concurrent submissions
+    add up instead of overwriting each other.
+    """
+    deltas = {team_id: delta for team_id, delta in deltas.items() if any(delta.values())}
+    if not deltas:
+        return 0
+
+    team_ids = list(deltas)
+    updated = 0
+    with transaction.atomic():
+        ensure_classifications(team_ids)
+        for start in range(0, len(team_ids), UPDATE_CHUNK_SIZE):
+            chunk = team_ids[start:start + UPDATE_CHUNK_SIZE]
+            updates = {}
+            for field in STAT_FIELDS:
+                whens = [
+                    When(team_id=team_id, then=Value(deltas[team_id][field]))
+                    for team_id in chunk
+                    if deltas[team_id][field]
+                ]
+                if whens:
+                    increment = Case(*whens, default=Value(0), output_field=IntegerField())
+                    updates[field] = F(field) + increment
+            updated += Classification.objects.filter(team_id__in=chunk).update(**updates)
+    return updated
+
+
+def apply_match_results(results):
+    """
+    Apply a batch of (team1_id, team2_id, goals1, goals2) results to the
+    classifications and the head-to-head table in one transaction
+    """
+    results = list(results)
+    with transaction.atomic():
+        apply_head_to_head(results)
+        return apply_deltas(aggregate_deltas(results))
+
+
+def apply_match_result(match):
+    """Apply a finished match to the classification of both teams"""
+    return apply_match_results([(match.team1_id, match.team2_id, match.goals1, match.goals2)])
+
+
+def _side_totals(goals_for, goals_against):
+    won = Q(**{f'{goals_for}__gt': F(goals_against)})
+    lost = Q(**{f'{goals_for}__lt': F(goals_against)})
+    drawn = Q(**{goals_for: F(goals_against)})
+    return {
+        'games_played': Count('id'),
+        'games_won': Count('id', filter=won),
+        'games_lost': Count('id', filter=lost),
+        'games_drawn': Count('id', filter=drawn),
+        'goals_for': Sum(goals_for),
+        'goals_against': Sum(goals_against),
+    }
+
+
+def standings_from_matches(tournament):
+    """
+    Compute classification stats for every team of a tournament from its
+    finished matches.
+
+    Home and away sides are aggregated by the database and combined with
+    UNION ALL, so the whole tournament is read with a single query.
+    """
+    finished = Match.objects.filter(is_finished=True, team1__tournament=tournament).order_by()
+    home = finished.values('team1_id').annotate(**_side_totals('goals1', 'goals2'))
+    away = finished.values('team2_id').annotate(**_side_totals('goals2', 'goals1'))
+
+    stats = defaultdict(empty_stats)
+    for row in home.union(away, all=True):
+        totals = stats[row['team1_id']]
+        totals['games_played'] += row['games_played']
+        totals['games_won'] += row['games_won']
+        totals['games_lost'] += row['games_lost']
+        totals['goals_for'] += row['goals_for'] or 0
+        totals['goals_against'] += row['goals_against'] or 0
+        totals['points'] += (
+            row['games_won'] * POINTS_FOR_WIN
+            + row['games_drawn'] * POINTS_FOR_DRAW
+            + row['games_lost'] * POINTS_FOR_LOSS
+        )
+    return dict(stats)
+
+
+def recompute_standings(tournament):
+    """
+    Rebuild every classification of a tournament from its match history.
+
+    Used to reconcile drift after bulk imports or manual edits; the
+    head-to-head table is rebuilt as well. Returns the number of
+    classification rows written.
+    """
+    stats = standings_from_matches(tournament)
+    team_ids = list(Team.objects.filter(tournament=tournament).values_list('id', flat=True))
+
+    with transaction.atomic():
+        existing = {
+            classification.team_id: classification
+            for classification in Classification.objects.select_for_update().filter(team_id__in=team_ids)
+        }
+        to_update = []
+        to_create = []
+        for team_id in team_ids:
+            values = stats.get(team_id) or empty_stats()
+            classification = existing.get(team_id)
+            if classification is None:
+                to_create.append(Classification(team_id=team_id, **values))
+                continue
+            if any(getattr(classification, field) != value for field, value in values.items()):
+                for field, value in values.items():
+                    setattr(classification, field, value)
+                to_update.append(classification)
+
+        Classification.objects.bulk_create(to_create)
+        Classification.objects.bulk_update(to_update, STAT_FIELDS)
+        rebuild_head_to_head(tournament)
+    standings_changed.send(sender=Classification, tournament_ids=[tournament.id])
+    return len(to_create) + len(to_update)
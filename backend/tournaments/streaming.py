@@ -0,0 +1,57 @@
+import csv
+
+from django.core.serializers.json import DjangoJSONEncoder
+from django.http import StreamingHttpResponse
+
+# Rows fetched per database round trip while streaming
+STREAM_CHUNK_SIZE = 2000
+
+STREAM_FORMATS = {
+    'jsonl': 'application/x-ndjson',
+    'csv': 'text/csv',
+}
+
+
+class _Echo:
+    """File-like object whose write() hands the line back to csv.writer's caller"""
+
+    def write(self, value):
+        return value
+
+
+def jsonl_lines(rows):
+    """One JSON document per row, newline separated"""
+    encoder = DjangoJSONEncoder(separators=(',', ':'))
+    for row in rows:
+        yield encoder.encode(row) + '\n'
+
+
+def csv_lines(rows, fieldnames):
+    """A header line followed by one CSV line per dict row"""
+    writer = csv.writer(_Echo())
+    yield writer.writerow(fieldnames)
+    for row in rows:
+        yield writer.writerow([_csv_value(row.get(field)) for field in fieldnames])
+
+
+def _csv_value(value):
+    if value is None:
+        return ''
+    if hasattr(value, 'isoformat'):
+        return value.isoformat()
+    return value
+
+
+def streaming_response(rows, stream_format, fieldnames, filename):
+    """
+    Stream dict rows as JSON lines or CSV without building the body in memory.
+
+    `rows` should be a lazy iterable, typically `.values().iterator()`.
+    """
+    if stream_format == 'csv':
+        lines = csv_lines(rows, fieldnames)
+    else:
+        lines = jsonl_lines(rows)
+    response = StreamingHttpResponse(lines, content_type=STREAM_FORMATS[stream_format])
+    response['Content-Disposition'] = f'attachment; filename="{filename}.{stream_format}"'
+    return response
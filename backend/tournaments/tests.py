@@ -1,9 +1,37 @@
+import datetime
+import io
+import json
 import pytest
-from django.test import TestCase
+import tempfile
+import time
+import zipfile
+from unittest import mock
+from xml.etree import ElementTree
+from django.contrib.auth import authenticate
+from django.contrib.auth.hashers import check_password
+from django.contrib.auth.models import User
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.db import connection
+from django.db.models import Q
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 from rest_framework.test import APITestCase
 from rest_framework import status
-from .models import Team, Classification, Participant, GalleryImage
+from rest_framework.authtoken.models import Token
+from rest_framework.renderers import JSONRenderer
+from .models import Tournament, Team, Classification, Participant, GalleryImage, Match, MatchSeries, RatingHistory, HeadToHead, Job
+from .draw import draw_tournament_groups
+from .events import EventBroker, broker
+from .jobs import JOB_KINDS, LOST, Heartbeat, LockLost, claim_next, report_progress, requeue_stale, run_job, run_pending
+from .metrics import QueryRecorder, registry, scrape_allowed
+from .ratings import apply_match_ratings, recompute_ratings
+from .registration import MIN_POOL_PASSWORDS, hash_passwords
+from .ranking import build_match_matrix, rank_classifications, update_group_positions
+from .scheduling import SchedulingError, generate_group_fixtures, generate_knockout_bracket, knockout_pairs, round_robin_rounds
+from .serializers import ClassificationSerializer, MatchSerializer, TeamSerializer
+from .standings import apply_match_result, apply_match_results, recompute_standings
 
 
 class TeamModelTest(TestCase):
@@ -57,7 +85,7 @@ class TeamAPITest(APITestCase):
         response = self.client.get(url)
         
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertEqual(len(response.data), 2)
+        self.assertEqual(len(response.data['results']), 2)
 
     def test_create_team(self):
         url = reverse('team-list')
@@ -82,5 +110,1382 @@ class ClassificationAPITest(APITestCase):
         url = reverse('classification-list')
         response = self.client.get(url)
         
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data['results']), 1)
+
+
+class StandingsTest(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A")
+        self.team2 = Team.objects.create(name="Team 2", tournament=self.tournament, group="A")
+
+    def play(self, goals1, goals2):
+        match = Match.objects.create(team1=self.team1, team2=self.team2, goals1=goals1, goals2=goals2, is_finished=True)
+        apply_match_result(match)
+        return match
+
+    def test_apply_match_result_updates_both_teams(self):
+        with CaptureQueriesContext(connection) as queries:
+            apply_match_result(Match(team1=self.team1, team2=self.team2, goals1=10, goals2=7))
+        statements = [q['sql'] for q in queries if 'SAVEPOINT' not in q['sql']]
+        # Classification and head-to-head: insert missing rows + one UPDATE each
+        self.assertEqual(len(statements), 4)
+        
+        winner = Classification.objects.get(team=self.team1)
+        loser = Classification.objects.get(team=self.team2)
+        self.assertEqual((winner.points, winner.games_won, winner.goals_for, winner.goals_against), (3, 1, 10, 7))
+        self.assertEqual((loser.points, loser.games_lost, loser.goals_for, loser.goals_against), (0, 1, 7, 10))
+
+    def test_large_matchdays_are_updated_in_chunks(self):
+        teams = [self.team1, self.team2] + [
+            Team.objects.create(name=f"Team {index}", tournament=self.tournament, group="A") for index in range(3, 7)
+        ]
+        results = [(teams[index].id, teams[index + 1].id, 10, index) for index in range(0, 6, 2)]
+        
+        with mock.patch('tournaments.standings.UPDATE_CHUNK_SIZE', 4), \
+                CaptureQueriesContext(connection) as queries:
+            self.assertEqual(apply_match_results(results), 6)
+        
+        updates = [q['sql'] for q in queries if q['sql'].startswith('UPDATE "tournaments_classification"')]
+        self.assertEqual(len(updates), 2)
+        self.assertEqual(
+            list(Classification.objects.order_by('team__name').values_list('points', 'goals_against')),
+            [(3, 0), (0, 10), (3, 2), (0, 10), (3, 4), (0, 10)]
+        )
+
+    def test_draw_gives_one_point_each(self):
+        self.play(5, 5)
+        self.assertEqual(
+            sorted(Classification.objects.values_list('points', 'games_played')),
+            [(1, 1), (1, 1)]
+        )
+
+    def test_recompute_matches_incremental_updates(self):
+        self.play(10, 4)
+        self.play(3, 10)
+        self.play(6, 6)
+        Match.objects.create(team1=self.team1, team2=self.team2, goals1=0, goals2=0, is_finished=False)
+        incremental = list(Classification.objects.order_by('team_id').values())
+        
+        Classification.objects.update(points=0, games_played=0, goals_for=0)
+        recompute_standings(self.tournament)
+        
+        self.assertEqual(list(Classification.objects.order_by('team_id').values()), incremental)
+
+
+class RankingTest(TestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = [
+            Team.objects.create(name=name, tournament=self.tournament, group="A")
+            for name in ["Alpha", "Bravo", "Charlie"]
+        ]
+
+    def classification(self, team, **stats):
+        return Classification.objects.create(team=team, **stats)
+
+    def test_goal_difference_breaks_points_tie(self):
+        alpha = self.classification(self.teams[0], points=6, goals_for=30, goals_against=25)
+        bravo = self.classification(self.teams[1], points=6, goals_for=28, goals_against=10)
+        
+        ordered = rank_classifications([alpha, bravo], build_match_matrix([]))
+        
+        self.assertEqual([c.team.name for c in ordered], ["Bravo", "Alpha"])
+        self.assertEqual(bravo.position, 1)
+
+    def test_head_to_head_breaks_full_tie(self):
+        alpha = self.classification(self.teams[0], points=3, goals_for=20, goals_against=20)
+        bravo = self.classification(self.teams[1], points=3, goals_for=20, goals_against=20)
+        matrix = build_match_matrix([(self.teams[0].id, self.teams[1].id, 8, 10)])
+        
+        ordered = rank_classifications([alpha, bravo], matrix)
+        
+        self.assertEqual([c.team.name for c in ordered], ["Bravo", "Alpha"])
+
+    def test_update_group_positions_persists(self):
+        for team, points in zip(self.teams, [0, 6, 3]):
+            self.classification(team, points=points)
+        
+        update_group_positions(self.tournament.id, "A")
+        
+        positions = dict(Classification.objects.values_list('team__name', 'position'))
+        self.assertEqual(positions, {"Bravo": 1, "Charlie": 2, "Alpha": 3})
+
+
+class LoadMatchResultAPITest(APITestCase):
+    def setUp(self):
+        tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.user = User.objects.create_user(username="team_1", password="secret")
+        self.team = Team.objects.create(name="Team 1", tournament=tournament, group="A", user=self.user)
+        self.opponent = Team.objects.create(name="Team 2", tournament=tournament, group="A")
+        self.client.force_authenticate(self.user)
+
+    def test_load_match_result(self):
+        url = reverse('load_match_result')
+        data = {'opponent_team_id': self.opponent.id, 'user_goals': 10, 'opponent_goals': 8}
+        response = self.client.post(url, data, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Match.objects.get().goals1, 10)
+        self.assertEqual(Classification.objects.get(team=self.team).points, 3)
+        self.assertEqual(Classification.objects.get(team=self.opponent).games_lost, 1)
+        self.assertEqual(Classification.objects.get(team=self.team).position, 1)
+
+    def test_negative_goals_are_rejected(self):
+        response = self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': self.opponent.id, 'user_goals': 10, 'opponent_goals': -1
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertFalse(Match.objects.exists())
+
+    def test_classification_table_ordered_by_position(self):
+        self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': self.opponent.id, 'user_goals': 4, 'opponent_goals': 10
+        }, format='json')
+        
+        response = self.client.get(reverse('classification-table'), {'group': 'A'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['team_name'] for row in response.data], ["Team 2", "Team 1"])
+
+
+class ListQueryCountTest(APITestCase):
+    """List endpoints must run a fixed number of queries regardless of row count"""
+    list_urls = [
+        'tournament-list', 'team-list', 'classification-list', 'classification-table',
+        'participant-list', 'participant-active', 'match-list', 'match-recent',
+        'match-finished', 'matchseries-list', 'galleryimage-list',
+    ]
+
+    def seed(self, size):
+        # Cached responses are invalidated when the changes commit, which TestCase only simulates
+        with self.captureOnCommitCallbacks(execute=True):
+            self._seed(size)
+
+    def _seed(self, size):
+        for i in range(size):
+            tournament = Tournament.objects.create(
+                name=f"Liga {size}-{i}",
+                start_date=datetime.date(2026, 1, 1),
+                estimated_end_date=datetime.date(2026, 6, 1)
+            )
+            home = Team.objects.create(name=f"Home {i}", tournament=tournament, group="A")
+            away = Team.objects.create(name=f"Away {i}", tournament=tournament, group="A")
+            for team in (home, away):
+                Participant.objects.create(name=f"{team.name} player", team=team, phone_number="600000000")
+                Classification.objects.create(team=team, points=i)
+            match = Match.objects.create(team1=home, team2=away, goals1=10, goals2=i, is_finished=True)
+            series = MatchSeries.objects.create(name=f"Jornada {size}-{i}")
+            series.matches.add(match)
+
+    def count_queries(self, url_name):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse(url_name))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return len(queries)
+
+    def test_query_count_is_constant(self):
+        self.seed(1)
+        small = {url_name: self.count_queries(url_name) for url_name in self.list_urls}
+        self.seed(5)
+        large = {url_name: self.count_queries(url_name) for url_name in self.list_urls}
+        
+        self.assertEqual(large, small)
+
+
+class SeedTournamentCommandTest(TestCase):
+    def test_seed_tournament(self):
+        call_command('seed_tournament', name='Seed', groups=2, teams_per_group=4, with_tokens=True, stdout=io.StringIO())
+        
+        tournament = Tournament.objects.get(name='Seed')
+        self.assertEqual(tournament.teams.count(), 8)
+        self.assertEqual(Participant.objects.filter(team__tournament=tournament).count(), 16)
+        self.assertEqual(Match.objects.filter(team1__tournament=tournament).count(), 12)
+        self.assertEqual(User.objects.filter(team__tournament=tournament, auth_token__isnull=False).count(), 8)
+        self.assertEqual(
+            set(Classification.objects.filter(team__tournament=tournament).values_list('position', flat=True)),
+            {1, 2, 3, 4}
+        )
+
+    def test_same_seed_gives_same_scores(self):
+        call_command('seed_tournament', name='First', seed=7, no_users=True, stdout=io.StringIO())
+        call_command('seed_tournament', name='Second', seed=7, no_users=True, stdout=io.StringIO())
+        
+        def scores(name):
+            return list(Match.objects.filter(team1__tournament__name=name).order_by('id').values_list('goals1', 'goals2'))
+        self.assertEqual(scores('First'), scores('Second'))
+
+    def test_second_leg_swaps_home_and_away(self):
+        call_command('seed_tournament', name='Legs', groups=1, teams_per_group=4, legs=2, no_users=True, stdout=io.StringIO())
+        
+        fixtures = list(Match.objects.filter(team1__tournament__name='Legs').values_list('team1_id', 'team2_id'))
+        self.assertEqual(len(fixtures), 12)
+        self.assertEqual(len(set(fixtures)), 12)
+
+
+class TournamentListAPITest(APITestCase):
+    def setUp(self):
+        self.admin = User.objects.create_superuser(username="admin", password="secret")
+        self.client.force_authenticate(self.admin)
+
+    def create_tournament(self, index, groups=("A", "B", None)):
+        tournament = Tournament.objects.create(
+            name=f"Liga {index}",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        for number, group in enumerate(groups):
+            Team.objects.create(name=f"Team {number}", tournament=tournament, group=group)
+        return tournament
+
+    def test_counts_teams_by_group(self):
+        self.create_tournament(1, groups=("A", "A", "B", None, ""))
+        
+        response = self.client.get(reverse('admin_list_tournaments'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        tournament = response.data['tournaments'][0]
+        self.assertEqual(tournament['teams_count'], 5)
+        self.assertEqual(tournament['teams_by_group'], {"A": 2, "B": 1, "No Group": 2})
+
+    def test_query_count_does_not_grow_with_tournaments(self):
+        for url_name in ('admin_list_tournaments', 'get_available_tournaments'):
+            self.create_tournament(f"{url_name} first")
+            with CaptureQueriesContext(connection) as few:
+                self.client.get(reverse(url_name))
+            for index in range(5):
+                self.create_tournament(f"{url_name} {index}")
+            with CaptureQueriesContext(connection) as many:
+                self.client.get(reverse(url_name))
+            self.assertEqual(len(many), len(few))
+
+    def test_limit_offset_pagination(self):
+        for index in range(3):
+            self.create_tournament(index)
+        
+        response = self.client.get(reverse('admin_list_tournaments'), {'limit': 2})
+        
+        self.assertEqual(len(response.data['tournaments']), 2)
+        self.assertEqual(response.data['total_tournaments'], 3)
+        self.assertIsNotNone(response.data['next'])
+
+
+class PaginationAPITest(APITestCase):
+    def setUp(self):
+        self.teams = [Team.objects.create(name=f"Team {i}") for i in range(5)]
+        for i in range(5):
+            Match.objects.create(team1=self.teams[i], team2=self.teams[(i + 1) % 5], goals1=10, goals2=i, is_finished=True)
+
+    def collect(self, url, **params):
+        rows = []
+        response = self.client.get(url, {'page_size': 2, **params})
+        while True:
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            rows.extend(response.data['results'])
+            if not response.data['next']:
+                return rows
+            response = self.client.get(response.data['next'])
+
+    def test_cursor_pagination_walks_every_match_once(self):
+        rows = self.collect(reverse('match-list'))
+        
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(len({row['id'] for row in rows}), 5)
+
+    def test_sparse_fieldset(self):
+        response = self.client.get(reverse('team-list'), {'fields': 'id,name'})
+        
+        self.assertEqual(set(response.data['results'][0]), {'id', 'name'})
+
+    def test_sparse_fieldset_on_custom_action(self):
+        rows = self.collect(reverse('match-finished'), fields='goals1,winner_name')
+        
+        self.assertEqual(len(rows), 5)
+        self.assertEqual(set(rows[0]), {'goals1', 'winner_name'})
+
+
+class ResponseCacheTest(APITestCase):
+    def setUp(self):
+        # Versions are bumped when changes commit, which TestCase only simulates
+        with self.captureOnCommitCallbacks(execute=True):
+            self.tournament = Tournament.objects.create(
+                name="Liga",
+                start_date=datetime.date(2026, 1, 1),
+                estimated_end_date=datetime.date(2026, 6, 1)
+            )
+            self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A")
+            self.team2 = Team.objects.create(name="Team 2", tournament=self.tournament, group="A")
+        self.url = reverse('classification-table')
+        self.params = {'tournament': self.tournament.id, 'group': 'A'}
+
+    def test_second_request_is_served_from_cache(self):
+        Classification.objects.create(team=self.team1, points=3)
+        self.client.get(self.url, self.params)
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url, self.params)
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+        # Only the tournament version is read
+        self.assertEqual(len(queries), 1)
+
+    def test_etag_revalidation_returns_304(self):
+        response = self.client.get(self.url, self.params)
+        
+        revalidated = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(revalidated['ETag'], response['ETag'])
+
+    def test_same_second_change_is_not_answered_with_304(self):
+        response = self.client.get(self.url, self.params)
+        with self.captureOnCommitCallbacks(execute=True):
+            Classification.objects.create(team=self.team1, points=3)
+        
+        response = self.client.get(self.url, self.params, HTTP_IF_MODIFIED_SINCE=response['Last-Modified'])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 1)
+
+    def test_match_save_invalidates_cached_standings(self):
+        response = self.client.get(self.url, self.params)
+        self.assertEqual(len(response.data), 0)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            match = Match.objects.create(team1=self.team1, team2=self.team2, goals1=10, goals2=3, is_finished=True)
+            apply_match_result(match)
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.data), 2)
+
+    def test_version_bumps_only_the_changed_tournament(self):
+        other = Tournament.objects.create(
+            name="Copa", start_date=datetime.date(2026, 1, 1), estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        response = self.client.get(self.url, self.params)
+        version = Tournament.objects.get(id=self.tournament.id).version
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Team.objects.create(name="Team 3", tournament=other, group="A")
+        with CaptureQueriesContext(connection) as queries:
+            revalidated = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        self.assertEqual(len(queries), 1)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Classification.objects.create(team=self.team1, points=3)
+        self.assertEqual(Tournament.objects.get(id=self.tournament.id).version, version + 1)
+        response = self.client.get(self.url, self.params, HTTP_IF_NONE_MATCH=response['ETag'])
         self.assertEqual(response.status_code, status.HTTP_200_OK)
         self.assertEqual(len(response.data), 1)
+    
+    def test_match_lists_and_admin_teams_revalidate(self):
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        urls = [
+            (reverse('match-list'), {'tournament': self.tournament.id}),
+            (reverse('match-finished'), {'tournament': self.tournament.id}),
+            (reverse('admin_get_tournament_teams', args=[self.tournament.id]), {}),
+        ]
+        etags = []
+        for url, params in urls:
+            response = self.client.get(url, params)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+            etags.append(response['ETag'])
+            
+            revalidated = self.client.get(url, params, HTTP_IF_NONE_MATCH=response['ETag'])
+            self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            Participant.objects.create(name="Player", team=self.team1, phone_number="600000000")
+        for (url, params), etag in zip(urls, etags):
+            response = self.client.get(url, params, HTTP_IF_NONE_MATCH=etag)
+            self.assertEqual(response.status_code, status.HTTP_200_OK)
+    
+    def test_transaction_bumps_version_once_on_commit(self):
+        version = Tournament.objects.get(id=self.tournament.id).version
+        
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            with CaptureQueriesContext(connection) as queries:
+                for team in (self.team1, self.team2):
+                    Classification.objects.create(team=team, points=3)
+                Match.objects.create(team1=self.team1, team2=self.team2, goals1=10, goals2=3, is_finished=True)
+                self.team1.delete()
+            # Nothing is written to the tournament row while the transaction is open
+            self.assertFalse([query for query in queries if query['sql'].startswith('UPDATE "tournaments_tournament"')])
+        
+        self.assertEqual(len(callbacks), 1)
+        self.assertEqual(Tournament.objects.get(id=self.tournament.id).version, version + 1)
+
+
+class BulkMatchResultAPITest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = [
+            Team.objects.create(name=f"Team {index}", tournament=self.tournament, group="A")
+            for index in range(1, 5)
+        ]
+        self.other = Team.objects.create(name="Team B", tournament=self.tournament, group="B")
+        self.url = reverse('admin_bulk_load_match_results', args=[self.tournament.id])
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+
+    def test_loads_matchday_and_updates_standings(self):
+        team1, team2, team3, team4 = self.teams
+        response = self.client.post(self.url, {'results': [
+            {'team1_id': team1.id, 'team2_id': team2.id, 'goals1': 10, 'goals2': 5},
+            {'team1_id': team3.id, 'team2_id': team4.id, 'goals1': 7, 'goals2': 7},
+            {'team1': "team 1", 'team2': "Team 3", 'goals1': 10, 'goals2': 2},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(len(response.data['matches']), 3)
+        self.assertEqual(Match.objects.filter(is_finished=True).count(), 3)
+        leader = Classification.objects.get(team=team1)
+        self.assertEqual((leader.points, leader.games_played, leader.position), (6, 2, 1))
+        self.assertEqual(Classification.objects.get(team=team3).points, 1)
+
+    def test_invalid_row_rejects_whole_batch(self):
+        response = self.client.post(self.url, {'results': [
+            {'team1_id': self.teams[0].id, 'team2_id': self.teams[1].id, 'goals1': 10, 'goals2': 5},
+            {'team1_id': self.teams[0].id, 'team2_id': self.other.id, 'goals1': 10, 'goals2': 5},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([error['row'] for error in response.data['details']], [2])
+        self.assertFalse(Match.objects.exists())
+        self.assertFalse(Classification.objects.exists())
+
+    def test_csv_upload(self):
+        upload = io.BytesIO(b"team1,team2,goals1,goals2\nTeam 1,Team 2,3,10\n")
+        upload.name = "matchday.csv"
+        
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(Classification.objects.get(team=self.teams[1]).points, 3)
+
+
+class SchedulingTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = [
+            Team.objects.create(name=f"Team {index}", tournament=self.tournament, group="A" if index <= 5 else "B")
+            for index in range(1, 9)
+        ]
+
+    def test_round_robin_is_complete_and_balanced(self):
+        for team_count in (4, 5):
+            rounds = round_robin_rounds(range(team_count))
+            pairs = [frozenset(pair) for pairs in rounds for pair in pairs]
+            home_games = [sum(pair[0] == team for pairs in rounds for pair in pairs) for team in range(team_count)]
+            
+            self.assertEqual(len(rounds), team_count - 1 + team_count % 2)
+            self.assertEqual(len(set(pairs)), len(pairs))
+            self.assertEqual(len(pairs), team_count * (team_count - 1) // 2)
+            self.assertLessEqual(max(home_games) - min(home_games), 1)
+
+    def test_knockout_pairs_top_seeds_get_byes(self):
+        pairs, byes = knockout_pairs([1, 2, 3, 4, 5, 6])
+        
+        self.assertEqual(pairs, [(4, 5), (3, 6)])
+        self.assertEqual(byes, [1, 2])
+
+    def test_generate_group_fixtures(self):
+        with CaptureQueriesContext(connection) as queries:
+            created = generate_group_fixtures(self.tournament)
+        
+        # 5 teams -> 5 rounds of 2 matches, 3 teams -> 3 rounds of 1 match
+        self.assertEqual(created, {'groups': 2, 'series': 8, 'matches': 13})
+        self.assertEqual(Match.objects.filter(is_finished=False).count(), 13)
+        self.assertEqual(MatchSeries.objects.get(name="Liga - Group B - Round 1").matches.count(), 1)
+        self.assertLessEqual(len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 6)
+
+    def test_loaded_result_fills_scheduled_fixture(self):
+        generate_group_fixtures(self.tournament)
+        fixture = Match.objects.filter(team1__group="B").order_by('id').first()
+        user = User.objects.create_user(username="team_b")
+        fixture.team2.user = user
+        fixture.team2.save()
+        self.client.force_authenticate(user)
+        
+        response = self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': fixture.team1_id, 'user_goals': 10, 'opponent_goals': 4
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        fixture.refresh_from_db()
+        self.assertEqual((fixture.goals1, fixture.goals2, fixture.is_finished), (4, 10, True))
+        self.assertEqual(Match.objects.count(), 13)
+
+    def test_recent_matches_skip_scheduled_fixtures(self):
+        played = Match.objects.create(team1=self.teams[0], team2=self.teams[1], goals1=10, goals2=5, is_finished=True)
+        generate_group_fixtures(self.tournament)
+        
+        response = self.client.get(reverse('match-recent'), {'tournament': self.tournament.id})
+        
+        self.assertEqual([match['id'] for match in response.data], [played.id])
+
+    def test_knockout_endpoint_seeds_from_positions(self):
+        for home, away in ((0, 1), (2, 3), (5, 6), (5, 7)):
+            match = Match.objects.create(
+                team1=self.teams[home], team2=self.teams[away], goals1=10, goals2=5, is_finished=True
+            )
+            apply_match_result(match)
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        
+        response = self.client.post(
+            reverse('admin_generate_fixtures', args=[self.tournament.id]),
+            {'stage': 'knockout', 'qualifiers_per_group': 2}, format='json'
+        )
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual(response.data['matches'], 2)
+        series = MatchSeries.objects.get(name="Liga - Semi-finals")
+        # Winners meet the other group's runner-up
+        pairs = {(match.team1.name, match.team2.name) for match in series.matches.all()}
+        self.assertEqual(pairs, {("Team 6", "Team 3"), ("Team 1", "Team 7")})
+
+    def test_knockout_bracket_is_generated_once(self):
+        for home, away in ((0, 1), (2, 3), (5, 6), (5, 7)):
+            apply_match_result(Match.objects.create(
+                team1=self.teams[home], team2=self.teams[away], goals1=10, goals2=5, is_finished=True
+            ))
+        generate_knockout_bracket(self.tournament)
+        
+        with self.assertRaisesMessage(SchedulingError, 'unplayed fixtures'):
+            generate_knockout_bracket(self.tournament)
+        # Still refused once the first round has been played
+        Match.objects.filter(is_finished=False).update(goals1=10, goals2=8, is_finished=True)
+        with self.assertRaisesMessage(SchedulingError, 'knockout stage'):
+            generate_knockout_bracket(self.tournament)
+        self.assertEqual(MatchSeries.objects.filter(name="Liga - Semi-finals").count(), 1)
+        self.assertEqual(Match.objects.count(), 6)
+
+    def test_knockout_fixture_accepts_a_result(self):
+        for home, away in ((0, 1), (2, 3), (5, 6), (5, 7)):
+            apply_match_result(Match.objects.create(
+                team1=self.teams[home], team2=self.teams[away], goals1=10, goals2=5, is_finished=True
+            ))
+        generate_knockout_bracket(self.tournament)
+        fixture = Match.objects.filter(is_finished=False).order_by('id').first()
+        self.assertNotEqual(fixture.team1.group, fixture.team2.group)
+        user = User.objects.create_user(username="knockout")
+        fixture.team1.user = user
+        fixture.team1.save()
+        self.client.force_authenticate(user)
+        
+        opponents = self.client.get(reverse('get_opponent_teams')).data['teams']
+        self.assertIn(fixture.team2_id, [team['id'] for team in opponents])
+        response = self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': fixture.team2_id, 'user_goals': 10, 'opponent_goals': 8
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        fixture.refresh_from_db()
+        self.assertEqual((fixture.goals1, fixture.goals2, fixture.is_finished), (10, 8, True))
+        
+        # Outside a scheduled fixture, cross-group results are still refused
+        response = self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': fixture.team2_id, 'user_goals': 10, 'opponent_goals': 8
+        }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_bulk_results_fill_knockout_fixtures(self):
+        for home, away in ((0, 1), (2, 3), (5, 6), (5, 7)):
+            apply_match_result(Match.objects.create(
+                team1=self.teams[home], team2=self.teams[away], goals1=10, goals2=5, is_finished=True
+            ))
+        generate_knockout_bracket(self.tournament)
+        fixtures = list(Match.objects.filter(is_finished=False))
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        
+        response = self.client.post(reverse('admin_bulk_load_match_results', args=[self.tournament.id]), {
+            'results': [
+                {'team1_id': fixture.team1_id, 'team2_id': fixture.team2_id, 'goals1': 10, 'goals2': 9}
+                for fixture in fixtures
+            ]
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertFalse(Match.objects.filter(is_finished=False).exists())
+
+
+class GroupDrawTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = [
+            Team.objects.create(name=f"Team {index:02d}", tournament=self.tournament)
+            for index in range(1, 11)
+        ]
+        for points, team in enumerate(self.teams):
+            Classification.objects.create(team=team, points=points)
+
+    def groups_by_team(self):
+        return dict(Team.objects.values_list('name', 'group'))
+
+    def test_draw_is_balanced_and_spreads_top_seeds(self):
+        draw_tournament_groups(self.tournament, ['A', 'B', 'C'], seed=7)
+        groups = self.groups_by_team()
+        
+        self.assertEqual(sorted(list(groups.values()).count(group) for group in 'ABC'), [3, 3, 4])
+        self.assertEqual({groups["Team 10"], groups["Team 09"], groups["Team 08"]}, {'A', 'B', 'C'})
+
+    def test_same_seed_gives_same_draw(self):
+        draw_tournament_groups(self.tournament, ['A', 'B', 'C'], seed=42, seeding='random')
+        first = self.groups_by_team()
+        draw_tournament_groups(self.tournament, ['A', 'B', 'C'], seed=42, seeding='random', redraw=True)
+        
+        self.assertEqual(self.groups_by_team(), first)
+
+    def test_separated_teams_end_up_in_different_groups(self):
+        separate = [[team.id for team in self.teams[:3]]]
+        for seed in range(10):
+            draw_tournament_groups(self.tournament, ['A', 'B', 'C'], seed=seed, separate=separate, redraw=True)
+            groups = self.groups_by_team()
+            self.assertEqual(len({groups[team.name] for team in self.teams[:3]}), 3)
+
+    def test_endpoint_draws_with_constant_queries(self):
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        url = reverse('admin_randomly_assign_groups', args=[self.tournament.id])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(url, {'groups': ['A', 'B'], 'seed': 3}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['seed'], 3)
+        self.assertEqual(response.data['group_sizes'], {'A': 5, 'B': 5})
+        self.assertLessEqual(len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 8)
+
+
+class AssignTeamGroupsAPITest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = Team.objects.bulk_create([
+            Team(name=f"Team {index}", tournament=self.tournament) for index in range(60)
+        ])
+        self.url = reverse('admin_assign_team_groups', args=[self.tournament.id])
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+
+    def test_assigns_every_team_with_constant_queries(self):
+        assignments = [{'team_id': team.id, 'group': 'AB'[index % 2]} for index, team in enumerate(self.teams)]
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(self.url, {'assignments': assignments}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([team['id'] for team in response.data['updated_teams']], [team.id for team in self.teams])
+        self.assertEqual(Team.objects.filter(group='B').count(), 30)
+        self.assertLessEqual(len([q for q in queries if 'SAVEPOINT' not in q['sql']]), 8)
+
+    def test_unknown_team_rejects_whole_payload(self):
+        response = self.client.post(self.url, {'assignments': [
+            {'team_id': self.teams[0].id, 'group': 'A'},
+            {'team_id': 999999, 'group': 'B'},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Team.objects.filter(group__isnull=False).exists())
+
+
+class RatingTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.teams = [
+            Team.objects.create(name=f"Team {index}", tournament=self.tournament, group="A")
+            for index in range(1, 5)
+        ]
+        scores = [(0, 1, 10, 4), (2, 3, 10, 8), (0, 2, 10, 9), (1, 3, 5, 5), (0, 3, 2, 10), (1, 2, 10, 7)]
+        self.matches = []
+        for home, away, goals1, goals2 in scores:
+            match = Match.objects.create(
+                team1=self.teams[home], team2=self.teams[away], goals1=goals1, goals2=goals2, is_finished=True
+            )
+            apply_match_ratings([match])
+            self.matches.append(match)
+
+    def test_incremental_ratings(self):
+        winner, loser = Team.objects.get(id=self.teams[0].id), Team.objects.get(id=self.teams[1].id)
+        first = RatingHistory.objects.filter(match=self.matches[0]).order_by('id')
+        
+        self.assertEqual([round(row.change, 6) for row in first], [16.0, -16.0])
+        self.assertAlmostEqual(sum(team.rating for team in Team.objects.all()), 4 * 1500)
+        self.assertGreater(winner.rating, loser.rating)
+
+    def test_vectorised_replay_matches_incremental_updates(self):
+        incremental = dict(Team.objects.values_list('id', 'rating'))
+        incremental_history = list(RatingHistory.objects.order_by('id').values_list('team_id', 'match_id', 'rating'))
+        Team.objects.update(rating=1500)
+        
+        # 12 history rows, inserted in batches of 5
+        self.assertEqual(recompute_ratings(batch_size=5), 6)
+        
+        for team_id, rating in Team.objects.values_list('id', 'rating'):
+            self.assertAlmostEqual(rating, incremental[team_id])
+        replayed_history = list(RatingHistory.objects.order_by('id').values_list('team_id', 'match_id', 'rating'))
+        self.assertEqual([row[:2] for row in replayed_history], [row[:2] for row in incremental_history])
+
+    def test_rating_endpoints(self):
+        response = self.client.get(reverse('team-ratings'), {'tournament': self.tournament.id})
+        ratings = [team['rating'] for team in response.data['results']]
+        self.assertEqual(ratings, sorted(ratings, reverse=True))
+        
+        response = self.client.get(reverse('team-rating-history', args=[self.teams[0].id]))
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['match'] for row in response.data['results']], [
+            self.matches[4].id, self.matches[2].id, self.matches[0].id
+        ])
+
+
+class HeadToHeadTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1, self.team2, self.team3 = [
+            Team.objects.create(name=f"Team {index}", tournament=self.tournament, group="A")
+            for index in range(1, 4)
+        ]
+        for team1, team2, goals1, goals2 in (
+            (self.team1, self.team2, 10, 4), (self.team2, self.team1, 10, 8), (self.team1, self.team2, 6, 6),
+        ):
+            apply_match_result(Match.objects.create(
+                team1=team1, team2=team2, goals1=goals1, goals2=goals2, is_finished=True
+            ))
+
+    def test_incremental_updates_both_sides(self):
+        record = HeadToHead.objects.get(team=self.team1, opponent=self.team2)
+        mirror = HeadToHead.objects.get(team=self.team2, opponent=self.team1)
+        
+        self.assertEqual((record.played, record.won, record.drawn, record.lost), (3, 1, 1, 1))
+        self.assertEqual((record.goals_for, record.goals_against), (24, 20))
+        self.assertEqual((mirror.won, mirror.lost, mirror.goals_for), (1, 1, 20))
+
+    def test_rebuild_matches_incremental_table(self):
+        incremental = set(HeadToHead.objects.values_list('team_id', 'opponent_id', 'won', 'lost', 'goals_for'))
+        HeadToHead.objects.all().delete()
+        
+        recompute_standings(self.tournament)
+        
+        self.assertEqual(set(HeadToHead.objects.values_list('team_id', 'opponent_id', 'won', 'lost', 'goals_for')), incremental)
+
+    def test_crosstable_in_one_query(self):
+        url = reverse('classification-crosstable')
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'tournament': self.tournament.id, 'group': 'A'})
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The tournament version lookup and the crosstable itself
+        self.assertEqual(len(queries), 2)
+        rows = response.data['crosstable']
+        self.assertEqual([row['team_name'] for row in rows], ["Team 1", "Team 2", "Team 3"])
+        self.assertEqual(rows[0]['results'][1]['goals_for'], 24)
+        self.assertIsNone(rows[0]['results'][0])
+        self.assertEqual(rows[2]['results'], [None, None, None])
+
+
+class IndexUsageTest(TestCase):
+    """The hot lookup paths must be answered from an index, not a table scan"""
+
+    def plan(self, queryset):
+        if connection.vendor == 'postgresql':
+            # Tiny test tables would otherwise always be scanned sequentially
+            with connection.cursor() as cursor:
+                cursor.execute('SET LOCAL enable_seqscan = off')
+        return queryset.explain()
+
+    def assertUsesIndex(self, queryset, *index_names):
+        plan = self.plan(queryset)
+        for index_name in index_names:
+            self.assertIn(index_name, plan)
+
+    def test_hot_queries_use_indexes(self):
+        self.assertUsesIndex(
+            Team.objects.filter(tournament_id=1, group="A").exclude(id=1), 'team_tournament_group_idx'
+        )
+        self.assertUsesIndex(Team.objects.filter(group="A"), 'team_group_idx')
+        self.assertUsesIndex(
+            Match.objects.filter(is_finished=True).order_by('-played_at', '-id')[:100], 'match_finished_played_idx'
+        )
+        self.assertUsesIndex(
+            Match.objects.filter(Q(team1_id=1) | Q(team2_id=1)).order_by('-played_at'),
+            'match_team1_played_idx', 'match_team2_played_idx'
+        )
+        self.assertUsesIndex(Participant.objects.filter(is_active=True), 'participant_active_name_idx')
+        self.assertUsesIndex(RatingHistory.objects.filter(team_id=1).order_by('-id')[:20], 'ratinghistory_team_idx')
+
+
+class TournamentScopeAPITest(APITestCase):
+    def setUp(self):
+        dates = {'start_date': datetime.date(2026, 1, 1), 'estimated_end_date': datetime.date(2026, 6, 1)}
+        self.current = Tournament.objects.create(name="Liga 2026", **dates)
+        self.previous = Tournament.objects.create(name="Liga 2025", **dates)
+        self.user = User.objects.create_user(username="team_1", password="secret")
+        self.team = Team.objects.create(name="Team 1", tournament=self.current, group="A", user=self.user)
+        self.opponent = Team.objects.create(name="Team 2", tournament=self.current, group="A")
+        self.old_opponent = Team.objects.create(name="Team 3", tournament=self.previous, group="A")
+        self.client.force_authenticate(self.user)
+
+    def test_opponents_are_scoped_to_tournament(self):
+        response = self.client.get(reverse('get_opponent_teams'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['teams'], [{'id': self.opponent.id, 'name': "Team 2", 'group': "A"}])
+
+    def test_cannot_load_result_against_other_tournament(self):
+        response = self.client.post(reverse('load_match_result'), {
+            'opponent_team_id': self.old_opponent.id, 'user_goals': 10, 'opponent_goals': 2
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Match.objects.exists())
+
+    def test_login_with_team_name_used_in_two_tournaments(self):
+        other_user = User.objects.create_user(username="team_1_2025", password="other")
+        Team.objects.create(name="Team 1", tournament=self.previous, user=other_user)
+        self.client.force_authenticate(None)
+        
+        response = self.client.post(reverse('login_team'), {'team_name': "Team 1", 'password': "other"}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual({tournament['id'] for tournament in response.data['tournaments']}, {self.previous.id, self.current.id})
+        
+        response = self.client.post(reverse('login_team'), {
+            'team_name': "Team 1", 'password': "other", 'tournament_id': self.previous.id
+        }, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response.data['team']['tournament'], self.previous.id)
+
+    def test_ambiguous_login_does_not_count_failed_attempts(self):
+        for year in range(5):
+            tournament = Tournament.objects.create(
+                name=f"Liga {year}", start_date=datetime.date(2020 + year, 1, 1),
+                estimated_end_date=datetime.date(2020 + year, 6, 1)
+            )
+            user = User.objects.create_user(username=f"team_1_{year}", password="other")
+            Team.objects.create(name="Team 1", tournament=tournament, user=user)
+        self.client.force_authenticate(None)
+        
+        with mock.patch('tournaments.auth_views.authenticate', wraps=authenticate) as authenticate_mock:
+            response = self.client.post(reverse('login_team'), {'team_name': "Team 1", 'password': "other"}, format='json')
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+            authenticate_mock.assert_not_called()
+            
+            response = self.client.post(reverse('login_team'), {
+                'team_name': "Team 1", 'password': "other", 'tournament_id': tournament.id
+            }, format='json')
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(authenticate_mock.call_count, 1)
+
+    def test_team_matches(self):
+        match = Match.objects.create(team1=self.opponent, team2=self.team, goals1=3, goals2=10, is_finished=True)
+        Match.objects.create(team1=self.opponent, team2=Team.objects.create(name="Team 4", tournament=self.current))
+        
+        response = self.client.get(reverse('get_team_matches'))
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([row['id'] for row in response.data['matches']], [match.id])
+        row = response.data['matches'][0]
+        self.assertEqual((row['opponent_name'], row['goals_for'], row['goals_against'], row['result']), ("Team 2", 10, 3, 'W'))
+
+    def test_team_matches_pages_and_streams(self):
+        for goals in range(5):
+            Match.objects.create(team1=self.team, team2=self.opponent, goals1=10, goals2=goals, is_finished=True)
+        url = reverse('get_team_matches')
+        
+        first = self.client.get(url, {'page_size': 3})
+        second = self.client.get(first.data['next'])
+        self.assertEqual(len(first.data['matches']) + len(second.data['matches']), 5)
+        self.assertIsNone(second.data['next'])
+        
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url, {'stream': 'csv'})
+            lines = b''.join(response.streaming_content).decode().splitlines()
+        self.assertEqual(response['Content-Type'], 'text/csv')
+        self.assertEqual(lines[0].split(',')[:3], ['id', 'played_at', 'is_finished'])
+        self.assertEqual(len(lines), 6)
+        self.assertLessEqual(len(queries), 3)
+        
+        response = self.client.get(url, {'stream': 'jsonl'})
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual({row['result'] for row in rows}, {'W'})
+
+
+class TournamentExportTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A")
+        self.team2 = Team.objects.create(name="Team <2> & co", tournament=self.tournament, group="A")
+        Participant.objects.create(name="Ana", team=self.team1)
+        Match.objects.create(team1=self.team1, team2=self.team2, goals1=10, goals2=4, is_finished=True)
+        recompute_standings(self.tournament)
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+
+    def export(self, dataset, export_format):
+        return self.client.get(reverse('admin_export_tournament', args=[self.tournament.id, dataset, export_format]))
+
+    def test_csv_and_jsonl(self):
+        response = self.export('standings', 'csv')
+        lines = b''.join(response.streaming_content).decode().splitlines()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn('tournament-', response['Content-Disposition'])
+        self.assertEqual(lines[0].split(',')[:3], ['group', 'position', 'team_name'])
+        self.assertEqual(lines[1].split(',')[2:4], ['Team 1', '3'])
+        
+        response = self.export('matches', 'jsonl')
+        rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+        self.assertEqual(
+            [(row['team1_name'], row['goals1'], row['goals2'], row['team2_name']) for row in rows],
+            [("Team 1", 10, 4, "Team <2> & co")]
+        )
+
+    def test_xlsx_workbook(self):
+        response = self.export('all', 'xlsx')
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        with zipfile.ZipFile(io.BytesIO(b''.join(response.streaming_content))) as workbook:
+            self.assertIsNone(workbook.testzip())
+            self.assertIn('name="participants"', workbook.read('xl/workbook.xml').decode())
+            sheet = workbook.read('xl/worksheets/sheet1.xml').decode()
+        self.assertIn('<t>Team &lt;2&gt; &amp; co</t>', sheet)
+        self.assertIn('<c r="D2"><v>1500.0</v></c>', sheet)
+
+    def test_xlsx_drops_control_characters(self):
+        Team.objects.filter(id=self.team1.id).update(name="Team\x011\x0b\tone")
+        
+        with zipfile.ZipFile(io.BytesIO(b''.join(self.export('teams', 'xlsx').streaming_content))) as workbook:
+            sheet = workbook.read('xl/worksheets/sheet1.xml')
+        ElementTree.fromstring(sheet)
+        self.assertIn('<t>Team1\tone</t>', sheet.decode())
+
+    def test_rejects_unknown_dataset_and_format(self):
+        self.assertEqual(self.export('referees', 'csv').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.export('teams', 'pdf').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.export('all', 'csv').status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_command_writes_file(self):
+        output = io.StringIO()
+        call_command('export_tournament', self.tournament.id, 'teams', '--format', 'jsonl', stdout=output)
+        
+        names = [json.loads(line)['name'] for line in output.getvalue().splitlines()]
+        self.assertEqual(names, ["Team 1", "Team <2> & co"])
+
+
+class TeamImportAPITest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        Team.objects.create(name="Existing", tournament=self.tournament)
+        User.objects.create_user(username="team_1")
+        self.url = reverse('admin_bulk_import_teams', args=[self.tournament.id])
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+
+    def test_imports_csv(self):
+        upload = SimpleUploadedFile("teams.csv", (
+            "team_name,password,group,participant1_name,participant1_phone,participant2_name,participant2_phone\n"
+            "Team 1,secret1,A,Ana,600111222,Luis,\n"
+            "Team 2,secret2,B,Marta,,Pablo,\n"
+        ).encode())
+        response = self.client.post(self.url, {'file': upload}, format='multipart')
+        
+        self.assertEqual(response.status_code, status.HTTP_201_CREATED)
+        self.assertEqual([team['username'] for team in response.data['teams']], ['team_1_' + str(self.tournament.id), 'team_2'])
+        team = Team.objects.get(name="Team 1")
+        self.assertEqual(team.group, "A")
+        self.assertEqual(sorted(team.participants.values_list('name', flat=True)), ["Ana", "Luis"])
+        self.assertTrue(team.user.check_password("secret1"))
+        self.assertTrue(Token.objects.filter(user=team.user).exists())
+        self.assertTrue(Classification.objects.filter(team=team).exists())
+        
+        login = self.client.post(reverse('login_team'), {'team_name': "Team 2", 'password': "secret2"}, format='json')
+        self.assertEqual(login.status_code, status.HTTP_200_OK)
+
+    def test_reports_row_errors(self):
+        participants = [{'name': "Ana"}, {'name': "Luis"}]
+        response = self.client.post(self.url, {'teams': [
+            {'team_name': "Team 1", 'password': "secret", 'participants': participants},
+            {'team_name': "existing", 'password': "secret", 'participants': participants},
+            {'team_name': "Team 1", 'password': "secret", 'participants': participants},
+            {'team_name': "Team 3", 'password': "secret", 'participants': participants[:1]},
+        ]}, format='json')
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual([detail['row'] for detail in response.data['details']], [2, 3, 4])
+        self.assertEqual(Team.objects.count(), 1)
+
+    def test_hashes_in_process_pool(self):
+        passwords = [f"secret{index}" for index in range(MIN_POOL_PASSWORDS)]
+        hashed = hash_passwords(passwords, workers=2)
+        
+        self.assertTrue(all(check_password(password, value) for password, value in zip(passwords, hashed)))
+
+
+class LiveEventsTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A")
+        self.team2 = Team.objects.create(name="Team 2", tournament=self.tournament, group="A")
+        self.broker = EventBroker()
+
+    def test_fanout_filters_and_drops_slow_listeners(self):
+        group_a = self.broker.subscribe(self.tournament.id, "A")
+        group_b = self.broker.subscribe(self.tournament.id, "B")
+        everything = self.broker.subscribe(max_pending=1)
+        
+        self.assertEqual(self.broker.publish(self.tournament.id, 'match', {'goals1': 10}, "A"), 2)
+        self.assertEqual(group_a.get(timeout=0)[1:], ('match', '{"goals1":10}'))
+        self.assertIsNone(group_b.get(timeout=0))
+        
+        self.broker.publish(self.tournament.id, 'standings', {}, "A")
+        self.assertTrue(everything.closed)
+        self.assertEqual(self.broker.publish(self.tournament.id + 1, 'match', {}), 0)
+
+    def test_loaded_results_are_published(self):
+        subscription = broker.subscribe(self.tournament.id, "A")
+        self.addCleanup(subscription.close)
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+        
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(reverse('admin_bulk_load_match_results', args=[self.tournament.id]), {'results': [
+                {'team1_id': self.team1.id, 'team2_id': self.team2.id, 'goals1': 10, 'goals2': 6},
+            ]}, format='json')
+        
+        _, name, data = subscription.get(timeout=0)
+        match = json.loads(data)
+        self.assertEqual(name, 'match')
+        self.assertEqual((match['match']['team1_name'], match['match']['goals2']), ("Team 1", 6))
+        self.assertIn({'team': self.team1.id, 'points': 3, 'games_played': 1, 'games_won': 1, 'games_lost': 0,
+                       'goals_for': 10, 'goals_against': 6}, match['deltas'])
+        _, name, data = subscription.get(timeout=0)
+        standings = json.loads(data)
+        self.assertEqual(name, 'standings')
+        self.assertEqual([row['team_name'] for row in standings['classifications']], ["Team 1", "Team 2"])
+
+    @override_settings(LIVE_EVENTS_IN_PROCESS=True)
+    def test_event_stream_view(self):
+        response = self.client.get(reverse('live_events'), {'tournament': self.tournament.id, 'group': "A"})
+        stream = iter(response.streaming_content)
+        
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        self.assertEqual(next(stream), b'retry: 5000\n\n')
+        broker.publish(self.tournament.id, 'match', {'id': 1}, "A")
+        self.assertRegex(next(stream).decode(), r'^id: \d+\nevent: match\ndata: \{"id":1\}\n\n$')
+        response.close()
+        self.assertEqual(broker.listeners(self.tournament.id, "A"), [])
+    
+    @override_settings(LIVE_EVENTS_IN_PROCESS=True)
+    def test_group_stream_needs_a_tournament(self):
+        response = self.client.get(reverse('live_events'), {'group': "A"})
+        
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(broker.listeners(self.tournament.id, "A"), [])
+    
+    def test_in_process_stream_is_opt_in(self):
+        response = self.client.get(reverse('live_events'), {'tournament': self.tournament.id, 'group': "A"})
+        
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertEqual(broker.listeners(self.tournament.id, "A"), [])
+
+
+class MetricsTest(APITestCase):
+    def setUp(self):
+        registry.reset()
+
+    @override_settings(METRICS_SERVER_TIMING=True, DEBUG=True)
+    def test_records_views_and_queries(self):
+        Team.objects.create(name="Team 1")
+        response = self.client.get(reverse('team-list'))
+        
+        self.assertRegex(response['Server-Timing'], r'^app;dur=[\d.]+, db;dur=[\d.]+;desc="\d+ queries"$')
+        metrics = self.client.get(reverse('metrics')).content.decode()
+        self.assertIn('foosball_requests_total{source="django",view="team-list",method="GET",status="200"} 1', metrics)
+        self.assertIn('foosball_request_duration_seconds_count{source="django",view="team-list"} 1', metrics)
+        self.assertRegex(metrics, r'foosball_db_queries_total\{source="django",view="team-list"\} [1-9]')
+        self.assertIn(f'foosball_response_bytes_total{{source="django",view="team-list"}} {len(response.content)}', metrics)
+
+    def test_slow_query_samples(self):
+        recorder = QueryRecorder(slow_seconds=0)
+        with connection.execute_wrapper(recorder):
+            list(Team.objects.filter(name='Team "1"'))
+        registry.observe('django', 'team-list', 'GET', 200, 0.02, recorder)
+        
+        metrics = registry.render()
+        self.assertIn('foosball_slow_queries_total{source="django",view="team-list"} 1', metrics)
+        self.assertIn('foosball_request_duration_seconds_bucket{source="django",view="team-list",le="0.01"} 0', metrics)
+        self.assertIn('foosball_request_duration_seconds_bucket{source="django",view="team-list",le="0.025"} 1', metrics)
+        self.assertIn('sql="SELECT', metrics)
+
+    @override_settings(METRICS_TOKEN="scrape-token")
+    def test_metrics_token(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        response = self.client.get(reverse('metrics'), HTTP_AUTHORIZATION="Bearer scrape-token")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        # The FastAPI /metrics route uses the same check
+        self.assertFalse(scrape_allowed(None))
+        self.assertFalse(scrape_allowed("Bearer wrong"))
+        self.assertTrue(scrape_allowed("Bearer scrape-token"))
+    
+    @override_settings(METRICS_TOKEN="")
+    def test_metrics_closed_without_token_outside_debug(self):
+        self.assertEqual(self.client.get(reverse('metrics')).status_code, status.HTTP_401_UNAUTHORIZED)
+        with override_settings(DEBUG=True):
+            self.assertTrue(scrape_allowed(None))
+
+
+class ValuesReadPathTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A", phone_number="611")
+        self.team2 = Team.objects.create(name="Team 2", tournament=self.tournament, group="A")
+        Team.objects.create(name="Unassigned")
+        Participant.objects.create(name="Zoe", team=self.team1, phone_number="622")
+        Participant.objects.create(name="Ana", team=self.team1, phone_number="633")
+        Participant.objects.create(name="Luis", team=self.team2)
+        Match.objects.create(team1=self.team1, team2=self.team2, goals1=10, goals2=4, is_finished=True)
+        Match.objects.create(team1=self.team2, team2=self.team1, goals1=7, goals2=7, is_finished=True)
+        recompute_standings(self.tournament)
+
+    maxDiff = None
+
+    def test_matches_serializers(self):
+        teams = self.client.get(reverse('team-list')).json()['results']
+        expected = TeamSerializer(Team.objects.with_contact_details().order_by('-created_at', '-id'), many=True).data
+        self.assertEqual(teams, json.loads(JSONRenderer().render(expected)))
+        self.assertEqual({team['name']: team['phone_number'] for team in teams}["Team 1"], "633")
+        
+        table = self.client.get(reverse('classification-table'), {'group': "A"}).json()
+        expected = ClassificationSerializer(Classification.objects.order_by('position'), many=True).data
+        self.assertEqual(table, json.loads(JSONRenderer().render(expected)))
+        
+        recent = self.client.get(reverse('match-recent')).json()
+        expected = MatchSerializer(Match.objects.order_by('-played_at', '-id'), many=True).data
+        self.assertEqual(recent, json.loads(JSONRenderer().render(expected)))
+
+    def test_sparse_fields_and_cursor(self):
+        first = self.client.get(reverse('classification-list'), {'fields': 'team_name,goal_difference', 'page_size': 1})
+        
+        self.assertEqual(first.json()['results'], [{'team_name': "Team 1", 'goal_difference': 6}])
+        second = self.client.get(first.json()['next']).json()
+        self.assertEqual(second['results'], [{'team_name': "Team 2", 'goal_difference': -6}])
+
+
+class JobQueueTest(APITestCase):
+    def setUp(self):
+        self.tournament = Tournament.objects.create(
+            name="Liga",
+            start_date=datetime.date(2026, 1, 1),
+            estimated_end_date=datetime.date(2026, 6, 1)
+        )
+        self.team1 = Team.objects.create(name="Team 1", tournament=self.tournament, group="A")
+        self.team2 = Team.objects.create(name="Team 2", tournament=self.tournament, group="A")
+        Match.objects.create(team1=self.team1, team2=self.team2, goals1=10, goals2=4, is_finished=True)
+        self.client.force_authenticate(User.objects.create_user(username="admin", is_staff=True))
+
+    def submit(self, kind, params=None, key=None):
+        headers = {'HTTP_IDEMPOTENCY_KEY': key} if key else {}
+        return self.client.post(reverse('admin_submit_job'), {
+            'kind': kind, 'tournament': self.tournament.id, 'params': params or {}
+        }, format='json', **headers)
+
+    def test_worker_runs_submitted_job(self):
+        response = self.submit('recompute_standings')
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(response.data['job']['status'], Job.QUEUED)
+        self.assertFalse(Classification.objects.exists())
+        
+        output = io.StringIO()
+        call_command('run_jobs', '--once', stdout=output, stderr=io.StringIO())
+        
+        self.assertIn('succeeded', output.getvalue())
+        job = self.client.get(reverse('admin_get_job', args=[response.data['job']['id']])).data['job']
+        self.assertEqual((job['status'], job['progress'], job['attempts']), (Job.SUCCEEDED, 100, 1))
+        self.assertEqual(job['result'], {'updated_classifications': 2})
+        self.assertEqual(Classification.objects.get(team=self.team1).points, 3)
+
+    def test_idempotency_key(self):
+        first = self.submit('recompute_standings', key="standings-1")
+        again = self.submit('recompute_standings', key="standings-1")
+        
+        self.assertEqual(first.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(again.status_code, status.HTTP_200_OK)
+        self.assertEqual(again.data['job']['id'], first.data['job']['id'])
+        self.assertEqual(Job.objects.count(), 1)
+        self.assertEqual(self.submit('export', key="standings-1").status_code, status.HTTP_409_CONFLICT)
+
+    def test_rejects_invalid_submissions(self):
+        self.assertEqual(self.submit('reboot').status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.submit('generate_fixtures', {'stage': 'final'}).status_code, status.HTTP_400_BAD_REQUEST)
+        self.assertEqual(self.submit('export', {'dataset': 'all', 'format': 'csv'}).status_code, status.HTTP_400_BAD_REQUEST)
+        response = self.client.post(reverse('admin_submit_job'), {'kind': 'export', 'tournament': 999}, format='json')
+        self.assertEqual(response.status_code, status.HTTP_404_NOT_FOUND)
+        self.assertFalse(Job.objects.exists())
+
+    @override_settings(JOB_RETRY_DELAY=0)
+    def test_retries_with_backoff_then_fails(self):
+        job_id = self.submit('recompute_standings').data['job']['id']
+        
+        with mock.patch.object(JOB_KINDS['recompute_standings'], 'handler', side_effect=RuntimeError("database busy")):
+            self.assertEqual(run_pending(limit=5), 3)
+        
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 3))
+        self.assertEqual(job.error, 'RuntimeError: database busy')
+        
+        response = self.client.post(reverse('admin_retry_job', args=[job_id]))
+        self.assertEqual(response.status_code, status.HTTP_202_ACCEPTED)
+        self.assertEqual(run_pending(), 1)
+        self.assertEqual(Job.objects.get(id=job_id).status, Job.SUCCEEDED)
+
+    def test_domain_errors_are_not_retried(self):
+        job_id = self.submit('generate_fixtures', {'stage': 'groups'}).data['job']['id']
+        run_pending()
+        self.assertEqual(Job.objects.get(id=job_id).status, Job.SUCCEEDED)
+        
+        # The fixtures are still unplayed, so a second run is refused
+        job_id = self.submit('generate_fixtures', {'stage': 'groups'}).data['job']['id']
+        run_pending()
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.attempts), (Job.FAILED, 1))
+        self.assertEqual(job.error, 'Tournament already has unplayed fixtures')
+    
+    def test_knockout_job_does_not_duplicate_the_bracket(self):
+        self.submit('recompute_standings')
+        run_pending()
+        job_id = self.submit('generate_fixtures', {'stage': 'knockout'}).data['job']['id']
+        run_pending()
+        self.assertEqual(Job.objects.get(id=job_id).status, Job.SUCCEEDED)
+        Match.objects.filter(is_finished=False).update(goals1=10, goals2=8, is_finished=True)
+        
+        job_id = self.submit('generate_fixtures', {'stage': 'knockout'}).data['job']['id']
+        run_pending()
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.error), (Job.FAILED, 'Tournament already has a knockout stage'))
+        self.assertEqual(MatchSeries.objects.count(), 1)
+
+    def test_claims_once_and_requeues_stale_jobs(self):
+        job_id = self.submit('recompute_standings').data['job']['id']
+        
+        self.assertEqual(claim_next('worker-1').id, job_id)
+        self.assertIsNone(claim_next('worker-2'))
+        self.assertEqual(requeue_stale(timeout=0), 1)
+        
+        job = claim_next('worker-2')
+        self.assertEqual((job.id, job.attempts, job.locked_by), (job_id, 2, 'worker-2'))
+        run_job(job)
+        self.assertEqual(Job.objects.get(id=job_id).status, Job.SUCCEEDED)
+
+    def test_worker_notices_lost_lock(self):
+        job_id = self.submit('recompute_standings').data['job']['id']
+        first = claim_next('worker-1')
+        requeue_stale(timeout=0)
+        second = claim_next('worker-2')
+        
+        self.assertEqual(run_job(first), LOST)
+        job = Job.objects.get(id=job_id)
+        self.assertEqual((job.status, job.locked_by), (Job.RUNNING, 'worker-2'))
+        
+        self.assertEqual(run_job(second), Job.SUCCEEDED)
+
+    def test_heartbeat_refreshes_lock(self):
+        self.submit('recompute_standings')
+        job = claim_next('worker-1')
+        
+        # The heartbeat thread has its own connection: keep the database out of it
+        with mock.patch('tournaments.jobs._owned') as owned:
+            owned.return_value.update.return_value = 1
+            with Heartbeat(job, interval=0.01) as heartbeat:
+                time.sleep(0.1)
+            self.assertGreater(owned.return_value.update.call_count, 1)
+            self.assertFalse(heartbeat.lost.is_set())
+            
+            owned.return_value.update.return_value = 0
+            with Heartbeat(job, interval=0.01) as heartbeat:
+                self.assertTrue(heartbeat.lost.wait(5))
+            with self.assertRaises(LockLost):
+                report_progress(job, 50)
+
+    def test_import_forgets_passwords(self):
+        participants = [{'name': "Ana"}, {'name': "Luis"}]
+        job_id = self.submit('import_teams', {'teams': [
+            {'team_name': "Team 3", 'password': "secret", 'participants': participants},
+        ]}).data['job']['id']
+        run_pending()
+        
+        job = Job.objects.get(id=job_id)
+        self.assertEqual(job.status, Job.SUCCEEDED)
+        self.assertEqual(job.params, {'teams_count': 1})
+        self.assertTrue(Team.objects.get(name="Team 3").user.check_password("secret"))
+
+    def test_export_file_download(self):
+        with tempfile.TemporaryDirectory() as media_root, override_settings(MEDIA_ROOT=media_root):
+            job_id = self.submit('export', {'dataset': 'matches', 'format': 'jsonl'}).data['job']['id']
+            run_pending()
+            
+            response = self.client.get(reverse('admin_download_job_file', args=[job_id]))
+            rows = [json.loads(line) for line in b''.join(response.streaming_content).splitlines()]
+            response.close()
+        
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertIn(f'tournament-{self.tournament.id}-matches.jsonl', response['Content-Disposition'])
+        self.assertEqual([(row['team1_name'], row['goals1']) for row in rows], [("Team 1", 10)])
+
+    def test_lists_jobs_of_a_tournament(self):
+        self.submit('recompute_standings')
+        self.client.post(reverse('admin_submit_job'), {'kind': 'recompute_ratings'}, format='json')
+        
+        response = self.client.get(reverse('admin_list_jobs'), {'tournament': self.tournament.id})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual([job['kind'] for job in response.data['jobs']], ['recompute_standings'])
+        self.assertEqual(self.client.get(reverse('admin_list_jobs'), {'status': 'queued'}).data['total_jobs'], 2)
@@ -13,6 +13,7 @@ router.register(r'gallery', views.GalleryImageViewSet)
 
 urlpatterns = [
     path('', include(router.urls)),
+    path('events/', views.live_events, name='live_events'),
     # Authentication endpoints
     path('auth/register/', auth_views.register_team, name='register_team'),
     path('auth/login/', auth_views.login_team, name='login_team'),
@@ -29,6 +30,17 @@ urlpatterns = [
     path('admin/tournaments/', admin_views.list_tournaments, name='admin_list_tournaments'),
     path('admin/tournaments/create/', admin_views.create_tournament, name='admin_create_tournament'),
     path('admin/tournaments/<int:tournament_id>/teams/', admin_views.get_tournament_teams, name='admin_get_tournament_teams'),
+    path('admin/tournaments/<int:tournament_id>/teams/import/', admin_views.bulk_import_teams, name='admin_bulk_import_teams'),
     path('admin/tournaments/<int:tournament_id>/assign-groups/', admin_views.assign_team_groups, name='admin_assign_team_groups'),
     path('admin/tournaments/<int:tournament_id>/random-groups/', admin_views.randomly_assign_groups, name='admin_randomly_assign_groups'),
+    path('admin/tournaments/<int:tournament_id>/recompute-standings/', admin_views.recompute_tournament_standings, name='admin_recompute_standings'),
+    path('admin/tournaments/<int:tournament_id>/matches/bulk/', admin_views.bulk_load_match_results, name='admin_bulk_load_match_results'),
+    path('admin/tournaments/<int:tournament_id>/fixtures/', admin_views.generate_fixtures, name='admin_generate_fixtures'),
+    path('admin/tournaments/<int:tournament_id>/export/<str:dataset>/<str:export_format>/', admin_views.export_tournament_data, name='admin_export_tournament'),
+    path('admin/ratings/recompute/', admin_views.recompute_team_ratings, name='admin_recompute_ratings'),
+    path('admin/jobs/', admin_views.list_jobs, name='admin_list_jobs'),
+    path('admin/jobs/submit/', admin_views.submit_job, name='admin_submit_job'),
+    path('admin/jobs/<int:job_id>/', admin_views.get_job, name='admin_get_job'),
+    path('admin/jobs/<int:job_id>/retry/', admin_views.retry_job, name='admin_retry_job'),
+    path('admin/jobs/<int:job_id>/download/', admin_views.download_job_file, name='admin_download_job_file'),
 ]
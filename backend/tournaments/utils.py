@@ -1,36 +1,26 @@
-from .models import Classification
+from django.db.models import Count
+
+from .models import Classification, Team
+from .standings import apply_deltas, result_delta
 
 
 def update_team_classification(team, goals_for, goals_against):
     """Update team classification based on match result"""
-    classification, created = Classification.objects.get_or_create(
-        team=team,
-        defaults={
-            'points': 0,
-            'games_played': 0,
-            'games_won': 0,
-            'games_lost': 0,
-            'goals_for': 0,
-            'goals_against': 0,
-        }
+    apply_deltas({team.id: result_delta(goals_for, goals_against)})
+    return Classification.objects.get(team=team)
+
+
+def team_counts_by_group(tournament_ids):
+    """Map each tournament id to {group: team count} using a single aggregate query"""
+    counts = {tournament_id: {} for tournament_id in tournament_ids}
+    rows = (
+        Team.objects.filter(tournament_id__in=tournament_ids)
+        .order_by()
+        .values('tournament_id', 'group')
+        .annotate(teams=Count('id'))
     )
-    
-    # Update match statistics
-    classification.games_played += 1
-    classification.goals_for += goals_for
-    classification.goals_against += goals_against
-    
-    # Determine match result and update points
-    if goals_for > goals_against:
-        # Win
-        classification.games_won += 1
-        classification.points += 3
-    elif goals_for < goals_against:
-        # Loss
-        classification.games_lost += 1
-    else:
-        # Draw (if draws are allowed)
-        classification.points += 1
-    
-    classification.save()
-    return classification
+    for row in rows:
+        group = row['group'] or 'No Group'
+        by_group = counts[row['tournament_id']]
+        by_group[group] = by_group.get(group, 0) + row['teams']
+    return counts
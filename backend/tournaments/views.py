@@ -1,9 +1,21 @@
 from rest_framework import viewsets, status
 from rest_framework.decorators import action
 from rest_framework.response import Response
+from django.conf import settings
+from django.db.models import Count, F, Prefetch, Q
+from django.http import JsonResponse, StreamingHttpResponse
 from django.shortcuts import get_object_or_404
-from .models import Tournament, Team, Classification, Participant, GalleryImage, Match, MatchSeries
-from .serializers import TournamentSerializer, TeamSerializer, ClassificationSerializer, ParticipantSerializer, GalleryImageSerializer, MatchSerializer, MatchSeriesSerializer
+from django.views.decorators.http import require_GET
+from .events import broker, event_stream
+from .head_to_head import group_crosstable
+from .models import Tournament, Team, Classification, Participant, GalleryImage, Match, MatchSeries, RatingHistory
+from .response_cache import cache_response
+from .rows import CLASSIFICATION_ROWS, MATCH_ROWS, TEAM_ROWS, ValuesListMixin
+from .pagination import (
+    GalleryCursorPagination, PlayedAtCursorPagination, RatingCursorPagination,
+    RatingHistoryCursorPagination, StandingsCursorPagination,
+)
+from .serializers import TournamentSerializer, TeamSerializer, ClassificationSerializer, ParticipantSerializer, GalleryImageSerializer, MatchSerializer, MatchSeriesSerializer, RatingHistorySerializer
 
 
 class TournamentViewSet(viewsets.ModelViewSet):
@@ -11,64 +23,150 @@ class TournamentViewSet(viewsets.ModelViewSet):
     serializer_class = TournamentSerializer
 
 
-class TeamViewSet(viewsets.ModelViewSet):
-    queryset = Team.objects.all()
+class TeamViewSet(ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Team.objects.with_contact_details()
     serializer_class = TeamSerializer
+    row_mapper = TEAM_ROWS
+    
+    def get_queryset(self):
+        """Filter teams by tournament and group if provided"""
+        queryset = super().get_queryset()
+        tournament = self.request.query_params.get('tournament', None)
+        if tournament is not None:
+            queryset = queryset.filter(tournament_id=tournament)
+        group = self.request.query_params.get('group', None)
+        if group is not None:
+            queryset = queryset.filter(group=group)
+        return queryset
+    
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return self.values_rows(self.filter_queryset(self.get_queryset()))
+    
+    @action(detail=False, methods=['get'], pagination_class=RatingCursorPagination)
+    @cache_response
+    def ratings(self, request):
+        """Get teams ordered by rating, strongest first"""
+        teams = self.filter_queryset(self.get_queryset())
+        page = self.paginate_queryset(teams)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
+    
+    @action(detail=True, methods=['get'], url_path='rating-history', pagination_class=RatingHistoryCursorPagination)
+    def rating_history(self, request, pk=None):
+        """Get the rating of a team after each of its matches, latest first"""
+        team = self.get_object()
+        history = RatingHistory.objects.filter(team=team).select_related('match')
+        page = self.paginate_queryset(history)
+        serializer = RatingHistorySerializer(page, many=True, context=self.get_serializer_context())
+        return self.get_paginated_response(serializer.data)
 
 
-class ClassificationViewSet(viewsets.ModelViewSet):
-    queryset = Classification.objects.all()
+class ClassificationViewSet(ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Classification.objects.select_related('team')
     serializer_class = ClassificationSerializer
+    pagination_class = StandingsCursorPagination
+    row_mapper = CLASSIFICATION_ROWS
     
     def get_queryset(self):
-        """Filter classifications by team group if provided"""
-        queryset = Classification.objects.all()
+        """Filter classifications by tournament and team group if provided"""
+        queryset = Classification.objects.select_related('team')
+        tournament = self.request.query_params.get('tournament', None)
+        if tournament is not None:
+            queryset = queryset.filter(team__tournament_id=tournament)
         group = self.request.query_params.get('group', None)
         if group is not None:
             queryset = queryset.filter(team__group=group)
         return queryset
     
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return self.values_rows(self.filter_queryset(self.get_queryset()))
+    
     @action(detail=False, methods=['get'])
-    def table(self):
+    @cache_response
+    def table(self, request):
         """Get classification table ordered by position"""
-        classifications = self.get_queryset()
-        serializer = self.get_serializer(classifications, many=True)
-        return Response(serializer.data)
+        classifications = self.get_queryset().order_by(
+            F('position').asc(nulls_last=True), '-points', '-goals_for'
+        )
+        return self.values_rows(classifications, paginate=False)
+    
+    @action(detail=False, methods=['get'])
+    @cache_response
+    def crosstable(self, request):
+        """Get the head-to-head crosstable of one group of a tournament"""
+        tournament = request.query_params.get('tournament', '')
+        group = request.query_params.get('group', None)
+        if not tournament.isdigit() or not group:
+            return Response(
+                {'error': 'tournament (id) and group query parameters are required'},
+                status=status.HTTP_400_BAD_REQUEST
+            )
+        tournament = int(tournament)
+        return Response({
+            'tournament': tournament,
+            'group': group,
+            'crosstable': group_crosstable(tournament, group),
+        })
 
 
 class ParticipantViewSet(viewsets.ModelViewSet):
-    queryset = Participant.objects.all()
+    queryset = Participant.objects.select_related('team')
     serializer_class = ParticipantSerializer
     
     @action(detail=False, methods=['get'])
-    def active(self):
+    def active(self, request):
         """Get only active participants"""
-        participants = Participant.objects.filter(is_active=True)
-        serializer = self.get_serializer(participants, many=True)
-        return Response(serializer.data)
+        participants = self.get_queryset().filter(is_active=True)
+        page = self.paginate_queryset(participants)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
-class MatchViewSet(viewsets.ModelViewSet):
-    queryset = Match.objects.all()
+class MatchViewSet(ValuesListMixin, viewsets.ModelViewSet):
+    queryset = Match.objects.select_related('team1', 'team2')
     serializer_class = MatchSerializer
+    pagination_class = PlayedAtCursorPagination
+    row_mapper = MATCH_ROWS
+    
+    def get_queryset(self):
+        """Filter matches by tournament if provided"""
+        queryset = super().get_queryset()
+        tournament = self.request.query_params.get('tournament', None)
+        if tournament is not None:
+            queryset = queryset.filter(team1__tournament_id=tournament)
+        return queryset
+    
+    @cache_response
+    def list(self, request, *args, **kwargs):
+        return super().list(request, *args, **kwargs)
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def recent(self, request):
-        """Get recent matches"""
-        matches = Match.objects.all()[:10]
-        serializer = self.get_serializer(matches, many=True)
-        return Response(serializer.data)
+        """Get recently played matches, optionally for a single tournament"""
+        # Scheduled fixtures carry a played_at too, but have not been played
+        matches = self.get_queryset().filter(is_finished=True)
+        return self.values_rows(matches[:10], paginate=False)
     
     @action(detail=False, methods=['get'])
+    @cache_response
     def finished(self, request):
         """Get finished matches"""
-        matches = Match.objects.filter(is_finished=True)
-        serializer = self.get_serializer(matches, many=True)
-        return Response(serializer.data)
+        matches = self.get_queryset().filter(is_finished=True)
+        page = self.paginate_queryset(matches)
+        serializer = self.get_serializer(page, many=True)
+        return self.get_paginated_response(serializer.data)
 
 
 class MatchSeriesViewSet(viewsets.ModelViewSet):
-    queryset = MatchSeries.objects.all()
+    queryset = MatchSeries.objects.annotate(
+        matches_count=Count('matches', distinct=True),
+        finished_matches_count=Count('matches', filter=Q(matches__is_finished=True), distinct=True),
+    ).prefetch_related(
+        Prefetch('matches', queryset=Match.objects.select_related('team1', 'team2'))
+    )
     serializer_class = MatchSeriesSerializer
     
     @action(detail=True, methods=['post'])
@@ -103,3 +201,35 @@ class MatchSeriesViewSet(viewsets.ModelViewSet):
 class GalleryImageViewSet(viewsets.ModelViewSet):
     queryset = GalleryImage.objects.all()
     serializer_class = GalleryImageSerializer
+    pagination_class = GalleryCursorPagination
+
+
+@require_GET
+def live_events(request):
+    """
+    Server-Sent Events stream of match results and standings.
+
+    A plain Django view: DRF's content negotiation would reject the
+    `text/event-stream` Accept header sent by EventSource. Filter with
+    `?tournament=` and `?group=`; group names repeat across tournaments, so a
+    group needs its tournament. Every listener holds a server thread, so the
+    stream is only served with LIVE_EVENTS_IN_PROCESS; spectators use the
+    FastAPI app's `standings` stream.
+    """
+    if not settings.LIVE_EVENTS_IN_PROCESS:
+        return JsonResponse(
+            {'error': 'Live events are served by the FastAPI app at /api/events/'},
+            status=status.HTTP_404_NOT_FOUND
+        )
+    tournament = request.GET.get('tournament')
+    group = request.GET.get('group') or None
+    if tournament is not None and not tournament.isdigit():
+        return JsonResponse({'error': 'tournament must be an id'}, status=status.HTTP_400_BAD_REQUEST)
+    if group is not None and tournament is None:
+        return JsonResponse({'error': 'group needs a tournament'}, status=status.HTTP_400_BAD_REQUEST)
+    subscription = broker.subscribe(int(tournament) if tournament is not None else None, group)
+    response = StreamingHttpResponse(event_stream(subscription), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx from buffering the stream
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -21,6 +21,31 @@ interface Team {
   created_at: string;
 }
 
+interface Job {
+  id: number;
+  kind: string;
+  tournament: number | null;
+  status: 'queued' | 'running' | 'succeeded' | 'failed';
+  progress: number;
+  message: string;
+  result: { [key: string]: any } | null;
+  error: string;
+  attempts: number;
+  max_attempts: number;
+  created_at: string;
+  finished_at: string | null;
+}
+
+const JOB_LABELS: { [kind: string]: string } = {
+  recompute_standings: 'Recompute standings',
+  generate_fixtures: 'Generate fixtures',
+  recompute_ratings: 'Recompute ratings',
+  import_teams: 'Import teams',
+  export: 'Export',
+};
+
+const JOB_POLL_INTERVAL = 2000;
+
 interface TournamentTeams {
   tournament: Tournament;
   teams_by_group: { [key: string]: Team[] };
@@ -37,6 +62,7 @@ const AdminPanel: React.FC = () => {
   const [showLoginModal, setShowLoginModal] = useState(false);
   const [loading, setLoading] = useState(false);
   const [error, setError] = useState<string | null>(null);
+  const [jobs, setJobs] = useState<Job[]>([]);
 
   // Login form state
   const [loginForm, setLoginForm] = useState({
@@ -51,6 +77,14 @@ const AdminPanel: React.FC = () => {
     estimated_end_date: ''
   });
 
+  // Poll the tournament's jobs while any of them is still waiting or running
+  const hasActiveJobs = jobs.some(job => job.status === 'queued' || job.status === 'running');
+  useEffect(() => {
+    if (!hasActiveJobs || !selectedTournament) return;
+    const timer = setInterval(() => fetchJobs(selectedTournament), JOB_POLL_INTERVAL);
+    return () => clearInterval(timer);
+  }, [hasActiveJobs, selectedTournament, adminToken]);
+
   useEffect(() => {
     // Check for existing admin token
     const savedToken = localStorage.getItem('adminToken');
@@ -232,9 +266,107 @@ const AdminPanel: React.FC = () => {
     }
   };
 
+  const fetchJobs = async (tournamentId: number) => {
+    if (!adminToken) return;
+
+    try {
+      const response = await fetch(getApiUrl(`/api/admin/jobs/?tournament=${tournamentId}&limit=10`), {
+        headers: {
+          'Authorization': `Token ${adminToken}`,
+        },
+      });
+
+      if (response.ok) {
+        const data = await response.json();
+        setJobs(data.jobs);
+      } else {
+        setError('Failed to fetch jobs');
+      }
+    } catch (err) {
+      setError('Network error occurred');
+    }
+  };
+
+  const submitJob = async (kind: string, params: { [key: string]: any } = {}) => {
+    if (!adminToken || !selectedTournament) return;
+
+    try {
+      setError(null);
+      // One key per click: a resubmitted request returns the same job instead of queuing it twice
+      const idempotencyKey = `${kind}-${selectedTournament}-${Date.now()}-${Math.random().toString(36).slice(2)}`;
+      const response = await fetch(getApiUrl('/api/admin/jobs/submit/'), {
+        method: 'POST',
+        headers: {
+          'Authorization': `Token ${adminToken}`,
+          'Content-Type': 'application/json',
+          'Idempotency-Key': idempotencyKey,
+        },
+        body: JSON.stringify({ kind, tournament: selectedTournament, params }),
+      });
+
+      const data = await response.json();
+
+      if (response.ok) {
+        fetchJobs(selectedTournament);
+      } else {
+        setError(data.error || 'Failed to queue job');
+      }
+    } catch (err) {
+      setError('Network error occurred');
+    }
+  };
+
+  const retryJob = async (jobId: number) => {
+    if (!adminToken || !selectedTournament) return;
+
+    try {
+      const response = await fetch(getApiUrl(`/api/admin/jobs/${jobId}/retry/`), {
+        method: 'POST',
+        headers: {
+          'Authorization': `Token ${adminToken}`,
+        },
+      });
+
+      if (response.ok) {
+        fetchJobs(selectedTournament);
+      } else {
+        const data = await response.json();
+        setError(data.error || 'Failed to retry job');
+      }
+    } catch (err) {
+      setError('Network error occurred');
+    }
+  };
+
+  const downloadJobFile = async (job: Job) => {
+    if (!adminToken || !job.result) return;
+
+    try {
+      const response = await fetch(getApiUrl(`/api/admin/jobs/${job.id}/download/`), {
+        headers: {
+          'Authorization': `Token ${adminToken}`,
+        },
+      });
+
+      if (response.ok) {
+        const url = URL.createObjectURL(await response.blob());
+        const link = document.createElement('a');
+        link.href = url;
+        link.download = job.result.filename;
+        link.click();
+        URL.revokeObjectURL(url);
+      } else {
+        setError('Failed to download export');
+      }
+    } catch (err) {
+      setError('Network error occurred');
+    }
+  };
+
   const handleTournamentSelect = (tournamentId: number) => {
     setSelectedTournament(tournamentId);
     fetchTournamentTeams(tournamentId);
+    fetchJobs(tournamentId);
   };
 
   if (!adminToken) {
@@ -460,6 +592,88 @@ const AdminPanel: React.FC = () => {
             </div>
           )}
         </div>
+
+        {/* Section 3: Background Jobs */}
+        {selectedTournament && (
+          <div className="bg-white rounded-lg shadow-md p-6 mt-8">
+            <h2 className="text-xl font-semibold mb-4">Background Jobs</h2>
+            <div className="flex flex-wrap gap-2 mb-6">
+              <button
+                onClick={() => submitJob('recompute_standings')}
+                className="bg-blue-600 text-white px-4 py-2 rounded-md hover:bg-blue-700"
+              >
+                Recompute Standings
+              </button>
+              <button
+                onClick={() => submitJob('generate_fixtures', { stage: 'groups' })}
+                className="bg-green-600 text-white px-4 py-2 rounded-md hover:bg-green-700"
+              >
+                Generate Group Fixtures
+              </button>
+              <button
+                onClick={() => submitJob('generate_fixtures', { stage: 'knockout' })}
+                className="bg-yellow-600 text-white px-4 py-2 rounded-md hover:bg-yellow-700"
+              >
+                Generate Knockout Bracket
+              </button>
+              <button
+                onClick={() => submitJob('export', { dataset: 'all', format: 'xlsx' })}
+                className="bg-purple-600 text-white px-4 py-2 rounded-md hover:bg-purple-700"
+              >
+                Export to Excel
+              </button>
+            </div>
+
+            {jobs.length === 0 ? (
+              <p className="text-gray-600">No jobs for this tournament yet.</p>
+            ) : (
+              <div className="space-y-3">
+                {jobs.map((job) => (
+                  <div key={job.id} className="border rounded-lg p-3">
+                    <div className="flex justify-between items-center mb-2 text-sm">
+                      <span className="font-medium">
+                        {JOB_LABELS[job.kind] || job.kind} #{job.id}
+                      </span>
+                      <span className={
+                        job.status === 'succeeded' ? 'text-green-700' :
+                        job.status === 'failed' ? 'text-red-700' : 'text-gray-600'
+                      }>
+                        {job.status}{job.attempts > 1 ? ` (attempt ${job.attempts}/${job.max_attempts})` : ''}
+                      </span>
+                    </div>
+                    <div className="w-full bg-gray-200 rounded-full h-2">
+                      <div
+                        className={`h-2 rounded-full ${job.status === 'failed' ? 'bg-red-500' : 'bg-blue-600'}`}
+                        style={{ width: `${job.progress}%` }}
+                      ></div>
+                    </div>
+                    {(job.error || job.message) && (
+                      <p className={`mt-2 text-sm ${job.status === 'failed' ? 'text-red-700' : 'text-gray-600'}`}>
+                        {job.status === 'failed' ? job.error : job.message}
+                      </p>
+                    )}
+                    {job.status === 'succeeded' && job.result?.file && (
+                      <button
+                        onClick={() => downloadJobFile(job)}
+                        className="mt-2 text-sm text-blue-600 hover:text-blue-800"
+                      >
+                        Download {job.result.filename}
+                      </button>
+                    )}
+                    {job.status === 'failed' && (
+                      <button
+                        onClick={() => retryJob(job.id)}
+                        className="mt-2 text-sm text-blue-600 hover:text-blue-800"
+                      >
+                        Retry
+                      </button>
+                    )}
+                  </div>
+                ))}
+              </div>
+            )}
+          </div>
+        )}
       </div>
 
       {/* Create Tournament Modal */}
@@ -16,8 +16,11 @@ const AuthModal: React.FC<AuthModalProps> = ({ isOpen, onClose, onAuthSuccess })
   // Login form state
   const [loginData, setLoginData] = useState({
     team_name: '',
-    password: ''
+    password: '',
+    tournament_id: ''
   });
+  // Offered when several tournaments have a team with the entered name
+  const [loginTournaments, setLoginTournaments] = useState<{ id: number; name: string }[]>([]);
   
   // Registration form state
   const [registerData, setRegisterData] = useState({
@@ -36,7 +39,11 @@ const AuthModal: React.FC<AuthModalProps> = ({ isOpen, onClose, onAuthSuccess })
     setError('');
 
     try {
-      const response = await axios.post(getApiUrl('/api/auth/login/'), loginData);
+      const { tournament_id, ...credentials } = loginData;
+      const response = await axios.post(
+        getApiUrl('/api/auth/login/'),
+        tournament_id ? { ...credentials, tournament_id: Number(tournament_id) } : credentials
+      );
       const { token, team } = response.data;
       
       // Store token in localStorage
@@ -46,6 +53,7 @@ const AuthModal: React.FC<AuthModalProps> = ({ isOpen, onClose, onAuthSuccess })
       onAuthSuccess(token, team);
       onClose();
     } catch (error: any) {
+      setLoginTournaments(error.response?.data?.tournaments || loginTournaments);
       setError(error.response?.data?.error || 'Login failed');
     } finally {
       setLoading(false);
@@ -153,10 +161,33 @@ const AuthModal: React.FC<AuthModalProps> = ({ isOpen, onClose, onAuthSuccess })
                 type="text"
                 required
                 value={loginData.team_name}
-                onChange={(e) => setLoginData({ ...loginData, team_name: e.target.value })}
+                onChange={(e) => {
+                  setLoginData({ ...loginData, team_name: e.target.value, tournament_id: '' });
+                  setLoginTournaments([]);
+                }}
                 className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-primary-500"
               />
             </div>
+            {loginTournaments.length > 0 && (
+              <div>
+                <label className="block text-sm font-medium text-gray-700 mb-1">
+                  Torneo
+                </label>
+                <select
+                  required
+                  value={loginData.tournament_id}
+                  onChange={(e) => setLoginData({ ...loginData, tournament_id: e.target.value })}
+                  className="w-full px-3 py-2 border border-gray-300 rounded-md focus:outline-none focus:ring-2 focus:ring-primary-500"
+                >
+                  <option value="">Selecciona un torneo...</option>
+                  {loginTournaments.map((tournament) => (
+                    <option key={tournament.id} value={tournament.id}>
+                      {tournament.name}
+                    </option>
+                  ))}
+                </select>
+              </div>
+            )}
             <div>
               <label className="block text-sm font-medium text-gray-700 mb-1">
                 Contraseña
@@ -8,11 +8,18 @@ import ParticipantesSection from './sections/ParticipantesSection';
 import JornadasSection from './sections/JornadasSection';
 import ClasificacionSection from './sections/ClasificacionSection';
 import GallerySection from './sections/GallerySection';
+import { fetchAllPages } from '../utils/api';
+
+interface Tournament {
+  id: number;
+  start_date: string;
+}
 
 const Home: React.FC = () => {
   const [activeSection, setActiveSection] = useState('inicio');
   const [authToken, setAuthToken] = useState<string | null>(null);
   const [team, setTeam] = useState<any>(null);
+  const [tournament, setTournament] = useState<number | null | undefined>(undefined);
 
   useEffect(() => {
     // Check for existing authentication on app load
@@ -25,6 +32,26 @@ const Home: React.FC = () => {
     }
   }, []);
 
+  useEffect(() => {
+    // Standings follow the latest tournament that has started (or the first one to come)
+    const fetchCurrentTournament = async () => {
+      try {
+        const tournaments = await fetchAllPages<Tournament>('/api/tournaments/');
+        const today = new Date().toISOString().slice(0, 10);
+        // The list comes newest created first; ISO dates sort as strings
+        const byStart = [...tournaments].sort((a, b) => a.start_date.localeCompare(b.start_date));
+        const started = byStart.filter((item) => item.start_date <= today);
+        const current = started.length > 0 ? started[started.length - 1] : byStart[0];
+        setTournament(current ? current.id : null);
+      } catch (error) {
+        console.error('Error fetching tournaments:', error);
+        setTournament(null);
+      }
+    };
+
+    fetchCurrentTournament();
+  }, []);
+
   useEffect(() => {
     const handleScroll = () => {
       const sections = ['inicio', 'reglamento', 'funcionamiento', 'participantes', 'jornadas', 'clasificacion-a', 'clasificacion-b', 'clasificacion-c', 'gallery'];
@@ -77,9 +104,9 @@ const Home: React.FC = () => {
         <ParticipantesSection />
         <JornadasSection />
         <div className="space-y-4">
-          <ClasificacionSection group="A" />
-          <ClasificacionSection group="B" />
-          <ClasificacionSection group="C" />
+          <ClasificacionSection tournament={tournament} group="A" />
+          <ClasificacionSection tournament={tournament} group="B" />
+          <ClasificacionSection tournament={tournament} group="C" />
         </div>
         <GallerySection />
       </main>
@@ -12,9 +12,9 @@ interface Match {
   id: number;
   team1_name: string;
   team2_name: string;
-  team1_goals: number;
-  team2_goals: number;
-  created_at: string;
+  goals1: number;
+  goals2: number;
+  played_at: string;
 }
 
 interface MatchLoadModalProps {
@@ -54,9 +54,10 @@ const MatchLoadModal: React.FC<MatchLoadModalProps> = ({ isOpen, onClose, authTo
   const fetchRecentMatches = async () => {
     try {
       const response = await axios.get(getApiUrl('/api/auth/my-matches/'), {
-        headers: { Authorization: `Token ${authToken}` }
+        headers: { Authorization: `Token ${authToken}` },
+        params: { page_size: 5 } // Show last 5 matches
       });
-      setRecentMatches(response.data.matches.slice(0, 5)); // Show last 5 matches
+      setRecentMatches(response.data.matches);
     } catch (error: any) {
       console.error('Error loading recent matches:', error);
     }
@@ -208,11 +209,11 @@ const MatchLoadModal: React.FC<MatchLoadModalProps> = ({ isOpen, onClose, authTo
                       {match.team1_name} vs {match.team2_name}
                     </span>
                     <span className="text-primary-600 font-bold">
-                      {match.team1_goals} - {match.team2_goals}
+                      {match.goals1} - {match.goals2}
                     </span>
                   </div>
                   <div className="text-gray-500 text-xs mt-1">
-                    {new Date(match.created_at).toLocaleDateString('es-ES')}
+                    {new Date(match.played_at).toLocaleDateString('es-ES')}
                   </div>
                 </div>
               ))}
@@ -1,6 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import axios from 'axios';
-import { getApiUrl } from '../../utils/api';
+import { getApiUrl, getEventsUrl } from '../../utils/api';
 
 interface Classification {
   id: number;
@@ -16,17 +16,30 @@ interface Classification {
 }
 
 interface ClasificacionSectionProps {
+  // undefined while the current tournament loads, null when there is none
+  tournament: number | null | undefined;
   group: string;
 }
 
-const ClasificacionSection: React.FC<ClasificacionSectionProps> = ({ group }) => {
+const ClasificacionSection: React.FC<ClasificacionSectionProps> = ({ tournament, group }) => {
   const [classifications, setClassifications] = useState<Classification[]>([]);
   const [loading, setLoading] = useState(true);
 
   useEffect(() => {
+    if (tournament === undefined) {
+      return;
+    }
+    if (tournament === null) {
+      setClassifications([]);
+      setLoading(false);
+      return;
+    }
+    const query = `tournament=${tournament}&group=${encodeURIComponent(group)}`;
+
     const fetchClassifications = async () => {
       try {
-        const response = await axios.get(getApiUrl(`/api/classifications/?group=${group}`));
+        // The table action returns the whole group already ranked by position
+        const response = await axios.get(getApiUrl(`/api/classifications/table/?${query}`));
         setClassifications(response.data);
       } catch (error) {
         console.error('Error fetching classifications:', error);
@@ -36,7 +49,21 @@ const ClasificacionSection: React.FC<ClasificacionSectionProps> = ({ group }) =>
     };
 
     fetchClassifications();
-  }, [group]);
+
+    // Every result pushes the re-ranked group table, no polling needed
+    const events = new EventSource(getEventsUrl(query));
+    events.addEventListener('standings', (event) => {
+      const standings = JSON.parse((event as MessageEvent).data);
+      // Group names repeat across tournaments
+      if (standings.tournament === tournament && standings.group === group) {
+        setClassifications(standings.classifications);
+      }
+    });
+    // EventSource reconnects by itself; reload the table in case events were missed
+    events.addEventListener('open', fetchClassifications);
+
+    return () => events.close();
+  }, [tournament, group]);
 
   return (
     <section id={`clasificacion-${group.toLowerCase()}`} className="section-container bg-yellow-50 py-8">
@@ -1,7 +1,6 @@
 import React, { useState, useEffect } from 'react';
 import { ChevronLeft, ChevronRight } from 'lucide-react';
-import axios from 'axios';
-import { getApiUrl } from '../../utils/api';
+import { fetchAllPages } from '../../utils/api';
 
 interface GalleryImage {
   id: number;
@@ -19,8 +18,7 @@ const GallerySection: React.FC = () => {
   useEffect(() => {
     const fetchImages = async () => {
       try {
-        const response = await axios.get(getApiUrl('/api/gallery/'));
-        setImages(response.data);
+        setImages(await fetchAllPages<GalleryImage>('/api/gallery/'));
       } catch (error) {
         console.error('Error fetching gallery images:', error);
         // Local team logos
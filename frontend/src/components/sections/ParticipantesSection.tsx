@@ -1,6 +1,5 @@
 import React, { useState, useEffect } from 'react';
-import axios from 'axios';
-import { getApiUrl } from '../../utils/api';
+import { fetchAllPages } from '../../utils/api';
 
 interface Team {
   id: number;
@@ -17,8 +16,7 @@ const ParticipantesSection: React.FC = () => {
   useEffect(() => {
     const fetchTeams = async () => {
       try {
-        const response = await axios.get(getApiUrl('/api/teams/'));
-        setTeams(response.data);
+        setTeams(await fetchAllPages<Team>('/api/teams/'));
       } catch (error) {
         console.error('Error fetching teams:', error);
       } finally {
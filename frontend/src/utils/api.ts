@@ -1,3 +1,5 @@
+import axios from 'axios';
+
 const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000';
 
 export const getApiUrl = (endpoint: string): string => {
@@ -11,3 +13,21 @@ export const getApiUrl = (endpoint: string): string => {
 };
 
 export default API_BASE_URL;
+
+// Live standings come from the FastAPI app, which needs no server thread per spectator.
+// Point VITE_EVENTS_URL at Django (with LIVE_EVENTS_IN_PROCESS) to use its stream in development.
+const EVENTS_BASE_URL = import.meta.env.VITE_EVENTS_URL || 'http://localhost:8001';
+
+export const getEventsUrl = (query: string): string => `${EVENTS_BASE_URL}/api/events/?${query}`;
+
+// List endpoints are cursor-paginated ({ next, results }); follow `next` until the end
+export const fetchAllPages = async <T,>(endpoint: string): Promise<T[]> => {
+  const results: T[] = [];
+  let url: string | null = getApiUrl(endpoint);
+  while (url) {
+    const response: { data: { next: string | null; results: T[] } } = await axios.get(url);
+    results.push(...response.data.results);
+    url = response.data.next;
+  }
+  return results;
+};